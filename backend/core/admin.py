@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Account, Transaction, Category, Budget, InvestmentAccount, Holding, Loan, LoanPayment, NetWorthSnapshot, Subscription, Goal, UserProfile
+from .models import Account, Transaction, Category, Budget, InvestmentAccount, Holding, Loan, LoanPayment, NetWorthSnapshot, Subscription, Goal, UserProfile, ImportJob, Alert
 
 admin.site.register(Account)
 admin.site.register(Transaction)
@@ -12,4 +12,6 @@ admin.site.register(LoanPayment)
 admin.site.register(NetWorthSnapshot)
 admin.site.register(Subscription)
 admin.site.register(Goal)
-admin.site.register(UserProfile)
\ No newline at end of file
+admin.site.register(UserProfile)
+admin.site.register(ImportJob)
+admin.site.register(Alert)
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Settings naming cache aliases whose contents (version counters, quotes) must be seen by every worker
+SHARED_CACHE_SETTINGS = ['MARKETDATA_CACHE']
+PER_PROCESS_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    users = {'analytics': ['core.versioned_cache']}
+    for name in SHARED_CACHE_SETTINGS:
+        users.setdefault(getattr(settings, name), []).append(name)
+    return [
+        Warning(
+            f"The '{alias}' cache (used by {', '.join(names)}) is {settings.CACHES[alias]['BACKEND'].rsplit('.', 1)[-1]}, "
+            "which isn't shared between worker processes.",
+            hint="Set ANALYTICS_CACHE_URL to a redis:// URL so every worker sees the same cached state.",
+            id='core.W001',
+        )
+        for alias, names in users.items()
+        if settings.CACHES[alias]['BACKEND'] in PER_PROCESS_BACKENDS
+    ]
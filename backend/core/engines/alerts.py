@@ -0,0 +1,177 @@
+"""
+Event-driven alert evaluation.
+
+Transaction writes report the (category id, date) pairs of the expenses they
+touched. A bulk import reports all of its rows at once, so each batch is
+evaluated once instead of once per row. A batch only patches what it
+touched: the weekly category totals of the touched weeks
+(spending.sync_weeks), the running `spent` of the budgets whose period
+covers a touched date, and the Alert rows of those budgets and of the
+categories whose current week or baseline changed. Folding closed weeks into
+the baselines is left to the first read of the new week (close_weeks) and
+the refresh_alerts command. Reading alerts is then a plain query on Alert.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .. import versioned_cache
+from ..models import Alert, Budget, SpendingBaseline, SpendingBaselineState, Transaction, WeeklyCategorySpend
+from . import budgets as budget_progress
+from . import spending
+
+# Warn once this share of a budget has been spent
+BUDGET_WARNING_RATIO = Decimal('0.9')
+CENTS = Decimal('0.01')
+
+
+def budget_message(budget):
+    if budget.spent <= 0:
+        return None
+    if budget.spent > budget.amount:
+        return f"You've gone over your '{budget.category.name}' budget by ${budget.spent - budget.amount:,.2f}."
+    if budget.spent >= budget.amount * BUDGET_WARNING_RATIO:
+        return f"You've used {budget.spent / budget.amount:.0%} of your '{budget.category.name}' budget."
+    return None
+
+
+def _store(user_id, existing, found, key):
+    """Make the user's alerts in the `existing` queryset match `found` ({key: unsaved Alert})."""
+    existing = {key(alert): alert for alert in existing}
+    now = timezone.now()
+    to_create, to_update = [], []
+    for k, alert in found.items():
+        current = existing.get(k)
+        if current is None:
+            to_create.append(alert)
+            continue
+        fields = ('category_id', 'period_start', 'amount', 'threshold', 'message')
+        if any(getattr(current, f) != getattr(alert, f) for f in fields):
+            for f in fields:
+                setattr(current, f, getattr(alert, f))
+            current.updated_at = now
+            to_update.append(current)
+    stale = [a.pk for k, a in existing.items() if k not in found]
+    Alert.objects.bulk_create(to_create)
+    Alert.objects.bulk_update(to_update, ['category', 'period_start', 'amount', 'threshold', 'message', 'updated_at'])
+    Alert.objects.filter(pk__in=stale).delete()
+    if to_create or to_update or stale:
+        versioned_cache.bump(user_id, 'alerts')
+
+
+@transaction.atomic(savepoint=False)
+def refresh_budgets(user_id, budgets, today=None):
+    """
+    Recompute `spent` for the given budgets with budgets.actual_spend, the same
+    rollup-backed sum budgets/progress reports, and update their alerts.
+    """
+    budgets = list(budgets.select_related('category'))
+    fresh = budget_progress.actual_spend(user_id, budgets, today or date.today())
+    changed = [b for b in budgets if b.spent != fresh[b.pk]]
+    for budget in changed:
+        budget.spent = fresh[budget.pk]
+    Budget.objects.bulk_update(changed, ['spent'])
+
+    found = {}
+    for budget in budgets:
+        message = budget_message(budget)
+        if message:
+            found[budget.pk] = Alert(
+                user_id=user_id, kind='BUDGET', category_id=budget.category_id, budget=budget,
+                period_start=budget.start_date, amount=budget.spent, threshold=budget.amount, message=message,
+            )
+    existing = Alert.objects.filter(user_id=user_id, kind='BUDGET', budget__in=[b.pk for b in budgets])
+    _store(user_id, existing, found, key=lambda alert: alert.budget_id)
+
+
+def refresh_spending(user_id, category_ids, today):
+    """Compare this week's stored totals for the categories with their baselines."""
+    this_week = spending.week_start(today)
+    current = dict(
+        WeeklyCategorySpend.objects.filter(user_id=user_id, week_start=this_week, category_id__in=category_ids)
+        .values_list('category_id', 'total')
+    )
+    found = {}
+    baselines = SpendingBaseline.objects.filter(
+        user_id=user_id, category_id__in=list(current), weeks__gte=spending.MIN_WEEKS
+    ).select_related('category')
+    for baseline in baselines:
+        spent = current[baseline.category_id]
+        over_amount = spending.over_average(baseline, spent)
+        if over_amount is not None:
+            _, limit = spending.threshold(baseline)
+            found[baseline.category_id] = Alert(
+                user_id=user_id, kind='SPENDING', category_id=baseline.category_id, period_start=this_week,
+                amount=spent, threshold=Decimal(str(limit)).quantize(CENTS),
+                message=spending.alert_message(baseline.category.name, over_amount),
+            )
+    existing = Alert.objects.filter(user_id=user_id, kind='SPENDING', period_start=this_week, category_id__in=category_ids)
+    _store(user_id, existing, found, key=lambda alert: alert.category_id)
+
+
+def process(user_id, touched, today=None):
+    """
+    Evaluate one batch of writes. `touched` holds the (category id, date)
+    pairs of every expense created, changed (old and new values) or deleted.
+    """
+    touched = {(category_id, day) for category_id, day in touched if category_id is not None}
+    if not touched:
+        return
+    today = today or date.today()
+    this_week = spending.week_start(today)
+    categories = {category_id for category_id, _ in touched}
+    dates = [day for _, day in touched]
+    weeks = {(category_id, spending.week_start(day)) for category_id, day in touched}
+
+    with transaction.atomic():
+        rebased = spending.sync_weeks(user_id, weeks)
+        refresh_budgets(user_id, Budget.objects.filter(
+            user_id=user_id, category_id__in=categories, start_date__lte=max(dates), end_date__gte=min(dates),
+        ), today)
+        # Only this week's totals and the baselines feed the spending alerts
+        checked = {category_id for category_id, week in weeks if week == this_week} | rebased
+        if checked:
+            refresh_spending(user_id, checked, today)
+
+
+def close_weeks(user, today):
+    """
+    Fold the weeks that closed since the last fold into the user's baselines
+    and re-check this week's spending against them. A single query once the
+    current week has been handled.
+    """
+    last_closed = spending.week_start(today) - timedelta(weeks=1)
+    if SpendingBaselineState.objects.filter(user=user, through_week=last_closed).exists():
+        return
+    with transaction.atomic():
+        spending.refresh_baselines(user, today)
+        categories = WeeklyCategorySpend.objects.filter(
+            user=user, week_start=spending.week_start(today)
+        ).values_list('category_id', flat=True)
+        refresh_spending(user.pk, list(categories), today)
+
+
+def evaluate_user(user, today=None):
+    """Re-evaluate everything for a user: baselines, this week's categories and every budget."""
+    today = today or date.today()
+    touched = Transaction.objects.filter(
+        user=user, transaction_type='EXPENSE', category__isnull=False,
+        date__gte=spending.week_start(today), date__lte=today,
+    ).values_list('category_id', 'date').distinct()
+    with transaction.atomic():
+        spending.refresh_baselines(user, today)
+        process(user.id, touched, today)
+        refresh_budgets(user.id, Budget.objects.filter(user=user), today)
+
+
+def active_alerts(user, today):
+    """Alerts for the current week and for budgets that are running today."""
+    alerts = Alert.objects.filter(user=user).filter(
+        Q(kind='SPENDING', period_start=spending.week_start(today))
+        | Q(kind='BUDGET', budget__start_date__lte=today, budget__end_date__gte=today)
+    )
+    # 'SPENDING' sorts after 'BUDGET', so this lists the weekly alerts first like before
+    return alerts.order_by('-kind', 'category__name')
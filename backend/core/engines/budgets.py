@@ -0,0 +1,94 @@
+"""
+Budget progress.
+
+Actual spend for every budget comes from conditional aggregation: each
+budget gets its own filtered SUM. Whole past months inside a budget period
+are summed from the MonthlyCategoryTotal rollup, and only the leftover days
+(the current month and partial months at the edges) from raw transactions.
+That is one query per source, so loading the budgets plus at most two
+aggregates, however many budgets the user has. The alert engine stores the
+same figure in Budget.spent, so progress and budget alerts never disagree.
+"""
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from ..models import Budget, MonthlyCategoryTotal, Transaction
+from . import rollups
+
+CENTS = Decimal('0.01')
+
+
+def actual_spend(user, budgets, today):
+    """{budget id: expense total in the budget's category and period}."""
+    if not budgets:
+        return {}
+    rollup_sums, raw_sums = {}, {}
+    for budget in budgets:
+        rollup_q, raw_q = rollups.range_filters(budget.start_date, budget.end_date, today, budget.category_id)
+        if rollup_q is not None:
+            rollup_sums[f'budget_{budget.pk}'] = Sum('total', filter=rollup_q)
+        if raw_q is not None:
+            raw_sums[f'budget_{budget.pk}'] = Sum('amount', filter=raw_q)
+
+    categories = {budget.category_id for budget in budgets}
+    from_rollup = from_raw = {}
+    if rollup_sums:
+        from_rollup = MonthlyCategoryTotal.objects.filter(
+            user=user, transaction_type='EXPENSE', category_id__in=categories,
+        ).aggregate(**rollup_sums)
+    if raw_sums:
+        from_raw = Transaction.objects.filter(
+            user=user,
+            transaction_type='EXPENSE',
+            category_id__in=categories,
+            date__gte=min(budget.start_date for budget in budgets),
+            date__lte=max(budget.end_date for budget in budgets),
+        ).aggregate(**raw_sums)
+    return {
+        budget.pk: (from_rollup.get(f'budget_{budget.pk}') or Decimal('0'))
+        + (from_raw.get(f'budget_{budget.pk}') or Decimal('0'))
+        for budget in budgets
+    }
+
+
+def projected_spend(spent, start_date, end_date, today):
+    """Straight-line projection of the spend at the end of the period."""
+    if today < start_date:
+        return Decimal('0')
+    if today >= end_date:
+        return spent
+    elapsed = (today - start_date).days + 1
+    total = (end_date - start_date).days + 1
+    return spent * total / elapsed
+
+
+def _percent(part, whole):
+    if whole <= 0:
+        return None
+    return float((part / whole * 100).quantize(CENTS))
+
+
+def progress(user, today):
+    budgets = list(Budget.objects.filter(user=user).select_related('category').order_by('start_date', 'id'))
+    spent = actual_spend(user, budgets, today)
+
+    results = []
+    for budget in budgets:
+        actual = spent[budget.pk]
+        projected = projected_spend(actual, budget.start_date, budget.end_date, today).quantize(CENTS)
+        results.append({
+            'id': budget.id,
+            'category': budget.category_id,
+            'category_name': budget.category.name,
+            'amount': budget.amount,
+            'start_date': budget.start_date,
+            'end_date': budget.end_date,
+            'spent': actual,
+            'remaining': budget.amount - actual,
+            'percent_used': _percent(actual, budget.amount),
+            'projected_spend': projected,
+            'projected_percent': _percent(projected, budget.amount),
+            'on_track': projected <= budget.amount,
+        })
+    return results
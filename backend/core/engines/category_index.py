@@ -0,0 +1,181 @@
+"""
+In-process description index behind category suggestions.
+
+For each user we keep term -> {category id: count} built from their
+categorized transactions, plus a sorted term list for prefix lookups. The
+indexes live in a bounded LRU, so a suggestion on a cache hit never touches
+the database. Single transaction writes patch the cached index in place;
+bulk writes and category changes just drop it.
+
+Each index remembers the user's 'transactions' version (see
+core.versioned_cache) it was built at, so writes handled by another worker
+process are noticed, and the stale index rebuilt, as long as the analytics
+cache is shared by all workers. A commit bumps that version once however
+many rows it wrote, so its patches are applied together: only when the
+version moved by exactly that one bump is the cached index still current.
+"""
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from .. import versioned_cache
+from ..models import Category, Transaction
+
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Lowercased word terms; pure numbers (dates, card digits) are dropped."""
+    return [t for t in _WORD.findall(text.casefold()) if len(t) >= 2 and not t.isdigit()]
+
+
+class DescriptionIndex:
+    def __init__(self, version):
+        self.version = version
+        # Token of the commit whose patches moved the index to `version`
+        self.commit = None
+        self.terms = {}
+        self.category_names = {}
+        self._sorted_terms = None
+
+    def add(self, description, category_id, delta=1):
+        for term in set(tokenize(description)):
+            counts = self.terms.get(term)
+            if counts is None:
+                if delta < 0:
+                    continue
+                counts = self.terms[term] = Counter()
+                self._sorted_terms = None
+            counts[category_id] += delta
+            if counts[category_id] <= 0:
+                del counts[category_id]
+                if not counts:
+                    del self.terms[term]
+                    self._sorted_terms = None
+
+    def _prefix_counts(self, prefix):
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.terms)
+        merged = Counter()
+        i = bisect_left(self._sorted_terms, prefix)
+        while i < len(self._sorted_terms) and self._sorted_terms[i].startswith(prefix):
+            merged.update(self.terms[self._sorted_terms[i]])
+            i += 1
+        return merged
+
+    def suggest(self, query):
+        """Most frequent category across transactions matching every query term (last one as a prefix)."""
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        counters = [self.terms.get(t, Counter()) for t in tokens[:-1]]
+        counters.append(self._prefix_counts(tokens[-1]))
+
+        scores = Counter(counters[0])
+        for counts in counters[1:]:
+            # Only categories that match every term survive, like an AND search
+            scores = Counter({c: scores[c] + counts[c] for c in scores if c in counts})
+        best = max(scores.items(), key=lambda item: (item[1], -item[0]), default=None)
+        if best is None or best[0] not in self.category_names:
+            return None
+        return {'id': best[0], 'name': self.category_names[best[0]]}
+
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+_commit = threading.local()
+
+
+def current_version(user_id):
+    return versioned_cache.versions(user_id, ('transactions',))[0]
+
+
+def _build(user_id, version):
+    index = DescriptionIndex(version)
+    index.category_names = dict(Category.objects.filter(user_id=user_id).values_list('id', 'name'))
+    rows = (
+        Transaction.objects.filter(user_id=user_id, category__isnull=False)
+        .values_list('description', 'category_id')
+        .iterator(chunk_size=5000)
+    )
+    for description, category_id in rows:
+        index.add(description, category_id)
+    return index
+
+
+def get_index(user_id):
+    version = current_version(user_id)
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is not None and index.version == version:
+            _indexes.move_to_end(user_id)
+            return index
+
+    index = _build(user_id, version)
+    with _lock:
+        _indexes[user_id] = index
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > settings.CATEGORY_INDEX_MAX_USERS:
+            _indexes.popitem(last=False)
+    return index
+
+
+def suggest(user_id, description):
+    return get_index(user_id).suggest(description)
+
+
+def _commit_token():
+    # Shared by every write in the current transaction. A rolled back
+    # transaction leaves its token behind for the next one, which is harmless
+    # since none of its patches ran.
+    token = getattr(_commit, 'token', None)
+    if token is None:
+        token = _commit.token = object()
+    return token
+
+
+def apply_change(user_id, old=None, new=None):
+    """
+    Patch the user's cached index for one transaction write once it commits.
+    `old` and `new` are (description, category_id) pairs, or None for a
+    create or delete.
+    """
+    token = _commit_token()
+    transaction.on_commit(lambda: _apply(user_id, token, old, new))
+
+
+def _apply(user_id, token, old, new):
+    if getattr(_commit, 'token', None) is token:
+        _commit.token = None
+    # This commit's bump may still be queued behind us
+    versioned_cache.flush()
+    version = current_version(user_id)
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is None:
+            return
+        if index.commit is token:
+            current = index.version == version
+        else:
+            current = index.version == version - 1
+        unknown_category = new and new[1] is not None and new[1] not in index.category_names
+        if not current or unknown_category:
+            # Missed a write somewhere else; rebuild on the next read
+            del _indexes[user_id]
+            return
+        if old and old[1] is not None:
+            index.add(old[0], old[1], delta=-1)
+        if new and new[1] is not None:
+            index.add(new[0], new[1])
+        index.version, index.commit = version, token
+
+
+def invalidate(user_id):
+    """Drop the user's index here now, and in other processes once the transaction commits."""
+    versioned_cache.bump(user_id, 'transactions')
+    with _lock:
+        _indexes.pop(user_id, None)
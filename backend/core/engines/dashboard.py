@@ -0,0 +1,195 @@
+"""
+Dashboard widgets.
+
+Every widget is a function of a UserData, which loads each piece of a
+user's data (accounts, active subscriptions, recurring income, loans, ...)
+at most once, on first use. GET /api/dashboard/ builds any set of widgets
+from one UserData, so e.g. accounts are read once for the net worth, the
+cash flow forecast and the account list together. The standalone endpoints
+call the same functions, so both return the same payloads.
+
+The analytics widgets are kept in the versioned cache (core.versioned_cache)
+until a write to the data they're derived from, or until the next day.
+"""
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from functools import cached_property
+
+from django.conf import settings
+
+from .. import versioned_cache
+from ..models import Account, Category, Goal, NetWorthSnapshot, Subscription, Transaction
+from ..serializers import (
+    AccountSerializer, CategorySerializer, GoalSerializer, NetWorthSnapshotSerializer, TransactionSerializer,
+)
+from . import alerts, forecast, loan_ledger, portfolio, recurrence
+
+CENTS = Decimal('0.01')
+CASH_ACCOUNT_TYPES = ('CHECKING', 'SAVINGS')
+# Same as the first page of /api/transactions/
+RECENT_TRANSACTIONS = 15
+FORECAST_DAYS = 30
+
+# Holdings are valued at market prices, which move without any write, so
+# net worth is only kept as long as a quote counts as fresh
+NET_WORTH = versioned_cache.Entry('net-worth', ('accounts', 'holdings', 'loans'), timeout=settings.MARKETDATA_QUOTE_TTL)
+CASH_FLOW_FORECAST = versioned_cache.Entry('cash-flow-forecast', ('accounts', 'subscriptions', 'transactions'))
+UPCOMING_BILLS = versioned_cache.Entry('upcoming-bills', ('subscriptions',))
+SPENDING_ALERTS = versioned_cache.Entry('spending-alerts', ('alerts',))
+
+
+class UserData:
+    """Lazily loaded, per-request view of one user's data."""
+
+    def __init__(self, user, today=None):
+        self.user = user
+        self.today = today or date.today()
+
+    @cached_property
+    def accounts(self):
+        return list(Account.objects.filter(user=self.user).order_by('id'))
+
+    @cached_property
+    def cash_balance(self):
+        return sum((a.balance for a in self.accounts if a.account_type in CASH_ACCOUNT_TYPES), Decimal('0'))
+
+    @cached_property
+    def subscriptions(self):
+        """Active subscriptions."""
+        return list(Subscription.objects.filter(user=self.user, is_active=True).order_by('id'))
+
+    @cached_property
+    def recurring_income(self):
+        return list(forecast.latest_recurring_income(self.user))
+
+    @cached_property
+    def loan_checkpoints(self):
+        return loan_ledger.checkpoints_for_user(self.user)
+
+    @cached_property
+    def valuation(self):
+        return portfolio.valuation(self.user, timeout=settings.MARKETDATA_VALUATION_TIMEOUT)
+
+    @cached_property
+    def snapshots(self):
+        return list(NetWorthSnapshot.objects.filter(user=self.user).order_by('date'))
+
+    @cached_property
+    def recent_transactions(self):
+        return list(
+            Transaction.objects.filter(user=self.user).select_related('account').order_by('-date', '-id')[:RECENT_TRANSACTIONS]
+        )
+
+
+def _cents(value):
+    return Decimal(value).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def net_worth(data):
+    return NET_WORTH.get_or_compute(data.user.id, [data.today], lambda: _net_worth(data))
+
+
+def _net_worth(data):
+    """
+    Snapshot history including today. Today's snapshot is only written when
+    it's missing or the numbers moved, so a repeat load doesn't write at all.
+    """
+    assets = sum((a.balance for a in data.accounts), Decimal('0')) + data.valuation['market_value']
+    liabilities = sum(
+        (loan_ledger.project(checkpoint, loan, data.today) for loan, checkpoint in data.loan_checkpoints.items()),
+        Decimal('0')
+    )
+    values = {
+        'total_assets': _cents(assets),
+        'total_liabilities': _cents(liabilities),
+        'net_worth': _cents(assets - liabilities),
+    }
+
+    snapshots = data.snapshots
+    current = next((s for s in snapshots if s.date == data.today), None)
+    if current is None:
+        current = NetWorthSnapshot.objects.create(user=data.user, date=data.today, **values)
+        snapshots = sorted([*snapshots, current], key=lambda s: s.date)
+    elif any(getattr(current, field) != value for field, value in values.items()):
+        NetWorthSnapshot.objects.filter(pk=current.pk).update(**values)
+        for field, value in values.items():
+            setattr(current, field, value)
+    return NetWorthSnapshotSerializer(snapshots, many=True).data
+
+
+def upcoming_bills(data, count=1, horizon=date.max):
+    return UPCOMING_BILLS.get_or_compute(
+        data.user.id, [data.today, count, horizon], lambda: _upcoming_bills(data, count, horizon)
+    )
+
+
+def _upcoming_bills(data, count, horizon):
+    """The next `count` predicted payments of each active subscription up to `horizon`, soonest first."""
+    bills = []
+    for sub in data.subscriptions:
+        for predicted_date in recurrence.occurrences(sub.last_payment_date, sub.cadence, data.today, horizon, limit=count):
+            bills.append({
+                'id': sub.id,
+                'name': sub.name,
+                'estimated_amount': sub.estimated_amount,
+                'cadence': sub.cadence,
+                'predicted_date': predicted_date,
+            })
+    bills.sort(key=lambda bill: bill['predicted_date'])
+    return bills
+
+
+def scheduled_events(data, days):
+    end = data.today + timedelta(days=days)
+    return forecast.scheduled_events(data.user, data.today, end, data.subscriptions, data.recurring_income)
+
+
+def cash_flow_forecast(data, days=FORECAST_DAYS):
+    return CASH_FLOW_FORECAST.get_or_compute(
+        data.user.id, [data.today, 'deterministic', days],
+        lambda: forecast.deterministic_forecast(data.cash_balance, scheduled_events(data, days), data.today, days),
+    )
+
+
+def spending_alerts(data):
+    return SPENDING_ALERTS.get_or_compute(data.user.id, [data.today], lambda: _spending_alerts(data))
+
+
+def _spending_alerts(data):
+    # The first read of a new week folds the closed weeks into the baselines
+    alerts.close_weeks(data.user, data.today)
+    return [alert.message for alert in alerts.active_alerts(data.user, data.today)]
+
+
+def accounts(data):
+    return AccountSerializer(data.accounts, many=True).data
+
+
+def goals(data):
+    return GoalSerializer(Goal.objects.filter(user=data.user).order_by('id'), many=True).data
+
+
+def categories(data):
+    return CategorySerializer(Category.objects.filter(user=data.user).order_by('id'), many=True).data
+
+
+def recent_transactions(data):
+    return TransactionSerializer(data.recent_transactions, many=True).data
+
+
+WIDGETS = {
+    'net_worth': net_worth,
+    'cash_flow_forecast': cash_flow_forecast,
+    'upcoming_bills': upcoming_bills,
+    'spending_alerts': spending_alerts,
+    'accounts': accounts,
+    'goals': goals,
+    'categories': categories,
+    'recent_transactions': recent_transactions,
+}
+
+
+def build(user, widgets=None, today=None):
+    """{widget name: payload} for `widgets` (all of them by default), from one shared UserData."""
+    data = UserData(user, today)
+    return {name: WIDGETS[name](data) for name in (widgets or WIDGETS)}
@@ -0,0 +1,79 @@
+"""
+Transaction fingerprints used to make re-imports idempotent.
+
+A fingerprint hashes (account, date, signed amount, normalized description)
+together with an occurrence ordinal, so two genuine identical purchases on
+the same day get ordinals 0 and 1 instead of being collapsed, while
+re-uploading the same export produces exactly the same fingerprints again.
+"""
+import hashlib
+import re
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+
+_WHITESPACE = re.compile(r'\s+')
+AMOUNT_QUANTUM = Decimal('0.01')
+
+
+def normalize_description(description):
+    return _WHITESPACE.sub(' ', (description or '').casefold()).strip()
+
+
+def base_key(account_id, date, amount, transaction_type, description):
+    amount = Decimal(str(amount)).quantize(AMOUNT_QUANTUM)
+    if transaction_type == 'EXPENSE':
+        amount = -amount
+    if not isinstance(date, str):
+        date = date.isoformat()
+    return f"{account_id}|{date}|{amount}|{normalize_description(description)}"
+
+
+def fingerprint(key, ordinal):
+    return hashlib.sha256(f"{key}|{ordinal}".encode()).hexdigest()
+
+
+def assign_fingerprint(instance):
+    """
+    Give a single Transaction the lowest free ordinal for its base key.
+
+    Used by Transaction.save(); bulk paths number occurrences themselves.
+    The candidate fingerprints are checked with a single IN query.
+    """
+    from ..models import Transaction
+
+    key = base_key(instance.account_id, instance.date, instance.amount,
+                   instance.transaction_type, instance.description)
+    existing = Transaction.objects.exclude(pk=instance.pk) if instance.pk else Transaction.objects.all()
+    start = 0
+    while True:
+        candidates = [fingerprint(key, i) for i in range(start, start + 8)]
+        if instance.fingerprint in candidates:
+            # Still valid for the current field values, keep it stable
+            return
+        taken = set(existing.filter(fingerprint__in=candidates).values_list('fingerprint', flat=True))
+        for candidate in candidates:
+            if candidate not in taken:
+                instance.fingerprint = candidate
+                return
+        start += len(candidates)
+
+
+def save_with_fingerprint(instance, save, *args, attempts=5, **kwargs):
+    """
+    Assign a fingerprint and save(*args, **kwargs). Two concurrent saves of
+    identical rows can both pick the same ordinal; the loser's write hits the
+    unique constraint, so it takes the next free ordinal and tries again.
+    """
+    from ..models import Transaction
+
+    for attempt in range(attempts):
+        assign_fingerprint(instance)
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            clashed = Transaction.objects.filter(fingerprint=instance.fingerprint).exclude(pk=instance.pk).exists()
+            if not clashed or attempt == attempts - 1:
+                raise
+            instance.fingerprint = None
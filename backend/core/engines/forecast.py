@@ -0,0 +1,160 @@
+"""
+Cash flow forecasting.
+
+The deterministic forecast replays predicted bills (active subscriptions at
+their cadence) and recurring income (income descriptions seen at least twice,
+projected monthly unless they have stopped) day by day.
+
+The Monte Carlo forecast runs thousands of paths at once as a
+(paths x days) NumPy matrix. On top of the scheduled events it bootstraps
+daily discretionary spending from the user's recent history and shifts each
+income payment by a random number of days, sized from how irregular that
+source has been. A seeded generator keeps results reproducible.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from statistics import pstdev
+
+import numpy as np
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from ..models import Subscription, Transaction
+from .recurrence import occurrence, occurrences
+from .subscriptions import normalize_description
+
+DISCRETIONARY_LOOKBACK_DAYS = 90
+MAX_INCOME_JITTER_DAYS = 5
+# Income whose next monthly payment is more than this many days overdue has stopped
+INCOME_LAPSE_DAYS = 5
+PERCENTILES = (10, 50, 90)
+
+
+def latest_recurring_income(user):
+    """(description, latest date, amount) for income seen at least twice, in one windowed query."""
+    return Transaction.objects.filter(
+        user=user,
+        transaction_type='INCOME'
+    ).annotate(
+        occurrences=Window(Count('id'), partition_by=[F('description')]),
+        recency=Window(RowNumber(), partition_by=[F('description')], order_by=[F('date').desc(), F('id').desc()]),
+    ).filter(occurrences__gt=1, recency=1).values_list('description', 'date', 'amount')
+
+
+def scheduled_events(user, start, end, subscriptions=None, recurring_income=None):
+    """
+    Predicted bills and income between `start` and `end` as
+    (date, amount, description) tuples; bills have negative amounts.
+    """
+    if subscriptions is None:
+        subscriptions = Subscription.objects.filter(user=user, is_active=True)
+    if recurring_income is None:
+        recurring_income = latest_recurring_income(user)
+
+    events = []
+    for sub in subscriptions:
+        for payment_date in occurrences(sub.last_payment_date, sub.cadence, start, end):
+            events.append((payment_date, -abs(sub.estimated_amount), sub.name))
+    # Simple prediction: assume income occurs monthly on the same day
+    for description, latest_date, amount in recurring_income:
+        if occurrence(latest_date, 'MONTHLY', 1) + timedelta(days=INCOME_LAPSE_DAYS) < start:
+            # e.g. a salary from a previous job
+            continue
+        for income_date in occurrences(latest_date, 'MONTHLY', start, end):
+            events.append((income_date, amount, description))
+    return events
+
+
+def deterministic_forecast(current_balance, events, today, days):
+    """One balance point per day, bucketing the events by day in a single pass."""
+    daily_changes = defaultdict(float)
+    for event_date, amount, _ in events:
+        daily_changes[event_date] += float(amount)
+
+    forecast_data = [{'date': today.strftime('%Y-%m-%d'), 'balance': float(current_balance)}]
+    running_balance = float(current_balance)
+    for i in range(1, days + 1):
+        current_date = today + timedelta(days=i)
+        running_balance += daily_changes.get(current_date, 0)
+        forecast_data.append({'date': current_date.strftime('%Y-%m-%d'), 'balance': running_balance})
+    return forecast_data
+
+
+def discretionary_history(user, today, subscriptions, lookback=DISCRETIONARY_LOOKBACK_DAYS):
+    """
+    Daily discretionary spending over the lookback window, one value per day
+    including the zero days. Payments to known subscriptions are left out
+    because the scheduled events already cover them.
+    """
+    start = today - timedelta(days=lookback)
+    subscription_keys = {normalize_description(sub.name) for sub in subscriptions}
+    totals = np.zeros(lookback, dtype=np.float64)
+    rows = Transaction.objects.filter(
+        user=user, transaction_type='EXPENSE', date__gte=start, date__lt=today
+    ).values_list('date', 'description', 'amount')
+    for spent_on, description, amount in rows:
+        if normalize_description(description) not in subscription_keys:
+            totals[(spent_on - start).days] += float(amount)
+    return totals
+
+
+def income_jitter(user, descriptions, today):
+    """Per-source timing jitter in days: the spread of its gaps over the last year."""
+    dates = defaultdict(list)
+    rows = Transaction.objects.filter(
+        user=user, transaction_type='INCOME', description__in=list(descriptions),
+        date__gte=today - timedelta(days=365),
+    ).order_by('date').values_list('description', 'date')
+    for description, paid_on in rows:
+        dates[description].append(paid_on)
+
+    jitter = {}
+    for description in descriptions:
+        gaps = [(b - a).days for a, b in zip(dates[description], dates[description][1:])]
+        spread = pstdev(gaps) if len(gaps) > 1 else 0
+        jitter[description] = min(int(round(spread)), MAX_INCOME_JITTER_DAYS)
+    return jitter
+
+
+def monte_carlo_forecast(current_balance, events, history, jitter, today, days, paths, seed=None):
+    """
+    Percentile bands of simulated balances.
+
+    `events` are scheduled (date, amount, description) tuples, `history` the
+    daily discretionary spending to bootstrap from and `jitter` the timing
+    spread in days per income description. Like the deterministic forecast,
+    day 0 is the current balance: events dated today are taken as already
+    in it.
+    """
+    rng = np.random.default_rng(seed)
+    changes = np.zeros((paths, days + 1), dtype=np.float64)
+
+    if len(history):
+        # Bootstrap each simulated day from a random historical day
+        changes[:, 1:] -= rng.choice(history, size=(paths, days))
+
+    for event_date, amount, description in events:
+        day = (event_date - today).days
+        if not 1 <= day <= days:
+            continue
+        spread = jitter.get(description, 0) if amount > 0 else 0
+        if spread:
+            # Income that arrives after the horizon simply drops out of that path
+            shifted = day + rng.integers(-spread, spread + 1, size=paths)
+            shifted = np.maximum(shifted, 1)
+            inside = shifted <= days
+            np.add.at(changes, (np.nonzero(inside)[0], shifted[inside]), float(amount))
+        else:
+            changes[:, day] += float(amount)
+
+    balances = float(current_balance) + np.cumsum(changes, axis=1)
+    bands = np.percentile(balances, PERCENTILES, axis=0)
+
+    result = {
+        'dates': [(today + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days + 1)],
+        'paths': paths,
+        'seed': seed,
+    }
+    for percentile, band in zip(PERCENTILES, bands):
+        result[f'p{percentile}'] = np.round(band, 2).tolist()
+    return result
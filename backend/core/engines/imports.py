@@ -0,0 +1,326 @@
+"""
+Streaming CSV import engine for transactions.
+
+The upload is decoded line by line instead of being read into memory, rows
+are validated and written in fixed-size chunks, and every bad row ends up in
+the error report instead of aborting the whole file.
+"""
+import codecs
+import csv
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .. import versioned_cache
+from ..models import Category, ImportJob, Transaction
+from . import alerts, category_index, rollups
+from .fingerprints import base_key, fingerprint
+
+DEFAULT_CHUNK_SIZE = 1000
+# Keep the response small even when a whole file is garbage
+MAX_REPORTED_ERRORS = 500
+
+AMOUNT_QUANTUM = Decimal('0.01')
+# Transaction.amount is max_digits=12, decimal_places=2
+MAX_AMOUNT = Decimal('9999999999.99')
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportReport:
+    rows_processed: int = 0
+    rows_created: int = 0
+    rows_duplicate: int = 0
+    rows_rejected: int = 0
+    errors: list = field(default_factory=list)
+
+    def reject(self, row_number, message):
+        self.rows_rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'error': message})
+
+    def as_dict(self):
+        return {
+            'rows_processed': self.rows_processed,
+            'rows_created': self.rows_created,
+            'rows_duplicate': self.rows_duplicate,
+            'rows_rejected': self.rows_rejected,
+            'errors': self.errors,
+            'errors_truncated': self.rows_rejected > len(self.errors),
+        }
+
+
+def iter_csv_rows(csv_file, encoding='utf-8-sig'):
+    """Yield (line number, row dict) pairs while decoding the file incrementally."""
+    # UploadedFile iterates over lines read chunk by chunk, so the whole
+    # file is never held in memory at once.
+    reader = csv.DictReader(codecs.iterdecode(csv_file, encoding))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def parse_row(row):
+    """Turn one bank export row into Transaction field values, or raise RowError."""
+    description = (row.get('Description') or '').strip()
+    if not description:
+        raise RowError('Description is required.')
+    if len(description) > 255:
+        raise RowError('Description is longer than 255 characters.')
+
+    raw_amount = (row.get('Amount') or '').strip().replace(',', '')
+    try:
+        amount = Decimal(raw_amount)
+    except InvalidOperation:
+        raise RowError(f"Invalid amount '{raw_amount}'.")
+    if not amount.is_finite() or amount.quantize(AMOUNT_QUANTUM) != amount:
+        raise RowError(f"Invalid amount '{raw_amount}'.")
+    if abs(amount) > MAX_AMOUNT:
+        raise RowError(f"Amount '{raw_amount}' is too large.")
+
+    raw_date = (row.get('Date') or '').strip()
+    try:
+        parsed_date = parse_date(raw_date)
+    except ValueError:
+        parsed_date = None
+    if parsed_date is None:
+        raise RowError(f"Invalid date '{raw_date}', expected YYYY-MM-DD.")
+
+    category_name = (row.get('Category') or '').strip()
+    if len(category_name) > 100:
+        raise RowError('Category is longer than 100 characters.')
+
+    return {
+        'description': description,
+        'amount': abs(amount),
+        'transaction_type': 'INCOME' if amount > 0 else 'EXPENSE',
+        'date': parsed_date,
+        'category_name': category_name,
+    }
+
+
+class TransactionImporter:
+    """
+    Imports rows into a single account.
+
+    Categories are resolved from a per-user lowercase name -> id map that is
+    loaded once; names missing from the map are created once per chunk.
+    Each chunk is written with bulk_create inside its own transaction. If a
+    concurrent import of the same rows commits some of them first, those
+    count as duplicates and the rest of the chunk is retried; any other
+    database error stops the import, keeping the chunks already written.
+
+    Rows whose fingerprint already exists are skipped as duplicates, so
+    uploading an overlapping export twice is harmless. Occurrence ordinals
+    are counted across the whole file, and existing fingerprints are looked
+    up with one IN query per chunk.
+    """
+
+    def __init__(self, account, chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None):
+        self.account = account
+        self.user = account.user
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+        self.report = ImportReport()
+        self._category_ids = None
+        self._occurrences = {}
+        # (category id, date) of the imported expenses, evaluated for alerts once at the end
+        self._touched = set()
+
+    def run(self, rows):
+        """
+        Import an iterable of (line number, row dict) pairs. If reading fails
+        part way through (e.g. undecodable bytes mid-file), the rows read so
+        far are still saved before the error propagates, and self.report
+        says what made it in.
+        """
+        chunk = []
+        try:
+            for row_number, row in rows:
+                self.report.rows_processed += 1
+                try:
+                    chunk.append((row_number, parse_row(row)))
+                except RowError as e:
+                    self.report.reject(row_number, str(e))
+                if len(chunk) >= self.chunk_size:
+                    pending, chunk = chunk, []
+                    self._flush(pending)
+        finally:
+            if chunk:
+                self._flush(chunk)
+            self._finish()
+        return self.report
+
+    def _finish(self):
+        if self.report.rows_created:
+            # bulk_create skips the signals that keep the suggestion index current
+            category_index.invalidate(self.user.id)
+        if self._touched:
+            alerts.process(self.user.id, self._touched)
+
+    def run_csv(self, csv_file):
+        return self.run(iter_csv_rows(csv_file))
+
+    def _load_categories(self):
+        if self._category_ids is None:
+            self._category_ids = {}
+            # Keep the first id seen for a name, like get_or_create(name__iexact=...) would
+            for category_id, name in Category.objects.filter(user=self.user).order_by('id').values_list('id', 'name'):
+                self._category_ids.setdefault(name.lower(), category_id)
+        return self._category_ids
+
+    def _resolve_categories(self, chunk):
+        category_ids = self._load_categories()
+        missing = {}
+        for _, data in chunk:
+            name = data['category_name']
+            if name and name.lower() not in category_ids:
+                missing.setdefault(name.lower(), name)
+        if missing:
+            created = Category.objects.bulk_create(
+                [Category(user=self.user, name=name) for name in missing.values()]
+            )
+            if any(c.pk is None for c in created):
+                # Backends that don't return ids from bulk_create
+                created = Category.objects.filter(user=self.user, name__in=missing.values())
+            for category in created:
+                category_ids.setdefault(category.name.lower(), category.pk)
+        return category_ids
+
+    def _fingerprint(self, data):
+        key = base_key(self.account.id, data['date'], data['amount'],
+                       data['transaction_type'], data['description'])
+        ordinal = self._occurrences.get(key, 0)
+        self._occurrences[key] = ordinal + 1
+        return fingerprint(key, ordinal)
+
+    def _build(self, data, category_ids):
+        name = data['category_name']
+        return Transaction(
+            account=self.account,
+            user=self.user,
+            description=data['description'],
+            amount=data['amount'],
+            transaction_type=data['transaction_type'],
+            date=data['date'],
+            category_id=category_ids.get(name.lower()) if name else None,
+            fingerprint=data['fingerprint'],
+        )
+
+    def _skip_existing(self, chunk):
+        existing = set(
+            Transaction.objects.filter(fingerprint__in=[data['fingerprint'] for _, data in chunk])
+            .values_list('fingerprint', flat=True)
+        )
+        self.report.rows_duplicate += sum(1 for _, data in chunk if data['fingerprint'] in existing)
+        return [(row_number, data) for row_number, data in chunk if data['fingerprint'] not in existing]
+
+    def _flush(self, chunk):
+        for _, data in chunk:
+            data['fingerprint'] = self._fingerprint(data)
+        chunk = self._skip_existing(chunk)
+
+        while True:
+            try:
+                with transaction.atomic():
+                    category_ids = self._resolve_categories(chunk)
+                    objs = [self._build(data, category_ids) for _, data in chunk]
+                    Transaction.objects.bulk_create(objs)
+                    rollups.apply(rollups.deltas_for(objs, self.user.id))
+                    # bulk_create sends no signals
+                    versioned_cache.bump(self.user.id, 'transactions')
+                break
+            except IntegrityError:
+                # Categories created inside the failed chunk were rolled back too
+                self._category_ids = None
+                # A concurrent import of the same rows got some of them in
+                # first: those are duplicates, the rest are saved on retry
+                remaining = self._skip_existing(chunk)
+                if len(remaining) == len(chunk):
+                    raise
+                chunk = remaining
+
+        self.report.rows_created += len(objs)
+        self._touched.update((t.category_id, t.date) for t in objs if t.transaction_type == 'EXPENSE')
+        if self.on_progress:
+            self.on_progress(self.report)
+
+
+# --- Background jobs ---
+
+def reclaim_stale_jobs(now=None):
+    """
+    Requeue RUNNING jobs whose worker stopped sending heartbeats (it crashed
+    or was killed), or fail them once they've used up their attempts.
+    Re-running a job is safe: rows it already saved are skipped as duplicates.
+    """
+    now = now or timezone.now()
+    stale = ImportJob.objects.filter(
+        status='RUNNING', heartbeat_at__lt=now - timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS)
+    )
+    requeued = stale.filter(attempts__lt=settings.IMPORT_JOB_MAX_ATTEMPTS).update(status='PENDING', heartbeat_at=None)
+    failed = 0
+    for job in stale.filter(attempts__gte=settings.IMPORT_JOB_MAX_ATTEMPTS):
+        failed += ImportJob.objects.filter(pk=job.pk, status='RUNNING', heartbeat_at=job.heartbeat_at).update(
+            status='FAILED', finished_at=now,
+            error_message=f'The import worker stopped responding {job.attempts} times; giving up.',
+        )
+        job.file.delete(save=False)
+    return requeued, failed
+
+
+def claim_next_job():
+    """Atomically move the oldest pending job to RUNNING and return it, or None."""
+    reclaim_stale_jobs()
+    for job in ImportJob.objects.filter(status='PENDING').order_by('created_at')[:10]:
+        # The conditional update makes sure two workers never pick the same job
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(pk=job.pk, status='PENDING').update(
+            status='RUNNING', started_at=now, heartbeat_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def process_import_job(job, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Run a claimed job, writing progress back to its row after every chunk."""
+    def save_progress(report):
+        ImportJob.objects.filter(pk=job.pk).update(
+            rows_processed=report.rows_processed,
+            rows_created=report.rows_created,
+            rows_duplicate=report.rows_duplicate,
+            rows_rejected=report.rows_rejected,
+            heartbeat_at=timezone.now(),
+        )
+
+    importer = TransactionImporter(job.account, chunk_size=chunk_size, on_progress=save_progress)
+    try:
+        with job.file.open('rb') as csv_file:
+            report = importer.run_csv(csv_file)
+    except Exception as e:
+        report = importer.report
+        job.status = 'FAILED'
+        job.error_message = str(e)
+    else:
+        job.status = 'DONE'
+
+    job.rows_processed = report.rows_processed
+    job.rows_created = report.rows_created
+    job.rows_duplicate = report.rows_duplicate
+    job.rows_rejected = report.rows_rejected
+    job.errors = report.errors
+    job.finished_at = timezone.now()
+    # The upload is no longer needed once its rows are in the database
+    job.file.delete(save=False)
+    job.save()
+    return job
@@ -0,0 +1,122 @@
+"""
+Incremental loan balance ledger.
+
+Interest accrues daily on a positive balance between events and is added to
+the balance (the same model the net worth page has always used). Every
+disbursement and payment stores the running balance right after it, and
+LoanBalance keeps the state after the last event. When an event changes,
+the ledger resumes from the last event before the affected date instead of
+replaying the loan's whole history.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+
+from .. import versioned_cache
+from ..models import Loan, LoanBalance, LoanDisbursement, LoanPayment
+
+ZERO = Decimal('0')
+
+# Same-day disbursements are applied before payments
+DISBURSEMENT, PAYMENT = 0, 1
+
+
+def daily_rate(loan):
+    return Decimal(str(loan.interest_rate)) / 100 / 365
+
+
+def accrue(balance, rate, days):
+    """Interest on `balance` over `days` days; nothing accrues on a non-positive balance."""
+    if days > 0 and balance > 0:
+        return balance * rate * days
+    return ZERO
+
+
+def _event_key(event):
+    return (event.date, DISBURSEMENT if isinstance(event, LoanDisbursement) else PAYMENT, event.id)
+
+
+def _resume_point(loan, from_date):
+    """
+    The last event strictly before `from_date`, None if there is none, or
+    False if that event has never been through the ledger.
+    """
+    if from_date is None:
+        return None
+    candidates = [
+        LoanDisbursement.objects.filter(loan=loan, date__lt=from_date).order_by('-date', '-id').first(),
+        LoanPayment.objects.filter(loan=loan, date__lt=from_date).order_by('-date', '-id').first(),
+    ]
+    candidates = [c for c in candidates if c is not None]
+    if not candidates:
+        return None
+    start = max(candidates, key=_event_key)
+    return start if start.running_balance is not None else False
+
+
+@transaction.atomic
+def rebuild(loan, from_date=None):
+    """
+    Re-derive running balances for events on or after `from_date` and refresh
+    the loan's checkpoint. With no `from_date` the whole history is replayed.
+    """
+    start = _resume_point(loan, from_date)
+    if start is False:
+        # Earlier events have never been through the ledger; replay everything
+        from_date, start = None, None
+
+    disbursements = LoanDisbursement.objects.filter(loan=loan)
+    payments = LoanPayment.objects.filter(loan=loan)
+    if from_date is not None:
+        disbursements = disbursements.filter(date__gte=from_date)
+        payments = payments.filter(date__gte=from_date)
+    disbursements, payments = list(disbursements), list(payments)
+    events = sorted(disbursements + payments, key=_event_key)
+
+    if start is not None:
+        balance, interest, last_date = start.running_balance, start.running_interest, start.date
+    else:
+        balance, interest, last_date = ZERO, ZERO, events[0].date if events else None
+
+    rate = daily_rate(loan)
+    for event in events:
+        accrued = accrue(balance, rate, (event.date - last_date).days)
+        balance += accrued
+        interest += accrued
+        balance += event.amount if isinstance(event, LoanDisbursement) else -event.amount
+        last_date = event.date
+        event.running_balance = balance
+        event.running_interest = interest
+
+    LoanDisbursement.objects.bulk_update(disbursements, ['running_balance', 'running_interest'])
+    LoanPayment.objects.bulk_update(payments, ['running_balance', 'running_interest'])
+
+    checkpoint, _ = LoanBalance.objects.update_or_create(
+        loan=loan,
+        defaults={'balance': balance, 'accrued_interest': interest, 'as_of_date': last_date},
+    )
+    versioned_cache.bump(loan.user_id, 'loans')
+    return checkpoint
+
+
+def project(checkpoint, loan, on_date=None):
+    """Balance owed on `on_date`, accruing interest forward from the checkpoint."""
+    if checkpoint.as_of_date is None:
+        return ZERO
+    on_date = on_date or date.today()
+    balance = checkpoint.balance
+    balance += accrue(balance, daily_rate(loan), (on_date - checkpoint.as_of_date).days)
+    return balance if balance > 0 else ZERO
+
+
+def checkpoints_for_user(user):
+    """Return {loan: checkpoint} for all of a user's loans, building any that are missing."""
+    loans = list(Loan.objects.filter(user=user).select_related('balance_checkpoint'))
+    result = {}
+    for loan in loans:
+        try:
+            result[loan] = loan.balance_checkpoint
+        except LoanBalance.DoesNotExist:
+            result[loan] = rebuild(loan)
+    return result
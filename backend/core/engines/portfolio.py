@@ -0,0 +1,91 @@
+"""
+Portfolio valuation.
+
+All of a user's holdings are loaded in one query and the distinct symbols
+are priced in one batched call to the market data client (cached,
+concurrent on misses). Holdings whose symbol can't be priced are carried
+at cost basis and flagged, so totals such as net worth never drop to zero
+just because the quote provider is unavailable. Passing `timeout` bounds
+how long a cold cache can hold the valuation up: symbols not priced by then
+are carried at cost basis too, and their quotes keep loading in the
+background for the next call.
+"""
+from decimal import Decimal
+
+from .. import marketdata
+from ..models import Holding
+
+CENTS = Decimal('0.01')
+
+
+def _weight(part, total):
+    return round(float(part / total), 4) if total else 0.0
+
+
+def _gain_pct(gain, cost):
+    return round(float(gain / cost * 100), 2) if cost else None
+
+
+def valuation(user, client=None, timeout=None):
+    holdings = list(
+        Holding.objects.filter(investment_account__user=user)
+        .select_related('investment_account')
+        .order_by('investment_account_id', 'id')
+    )
+    quotes = {}
+    if holdings:
+        client = client or marketdata.get_client()
+        quotes, _ = client.get_quotes({holding.symbol for holding in holdings}, timeout=timeout)
+
+    rows, accounts = [], {}
+    for holding in holdings:
+        quote = quotes.get(holding.symbol.strip().upper())
+        if quote is not None:
+            market_value = (holding.shares * quote.price).quantize(CENTS)
+        else:
+            market_value = holding.cost_basis
+        gain = market_value - holding.cost_basis
+        rows.append({
+            'id': holding.id,
+            'investment_account': holding.investment_account_id,
+            'symbol': holding.symbol,
+            'shares': holding.shares,
+            'price': quote.price if quote else None,
+            'priced': quote is not None,
+            'stale': quote.stale if quote else False,
+            'cost_basis': holding.cost_basis,
+            'market_value': market_value,
+            'unrealized_gain': gain,
+            'unrealized_gain_percent': _gain_pct(gain, holding.cost_basis),
+        })
+
+        account = accounts.get(holding.investment_account_id)
+        if account is None:
+            account = accounts[holding.investment_account_id] = {
+                'id': holding.investment_account_id,
+                'name': holding.investment_account.name,
+                'brokerage': holding.investment_account.brokerage,
+                'cost_basis': Decimal('0'),
+                'market_value': Decimal('0'),
+            }
+        account['cost_basis'] += holding.cost_basis
+        account['market_value'] += market_value
+
+    total_cost = sum((row['cost_basis'] for row in rows), Decimal('0'))
+    total_value = sum((row['market_value'] for row in rows), Decimal('0'))
+    for row in rows:
+        row['weight'] = _weight(row['market_value'], total_value)
+    for account in accounts.values():
+        account['unrealized_gain'] = account['market_value'] - account['cost_basis']
+        account['unrealized_gain_percent'] = _gain_pct(account['unrealized_gain'], account['cost_basis'])
+        account['weight'] = _weight(account['market_value'], total_value)
+
+    return {
+        'market_value': total_value,
+        'cost_basis': total_cost,
+        'unrealized_gain': total_value - total_cost,
+        'unrealized_gain_percent': _gain_pct(total_value - total_cost, total_cost),
+        'unpriced_symbols': sorted({row['symbol'] for row in rows if not row['priced']}),
+        'accounts': list(accounts.values()),
+        'holdings': rows,
+    }
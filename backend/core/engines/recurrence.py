@@ -0,0 +1,59 @@
+"""
+Recurring dates.
+
+Occurrence n of a schedule is always computed from its anchor date
+(anchor + n * step), so finding the next one is a bit of arithmetic instead
+of stepping forward period by period. Month-based cadences clamp to the
+end of shorter months without drifting: a bill on the 31st falls on
+Feb 28th and is back on Mar 31st the month after.
+"""
+from math import ceil
+
+from dateutil.relativedelta import relativedelta
+
+# Cadence -> (unit, size); same names as Subscription.CADENCES
+STEPS = {
+    'WEEKLY': ('days', 7),
+    'BIWEEKLY': ('days', 14),
+    'MONTHLY': ('months', 1),
+    'QUARTERLY': ('months', 3),
+    'ANNUAL': ('months', 12),
+}
+
+
+def occurrence(anchor, cadence, n):
+    """The n-th occurrence after `anchor` (n=0 is the anchor itself)."""
+    unit, size = STEPS[cadence]
+    return anchor + relativedelta(**{unit: n * size})
+
+
+def next_index(anchor, cadence, on_or_after):
+    """Smallest n >= 1 whose occurrence falls on or after `on_or_after`."""
+    unit, size = STEPS[cadence]
+    if unit == 'days':
+        n = ceil((on_or_after - anchor).days / size)
+    else:
+        months = (on_or_after.year - anchor.year) * 12 + on_or_after.month - anchor.month
+        n = ceil(months / size)
+    n = max(n, 1)
+    # Clamping to a shorter month can land just before the target
+    if occurrence(anchor, cadence, n) < on_or_after:
+        n += 1
+    return n
+
+
+def next_occurrence(anchor, cadence, on_or_after):
+    return occurrence(anchor, cadence, next_index(anchor, cadence, on_or_after))
+
+
+def occurrences(anchor, cadence, start, end, limit=None):
+    """Occurrences after `anchor` within [start, end], at most `limit` of them."""
+    n = next_index(anchor, cadence, start)
+    found = []
+    while limit is None or len(found) < limit:
+        when = occurrence(anchor, cadence, n)
+        if when > end:
+            break
+        found.append(when)
+        n += 1
+    return found
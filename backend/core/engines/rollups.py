@@ -0,0 +1,170 @@
+"""
+Monthly per-category transaction totals.
+
+MonthlyCategoryTotal holds the sum and row count of a user's transactions
+per (category, month, type), with a NULL category for uncategorized rows.
+Writes keep it current inside their own database transaction: single row
+saves and deletes through signals, CSV imports once per chunk. Readers take
+whole past months from the rollup and only scan raw rows for the days the
+rollup can't answer, i.e. the current month and partial months at the edges
+of a date range.
+
+`rebuild` and `verify` recompute the totals from raw rows, for the
+management command and for writes that bypass signals (queryset.update()).
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from ..models import MonthlyCategoryTotal, Transaction
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add(deltas, user_id, category_id, day, transaction_type, amount, sign=1):
+    """Accumulate one row's contribution into `deltas`."""
+    key = (user_id, category_id, month_start(day), transaction_type)
+    total, count = deltas.get(key, (Decimal('0'), 0))
+    deltas[key] = (total + sign * amount, count + sign)
+
+
+def deltas_for(transactions, user_id):
+    deltas = {}
+    for t in transactions:
+        add(deltas, user_id, t.category_id, t.date, t.transaction_type, t.amount)
+    return deltas
+
+
+def _locked_rows(keys):
+    users = {key[0] for key in keys}
+    months = {key[2] for key in keys}
+    return {
+        (row.user_id, row.category_id, row.month, row.transaction_type): row
+        for row in MonthlyCategoryTotal.objects.select_for_update().filter(user_id__in=users, month__in=months)
+    }
+
+
+@transaction.atomic
+def apply(deltas):
+    """Add {(user id, category id, month, type): (amount, count)} deltas to the stored totals."""
+    deltas = {key: value for key, value in deltas.items() if value != (0, 0)}
+    if not deltas:
+        return
+    rows = _locked_rows(deltas)
+    while missing := deltas.keys() - rows.keys():
+        # A concurrent first write may insert the same key between our read
+        # and our insert: skip the conflicting rows and add to the winner's
+        MonthlyCategoryTotal.objects.bulk_create([
+            MonthlyCategoryTotal(
+                user_id=user_id, category_id=category_id, month=month,
+                transaction_type=transaction_type, total=0, count=0,
+            )
+            for user_id, category_id, month, transaction_type in missing
+        ], ignore_conflicts=True)
+        rows.update(_locked_rows(missing))
+
+    to_update, to_delete = [], []
+    for key, (amount, count) in deltas.items():
+        row = rows[key]
+        row.total += amount
+        row.count += count
+        if row.count <= 0:
+            to_delete.append(row.pk)
+        else:
+            to_update.append(row)
+    MonthlyCategoryTotal.objects.bulk_update(to_update, ['total', 'count'])
+    if to_delete:
+        MonthlyCategoryTotal.objects.filter(pk__in=to_delete).delete()
+
+
+@transaction.atomic
+def uncategorize(category):
+    """Move a category's totals to the uncategorized bucket, as deleting it sets its transactions' category to NULL."""
+    deltas = {}
+    for row in MonthlyCategoryTotal.objects.filter(category=category):
+        deltas[(row.user_id, None, row.month, row.transaction_type)] = (row.total, row.count)
+        deltas[(row.user_id, category.pk, row.month, row.transaction_type)] = (-row.total, -row.count)
+    apply(deltas)
+
+
+def raw_totals(user):
+    """{(category id, month, type): (total, count)} straight from the transactions table."""
+    rows = (
+        Transaction.objects.filter(user=user)
+        .annotate(month=TruncMonth('date'))
+        .values('category_id', 'month', 'transaction_type')
+        .annotate(month_total=Sum('amount'), month_count=Count('id'))
+    )
+    return {
+        (row['category_id'], row['month'], row['transaction_type']): (row['month_total'], row['month_count'])
+        for row in rows
+    }
+
+
+def stored_totals(user):
+    return {
+        (row.category_id, row.month, row.transaction_type): (row.total, row.count)
+        for row in MonthlyCategoryTotal.objects.filter(user=user)
+    }
+
+
+def verify(user):
+    """Keys whose stored (total, count) differs from the raw rows, with both values."""
+    raw, stored = raw_totals(user), stored_totals(user)
+    return {
+        key: (stored.get(key), raw.get(key))
+        for key in raw.keys() | stored.keys()
+        if raw.get(key) != stored.get(key)
+    }
+
+
+@transaction.atomic
+def rebuild(user):
+    MonthlyCategoryTotal.objects.filter(user=user).delete()
+    MonthlyCategoryTotal.objects.bulk_create([
+        MonthlyCategoryTotal(
+            user=user, category_id=category_id, month=month,
+            transaction_type=transaction_type, total=total, count=count,
+        )
+        for (category_id, month, transaction_type), (total, count) in raw_totals(user).items()
+    ])
+
+
+def split_range(start, end, today):
+    """
+    Split [start, end] into (first month, last month) of the whole months the
+    rollup can answer, and the leftover (start, end) day ranges that need raw
+    rows. Months from the current one onwards are never taken from the rollup.
+    """
+    first = month_start(start) if start.day == 1 else month_start(start) + relativedelta(months=1)
+    last_exclusive = min(month_start(end + timedelta(days=1)), month_start(today))
+    if first >= last_exclusive:
+        return None, [(start, end)]
+    raw = []
+    if start < first:
+        raw.append((start, first - timedelta(days=1)))
+    if last_exclusive <= end:
+        raw.append((last_exclusive, end))
+    return (first, last_exclusive - relativedelta(months=1)), raw
+
+
+def range_filters(start, end, today, category_id=None):
+    """(rollup Q, raw Q) that together cover category spend over [start, end]; either may be None."""
+    months, raw_ranges = split_range(start, end, today)
+    rollup_q = raw_q = None
+    if months:
+        rollup_q = Q(month__gte=months[0], month__lte=months[1])
+    for low, high in raw_ranges:
+        part = Q(date__gte=low, date__lte=high)
+        raw_q = part if raw_q is None else raw_q | part
+    if category_id is not None:
+        rollup_q = rollup_q & Q(category_id=category_id) if rollup_q is not None else None
+        raw_q = raw_q & Q(category_id=category_id) if raw_q is not None else None
+    return rollup_q, raw_q
+
@@ -0,0 +1,84 @@
+"""
+Round-ups.
+
+Each run rounds every new expense in the source account up to the next
+whole unit and moves the difference to the target account. The total,
+the number of rounded items and the highest id seen come from one SQL
+aggregate over SUM(CEIL(amount) - amount). The profile keeps that id as a
+high-water mark, so a run never double counts or skips rows, even within a
+single day. The profile row is locked for the run and both transfer rows
+are written in the same transaction, flagged as round_up_transfer so later
+runs skip them. They are bulk-created, so the per-row signal work is done
+once here instead: both rows are uncategorized, leaving only the monthly
+rollup and the cache version to update.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum
+from django.db.models.functions import Ceil
+from django.utils import timezone
+
+from .. import versioned_cache
+from ..models import Transaction, UserProfile
+from . import rollups
+from .fingerprints import assign_fingerprint
+
+TRANSFER_DESCRIPTION = 'Round-up Transfer'
+SAVINGS_DESCRIPTION = 'Round-up Savings'
+CENTS = Decimal('0.01')
+
+
+def is_configured(profile):
+    return bool(profile.round_ups_enabled and profile.round_up_source_account_id and profile.round_up_target_account_id)
+
+
+def eligible_transactions(profile):
+    return Transaction.objects.filter(
+        account_id=profile.round_up_source_account_id,
+        transaction_type='EXPENSE',
+        id__gt=profile.last_round_up_transaction_id,
+        # The transfer out of the source account is an expense itself; don't round it up again
+        round_up_transfer=False,
+    )
+
+
+@transaction.atomic
+def run(profile, today=None):
+    """Round up the profile's new expenses. Returns (total, items), or None when round-ups aren't configured."""
+    profile = UserProfile.objects.select_for_update().get(pk=profile.pk)
+    if not is_configured(profile):
+        return None
+    today = today or timezone.localdate()
+
+    cents = ExpressionWrapper(Ceil('amount') - F('amount'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    result = eligible_transactions(profile).aggregate(
+        total=Sum(cents),
+        items=Count('id', filter=Q(amount__lt=Ceil('amount'))),
+        last_id=Max('id'),
+    )
+    total = (result['total'] or Decimal('0')).quantize(CENTS)
+    items = result['items']
+
+    if total > 0:
+        transfers = [
+            Transaction(
+                account_id=account_id, user_id=profile.user_id, description=f"{description} ({items} items)",
+                amount=total, transaction_type=transaction_type, date=today, round_up_transfer=True,
+            )
+            for account_id, description, transaction_type in [
+                (profile.round_up_source_account_id, TRANSFER_DESCRIPTION, 'EXPENSE'),
+                (profile.round_up_target_account_id, SAVINGS_DESCRIPTION, 'INCOME'),
+            ]
+        ]
+        for transfer in transfers:
+            assign_fingerprint(transfer)
+        Transaction.objects.bulk_create(transfers)
+        # bulk_create sends no signals
+        rollups.apply(rollups.deltas_for(transfers, profile.user_id))
+        versioned_cache.bump(profile.user_id, 'transactions')
+    if result['last_id']:
+        profile.last_round_up_transaction_id = result['last_id']
+    profile.last_round_up_run = timezone.now()
+    profile.save(update_fields=['last_round_up_transaction_id', 'last_round_up_run'])
+    return total, items
@@ -0,0 +1,269 @@
+"""
+Weekly spending baselines and anomaly alerts.
+
+Weekly per-category totals are computed in SQL (TruncWeek + GROUP BY) and
+stored in WeeklyCategorySpend. SpendingBaseline keeps the count, sum and sum
+of squares of the closed weeks' totals over the user's rolling lookback
+window. When new weeks close, their totals are added and the weeks that slid
+out of the window are subtracted, so evaluating alerts only touches one row
+per category. Folding happens on the first read after a week closes (and in
+the refresh_alerts command), never on the write path. Transaction writes
+keep the touched weeks current through sync_weeks, including late edits to
+weeks already folded into a baseline.
+
+Weekly totals are stored for the longest allowed lookback, so evaluating with
+a different lookback than the persisted one sums the stored weeks instead of
+rebuilding the baselines.
+"""
+import math
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncWeek
+
+from ..models import Category, SpendingBaseline, SpendingBaselineState, Transaction, WeeklyCategorySpend
+
+DEFAULT_LOOKBACK_WEEKS = 13
+MAX_LOOKBACK_WEEKS = 52
+DEFAULT_SIGMA = 2.0
+# Need at least this many weeks of spending for a meaningful average
+MIN_WEEKS = 4
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def weekly_totals(user, start, end, category_ids=None):
+    """{(category id, week start): total} for categorized expenses in [start, end)."""
+    rows = Transaction.objects.filter(
+        user=user, transaction_type='EXPENSE', category__isnull=False,
+        date__gte=start, date__lt=end,
+    )
+    if category_ids is not None:
+        rows = rows.filter(category_id__in=list(category_ids))
+    rows = (
+        rows.annotate(week=TruncWeek('date'))
+        .values('category_id', 'week')
+        .annotate(total=Sum('amount'))
+    )
+    return {(row['category_id'], row['week']): row['total'] for row in rows}
+
+
+def _apply(baselines, user_id, week_rows, sign):
+    for category_id, total in week_rows:
+        baseline = baselines.get(category_id)
+        if baseline is None:
+            baseline = baselines[category_id] = SpendingBaseline(user_id=user_id, category_id=category_id)
+        value = float(total)
+        baseline.weeks += sign
+        baseline.total += sign * value
+        baseline.total_sq += sign * value * value
+
+
+def _store_weeks(user, start, end):
+    """Replace the stored weekly totals in [start, end) with fresh ones from SQL."""
+    WeeklyCategorySpend.objects.filter(user=user, week_start__gte=start, week_start__lt=end).delete()
+    WeeklyCategorySpend.objects.bulk_create([
+        WeeklyCategorySpend(user=user, category_id=category_id, week_start=week, total=total)
+        for (category_id, week), total in weekly_totals(user, start, end).items()
+    ])
+
+
+def _save_baselines(baselines):
+    baselines = list(baselines)
+    SpendingBaseline.objects.bulk_create([b for b in baselines if b.pk is None and b.weeks > 0])
+    SpendingBaseline.objects.bulk_update(
+        [b for b in baselines if b.pk is not None and b.weeks > 0], ['weeks', 'total', 'total_sq']
+    )
+    SpendingBaseline.objects.filter(pk__in=[b.pk for b in baselines if b.pk is not None and b.weeks <= 0]).delete()
+
+
+def _window_start(through_week, lookback_weeks):
+    return through_week - timedelta(weeks=lookback_weeks - 1)
+
+
+@transaction.atomic
+def refresh_baselines(user, today, lookback_weeks=DEFAULT_LOOKBACK_WEEKS):
+    """Fold newly closed weeks into the user's baselines; a no-op mid-week. Returns the state row."""
+    last_closed = week_start(today) - timedelta(weeks=1)
+    window_start = _window_start(last_closed, lookback_weeks)
+
+    state, created = SpendingBaselineState.objects.select_for_update().get_or_create(
+        user=user, defaults={'lookback_weeks': lookback_weeks}
+    )
+    if not created and state.through_week == last_closed and state.lookback_weeks == lookback_weeks:
+        return state
+
+    incremental = (
+        state.through_week is not None
+        and state.lookback_weeks == lookback_weeks
+        and state.through_week >= window_start - timedelta(weeks=1)
+    )
+    if incremental:
+        # Materialize the weeks that closed since the last refresh
+        _store_weeks(user, state.through_week + timedelta(weeks=1), last_closed + timedelta(weeks=1))
+        old_window_start = _window_start(state.through_week, lookback_weeks)
+        baselines = {b.category_id: b for b in SpendingBaseline.objects.filter(user=user)}
+        added = WeeklyCategorySpend.objects.filter(
+            user=user, week_start__gt=state.through_week, week_start__lte=last_closed
+        ).values_list('category_id', 'total')
+        expired = WeeklyCategorySpend.objects.filter(
+            user=user, week_start__gte=old_window_start, week_start__lt=window_start
+        ).values_list('category_id', 'total')
+        _apply(baselines, user.pk, added, 1)
+        _apply(baselines, user.pk, expired, -1)
+    else:
+        # First run, a new lookback or a long absence: rebuild the whole window from SQL.
+        # Store every week an ad-hoc lookback may ask for, not just this window.
+        _store_weeks(user, _window_start(last_closed, MAX_LOOKBACK_WEEKS), last_closed + timedelta(weeks=1))
+        baselines = {}
+        rows = (
+            WeeklyCategorySpend.objects.filter(user=user, week_start__gte=window_start, week_start__lte=last_closed)
+            .values('category_id')
+            .annotate(week_count=Count('id'), week_sum=Sum('total'), week_sq_sum=Sum(F('total') * F('total')))
+        )
+        for row in rows:
+            baselines[row['category_id']] = SpendingBaseline(
+                user=user, category_id=row['category_id'], weeks=row['week_count'],
+                total=float(row['week_sum']), total_sq=float(row['week_sq_sum']),
+            )
+        SpendingBaseline.objects.filter(user=user).delete()
+
+    _save_baselines(baselines.values())
+    state.through_week = last_closed
+    state.lookback_weeks = lookback_weeks
+    state.save()
+    return state
+
+
+@transaction.atomic(savepoint=False)
+def sync_weeks(user_id, keys):
+    """
+    Recompute the stored totals of the touched (category id, week start)
+    pairs. Weeks already folded into a baseline patch its moments in place,
+    so a late edit to a closed week doesn't wait for a rebuild. Returns the
+    ids of the categories whose baseline changed.
+    """
+    keys = set(keys)
+    if not keys:
+        return set()
+    categories = {category_id for category_id, _ in keys}
+    weeks = {week for _, week in keys}
+    fresh = weekly_totals(user_id, min(weeks), max(weeks) + timedelta(weeks=1), categories)
+    stored = {
+        (row.category_id, row.week_start): row
+        for row in WeeklyCategorySpend.objects.filter(user_id=user_id, category_id__in=categories, week_start__in=weeks)
+    }
+
+    changed, to_create, to_update, to_delete = [], [], [], []
+    for category_id, week in keys:
+        new = fresh.get((category_id, week))
+        row = stored.get((category_id, week))
+        old = row.total if row else None
+        if new == old:
+            continue
+        changed.append((category_id, week, old, new))
+        if row is None:
+            to_create.append(WeeklyCategorySpend(user_id=user_id, category_id=category_id, week_start=week, total=new))
+        elif new is None:
+            to_delete.append(row.pk)
+        else:
+            row.total = new
+            to_update.append(row)
+    if not changed:
+        return set()
+    WeeklyCategorySpend.objects.bulk_create(to_create)
+    WeeklyCategorySpend.objects.bulk_update(to_update, ['total'])
+    if to_delete:
+        WeeklyCategorySpend.objects.filter(pk__in=to_delete).delete()
+
+    state = SpendingBaselineState.objects.select_for_update().filter(user_id=user_id).first()
+    if state is None or state.through_week is None:
+        return set()
+    window_start = _window_start(state.through_week, state.lookback_weeks)
+    folded = [change for change in changed if window_start <= change[1] <= state.through_week]
+    if not folded:
+        return set()
+    baselines = {b.category_id: b for b in SpendingBaseline.objects.filter(user_id=user_id)}
+    for category_id, _, old, new in folded:
+        if old is not None:
+            _apply(baselines, user_id, [(category_id, old)], -1)
+        if new is not None:
+            _apply(baselines, user_id, [(category_id, new)], 1)
+    _save_baselines(baselines.values())
+    return {category_id for category_id, _, _, _ in folded}
+
+
+def threshold(baseline, sigma=DEFAULT_SIGMA):
+    """(weekly mean, alert threshold) for a baseline."""
+    mean = baseline.total / baseline.weeks
+    std_dev = math.sqrt(max(baseline.total_sq / baseline.weeks - mean * mean, 0.0))
+    return mean, mean + sigma * std_dev
+
+
+def over_average(baseline, spent, sigma=DEFAULT_SIGMA):
+    """How far `spent` is above the weekly average when it crosses the threshold, else None."""
+    mean, limit = threshold(baseline, sigma)
+    spent = float(spent)
+    if spent > mean and spent > limit:
+        return spent - mean
+    return None
+
+
+def alert_message(category_name, over_amount):
+    return f"Heads up! Your spending on '{category_name}' this week is ${over_amount:,.2f} higher than your weekly average."
+
+
+def window_baselines(user, through_week, lookback_weeks, category_ids):
+    """Unsaved baselines summed from the stored weekly totals, for a lookback other than the persisted one."""
+    rows = (
+        WeeklyCategorySpend.objects.filter(
+            user=user, category_id__in=list(category_ids),
+            week_start__gte=_window_start(through_week, lookback_weeks), week_start__lte=through_week,
+        )
+        .values('category_id')
+        .annotate(week_count=Count('id'), week_sum=Sum('total'), week_sq_sum=Sum(F('total') * F('total')))
+        .filter(week_count__gte=MIN_WEEKS)
+    )
+    categories = {c.pk: c for c in Category.objects.filter(pk__in=[row['category_id'] for row in rows])}
+    return [
+        SpendingBaseline(
+            user=user, category=categories[row['category_id']], weeks=row['week_count'],
+            total=float(row['week_sum']), total_sq=float(row['week_sq_sum']),
+        )
+        for row in rows
+    ]
+
+
+def evaluate_alerts(user, today, sigma=DEFAULT_SIGMA, lookback_weeks=DEFAULT_LOOKBACK_WEEKS):
+    """
+    Alert messages for categories whose spending this week is unusually high.
+    A lookback other than the persisted one is evaluated without changing the
+    stored baselines.
+    """
+    state = refresh_baselines(user, today)
+
+    this_week = week_start(today)
+    current = dict(
+        Transaction.objects.filter(
+            user=user, transaction_type='EXPENSE', category__isnull=False,
+            date__gte=this_week, date__lte=today,
+        ).values('category_id').annotate(total=Sum('amount')).values_list('category_id', 'total')
+    )
+    if not current:
+        return []
+
+    alerts = []
+    if lookback_weeks == state.lookback_weeks:
+        baselines = SpendingBaseline.objects.filter(
+            user=user, category_id__in=list(current), weeks__gte=MIN_WEEKS
+        ).select_related('category')
+    else:
+        baselines = window_baselines(user, state.through_week, lookback_weeks, current)
+    for baseline in baselines:
+        over_amount = over_average(baseline, current[baseline.category_id], sigma)
+        if over_amount is not None:
+            alerts.append(alert_message(baseline.category.name, over_amount))
+    return alerts
@@ -0,0 +1,247 @@
+"""
+Subscription discovery.
+
+Expense rows are streamed in date order as bare (description, date, amount)
+tuples and folded into per-merchant running statistics in a single pass:
+occurrence count, inter-arrival gap moments and amount moments. A merchant
+becomes a subscription candidate when its mean gap matches a known cadence,
+the gaps are regular and the amounts are stable.
+
+The statistics are persisted in MerchantCadence together with a per-user
+transaction id high-water mark, so a run only folds in expenses created
+since the previous one. Gap moments can only grow in date order, so a run
+rebuilds the user's statistics from the whole history instead when a new
+expense is dated before payments already folded in (a backdated import),
+or when an already folded expense was edited or deleted (see
+mark_for_rescan).
+"""
+import math
+import re
+from dataclasses import dataclass, fields
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .. import versioned_cache
+from ..models import MerchantCadence, Subscription, SubscriptionDiscoveryState, Transaction
+
+_DIGITS = re.compile(r'\d+')
+_WHITESPACE = re.compile(r'\s+')
+
+# (name, period in days, tolerance in days)
+CADENCES = [
+    ('WEEKLY', 7, 2),
+    ('BIWEEKLY', 14, 3),
+    ('MONTHLY', 30.44, 4),
+    ('QUARTERLY', 91.31, 10),
+    ('ANNUAL', 365.25, 20),
+]
+MIN_AMOUNT_STABILITY = 0.5
+MIN_GAP_REGULARITY = 0.5
+
+
+def normalize_description(description):
+    """Group key for a merchant: digits (dates, reference numbers) removed, lowercased."""
+    # Cut to Subscription.name's length so keys compare equal to stored names
+    return _WHITESPACE.sub(' ', _DIGITS.sub('', description)).strip().lower()[:100].strip()
+
+
+@dataclass
+class MerchantStats:
+    count: int = 0
+    last_date: object = None
+    last_amount: Decimal = Decimal('0')
+    gap_count: int = 0
+    gap_sum: float = 0.0
+    gap_sqsum: float = 0.0
+    amount_sum: float = 0.0
+    amount_sqsum: float = 0.0
+
+    def add(self, when, amount):
+        """Fold in one payment; payments should arrive in date order."""
+        if self.last_date is not None:
+            gap = (when - self.last_date).days
+            # Two charges on the same day don't say anything about the cadence,
+            # and a backdated one can't be placed without the full history
+            if gap > 0:
+                self.gap_count += 1
+                self.gap_sum += gap
+                self.gap_sqsum += gap * gap
+        self.count += 1
+        if self.last_date is None or when >= self.last_date:
+            self.last_date = when
+            self.last_amount = amount
+        value = float(amount)
+        self.amount_sum += value
+        self.amount_sqsum += value * value
+
+    @staticmethod
+    def _mean_std(total, sqtotal, n):
+        mean = total / n
+        return mean, math.sqrt(max(sqtotal / n - mean * mean, 0.0))
+
+    def amount_stability(self):
+        """1.0 for identical amounts, falling towards 0 as the coefficient of variation grows."""
+        mean, std = self._mean_std(self.amount_sum, self.amount_sqsum, self.count)
+        if mean <= 0:
+            return 0.0
+        return max(0.0, 1.0 - std / mean)
+
+    def detect_cadence(self):
+        """Return (cadence, confidence) or None when there is no regular cadence."""
+        if self.gap_count < 1:
+            return None
+        mean_gap, gap_std = self._mean_std(self.gap_sum, self.gap_sqsum, self.gap_count)
+        for name, period, tolerance in CADENCES:
+            if abs(mean_gap - period) <= tolerance:
+                regularity = max(0.0, 1.0 - gap_std / period)
+                stability = self.amount_stability()
+                if regularity < MIN_GAP_REGULARITY or stability < MIN_AMOUNT_STABILITY:
+                    return None
+                return name, round((regularity + stability) / 2, 2)
+        return None
+
+
+STAT_FIELDS = [f.name for f in fields(MerchantStats)]
+
+
+def expense_rows(user, after_id=0):
+    return (
+        Transaction.objects.filter(user=user, transaction_type='EXPENSE', id__gt=after_id)
+        .order_by('date', 'id')
+        .values_list('id', 'description', 'date', 'amount')
+        .iterator(chunk_size=2000)
+    )
+
+
+def _fold(rows, load_stats):
+    """
+    Fold (id, description, date, amount) rows into merchant stats. Returns
+    (stats for touched merchants, highest id seen, whether any payment is
+    dated before the last one already folded in for its merchant).
+    """
+    grouped = {}
+    max_id = 0
+    for pk, description, when, amount in rows:
+        max_id = max(max_id, pk)
+        key = normalize_description(description)
+        if key:
+            grouped.setdefault(key, []).append((when, amount))
+
+    stats = load_stats(list(grouped))
+    backdated = False
+    for key, payments in grouped.items():
+        merchant = stats.get(key)
+        if merchant is None:
+            merchant = stats[key] = MerchantStats()
+        elif merchant.last_date is not None and payments[0][0] < merchant.last_date:
+            backdated = True
+        for when, amount in payments:
+            merchant.add(when, amount)
+    return stats, max_id, backdated
+
+
+def mark_for_rescan(user_id, transaction_ids):
+    """Flag the user for a full rescan if any of these edited or deleted expenses were already folded in."""
+    if transaction_ids:
+        SubscriptionDiscoveryState.objects.filter(
+            user_id=user_id, last_transaction_id__gte=min(transaction_ids), needs_rescan=False,
+        ).update(needs_rescan=True)
+
+
+@transaction.atomic
+def discover(user, full=False):
+    """
+    Fold the user's new expenses into their merchant statistics, refresh
+    matching subscriptions and create newly detected ones.
+
+    With full=True the statistics are rebuilt from the whole history.
+    Returns a list of (Subscription, cadence, confidence) for created rows.
+    """
+    state, _ = SubscriptionDiscoveryState.objects.select_for_update().get_or_create(user=user)
+    stored = {}
+
+    def load_stats(keys):
+        # One IN query for the merchants that actually have new payments
+        for row in MerchantCadence.objects.filter(user=user, merchant__in=keys):
+            stored[row.merchant] = row
+        return {key: MerchantStats(**{f: getattr(row, f) for f in STAT_FIELDS}) for key, row in stored.items()}
+
+    full = full or state.needs_rescan
+    if not full:
+        stats, max_id, backdated = _fold(expense_rows(user, state.last_transaction_id), load_stats)
+        # Backdated payments can't be added to the gap moments in order
+        full = backdated
+    if full:
+        MerchantCadence.objects.filter(user=user).delete()
+        stored.clear()
+        state.last_transaction_id = 0
+        stats, max_id, _ = _fold(expense_rows(user), load_stats)
+
+    to_create, to_update = [], []
+    for key, merchant in stats.items():
+        values = {f: getattr(merchant, f) for f in STAT_FIELDS}
+        if key in stored:
+            row = stored[key]
+            for f, value in values.items():
+                setattr(row, f, value)
+            to_update.append(row)
+        else:
+            to_create.append(MerchantCadence(user=user, merchant=key, **values))
+    MerchantCadence.objects.bulk_create(to_create)
+    MerchantCadence.objects.bulk_update(to_update, STAT_FIELDS)
+
+    found = _apply_to_subscriptions(user, stats)
+
+    state.last_transaction_id = max(state.last_transaction_id, max_id)
+    state.needs_rescan = False
+    state.last_run = timezone.now()
+    state.save()
+    return found
+
+
+def _apply_to_subscriptions(user, stats):
+    if not stats:
+        return []
+    candidates = {}
+    for key, merchant in stats.items():
+        detected = merchant.detect_cadence()
+        if detected:
+            candidates[key] = (merchant, *detected)
+
+    # One IN query for every touched merchant instead of an exists() per merchant
+    existing = {
+        sub.lower_name: sub
+        for sub in Subscription.objects.filter(user=user)
+        .annotate(lower_name=Lower('name'))
+        .filter(lower_name__in=list(stats))
+    }
+
+    changed = []
+    for key, sub in existing.items():
+        merchant = stats[key]
+        if merchant.last_date and merchant.last_date >= sub.last_payment_date:
+            sub.last_payment_date = merchant.last_date
+            sub.estimated_amount = merchant.last_amount
+            changed.append(sub)
+    Subscription.objects.bulk_update(changed, ['last_payment_date', 'estimated_amount'])
+
+    new = [(key, value) for key, value in candidates.items() if key not in existing]
+    created = Subscription.objects.bulk_create(
+        [
+            Subscription(
+                user=user,
+                name=key.title(),  # Capitalize for display
+                last_payment_date=merchant.last_date,
+                estimated_amount=merchant.last_amount,
+                cadence=cadence,
+            )
+            for key, (merchant, cadence, _) in new
+        ]
+    )
+    if changed or created:
+        # bulk writes send no signals
+        versioned_cache.bump(user.pk, 'subscriptions')
+    return [(sub, cadence, confidence) for sub, (_, (_, cadence, confidence)) in zip(created, new)]
@@ -0,0 +1,46 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def _close_connections():
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+
+
+def _run_batch(model, func, ids):
+    results, failed = [], 0
+    for obj in model._default_manager.filter(id__in=ids):
+        try:
+            results.append(func(obj))
+        except Exception:
+            # One bad row must not abort the rest of the nightly run
+            logger.exception("Batch job failed for %s %s", model.__name__, obj.pk)
+            failed += 1
+    return results, failed
+
+
+def run_in_batches(queryset, func, workers=4, batch_size=200):
+    """Call func(obj) for every row of queryset, batched over a process pool.
+
+    workers=1 runs in-process. Returns (results, failed), where a row whose
+    call raised is logged and counted in failed instead of stopping the run.
+    """
+    ids = list(queryset.order_by('id').values_list('id', flat=True))
+    batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+    # Workers re-read their rows by id; a queryset would be evaluated to pickle it
+    run = partial(_run_batch, queryset.model, func)
+
+    if workers <= 1:
+        outcomes = [run(batch) for batch in batches]
+    else:
+        _close_connections()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_close_connections) as pool:
+            outcomes = list(pool.map(run, batches))
+
+    results = [result for batch_results, _ in outcomes for result in batch_results]
+    return results, sum(failed for _, failed in outcomes)
@@ -0,0 +1,44 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from core.engines.forecast import monte_carlo_forecast
+
+
+def sample_inputs(days):
+    """A salaried user with one subscription, built in memory so the benchmark needs no database."""
+    today = date(2025, 3, 1)
+    events = []
+    for offset in range(14, days + 1, 30):
+        events.append((today + timedelta(days=offset), Decimal('2500.00'), 'Salary'))
+    for offset in range(5, days + 1, 30):
+        events.append((today + timedelta(days=offset), Decimal('-15.99'), 'Netflix'))
+    history = np.array([0, 12.5, 40, 0, 85.2, 3.1, 0, 27] * 10, dtype=np.float64)
+    return Decimal('1000.00'), events, history, {'Salary': 3}, today
+
+
+class Command(BaseCommand):
+    help = "Time the Monte Carlo cash flow forecast against the dashboard's latency budget."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--paths', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement; the best one counts.")
+        parser.add_argument('--budget-ms', type=float, default=100.0, help="Fail when the best run is slower than this.")
+
+    def handle(self, *args, **options):
+        balance, events, history, jitter, today = sample_inputs(options['days'])
+        best = None
+        for seed in range(options['repeat']):
+            started = time.perf_counter()
+            monte_carlo_forecast(balance, events, history, jitter, today, options['days'], options['paths'], seed)
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+
+        summary = f"{options['paths']} paths x {options['days']} days: best of {options['repeat']} {best:.1f} ms"
+        if best > options['budget_ms']:
+            raise CommandError(f"{summary}, over the {options['budget_ms']:g} ms budget.")
+        self.stdout.write(self.style.SUCCESS(f"{summary}, within the {options['budget_ms']:g} ms budget."))
@@ -0,0 +1,74 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Account, NetWorthSnapshot, Transaction
+from core.renderers import FastJSONRenderer, orjson
+from core.serializers import NetWorthSnapshotSerializer, TransactionSerializer
+
+
+def transaction_page(rows):
+    """Serialized transactions, built in memory so the benchmark needs no database."""
+    account = Account(id=1, name='Everyday Checking', account_type='CHECKING', balance=Decimal('0'))
+    start = date(2020, 1, 1)
+    transactions = [
+        Transaction(
+            id=i + 1, account=account, description=f'Café purchase #{i}', amount=Decimal(i % 5000) / 100 + 1,
+            transaction_type='EXPENSE' if i % 4 else 'INCOME', date=start + timedelta(days=i % 2000),
+            category_id=(i % 12) or None,
+        )
+        for i in range(rows)
+    ]
+    return {'count': rows, 'next': None, 'previous': None, 'results': TransactionSerializer(transactions, many=True).data}
+
+
+def net_worth_history(rows):
+    start = date(2000, 1, 1)
+    snapshots = [
+        NetWorthSnapshot(
+            date=start + timedelta(days=i), total_assets=Decimal(100000 + i) / 100,
+            total_liabilities=Decimal(50000 + i // 2) / 100, net_worth=Decimal(50000 + i - i // 2) / 100,
+        )
+        for i in range(rows)
+    ]
+    return NetWorthSnapshotSerializer(snapshots, many=True).data
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's JSONRenderer with the orjson-backed FastJSONRenderer on transaction and net worth payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='1000,10000,100000', help="Comma separated payload sizes.")
+        parser.add_argument('--repeat', type=int, default=5, help="Renders per measurement; the best one counts.")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson isn't installed, so FastJSONRenderer is just JSONRenderer.")
+        try:
+            sizes = [int(size) for size in options['rows'].split(',')]
+        except ValueError:
+            raise CommandError("--rows must be a comma separated list of whole numbers.")
+
+        renderers = [('json', JSONRenderer()), ('orjson', FastJSONRenderer())]
+        self.stdout.write(f"{'payload':<14}{'rows':>8}{'json ms':>10}{'orjson ms':>11}{'speedup':>9}  identical")
+        for name, build in (('transactions', transaction_page), ('net worth', net_worth_history)):
+            for rows in sizes:
+                data = build(rows)
+                timings, outputs = [], []
+                for _, renderer in renderers:
+                    best = None
+                    for _ in range(options['repeat']):
+                        started = time.perf_counter()
+                        output = renderer.render(data, 'application/json')
+                        elapsed = time.perf_counter() - started
+                        best = elapsed if best is None else min(best, elapsed)
+                    timings.append(best * 1000)
+                    outputs.append(output)
+                identical = 'yes' if outputs[0] == outputs[1] else 'NO'
+                self.stdout.write(
+                    f"{name:<14}{rows:>8}{timings[0]:>10.1f}{timings[1]:>11.1f}"
+                    f"{timings[0] / timings[1]:>8.1f}x  {identical}"
+                )
@@ -0,0 +1,31 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from core.engines.subscriptions import discover
+from core.management.batches import run_in_batches
+
+
+def _discover(user, full):
+    return len(discover(user, full=full))
+
+
+class Command(BaseCommand):
+    help = "Run incremental subscription discovery for every active user (intended to run nightly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Size of the process pool; 1 runs in-process.")
+        parser.add_argument('--batch-size', type=int, default=200, help="Users handed to a worker at a time.")
+        parser.add_argument('--full', action='store_true', help="Rebuild every user's merchant statistics from scratch.")
+
+    def handle(self, *args, **options):
+        results, failed = run_in_batches(
+            User.objects.filter(is_active=True),
+            partial(_discover, full=options['full']),
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(results)} users, found {sum(results)} new subscriptions."))
+        if failed:
+            self.stderr.write(self.style.ERROR(f"Discovery failed for {failed} users; see the log."))
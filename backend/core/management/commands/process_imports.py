@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.engines.imports import claim_next_job, process_import_job
+
+
+class Command(BaseCommand):
+    help = "Run the local worker that processes queued transaction import jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit instead of polling forever.")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"Processing import {job.id} for {job.user.username}...")
+            job = process_import_job(job, chunk_size=options['chunk_size'])
+            self.stdout.write(
+                f"Import {job.id} {job.status}: {job.rows_created} created, {job.rows_rejected} rejected."
+            )
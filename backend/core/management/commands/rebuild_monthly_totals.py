@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.engines import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the MonthlyCategoryTotal rollup against the raw transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help="Only report mismatches, don't write anything.")
+        parser.add_argument('--user', type=int, help="Only this user id.")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(id=options['user'])
+
+        count = mismatched = 0
+        for user in users.iterator():
+            count += 1
+            if not options['verify']:
+                rollups.rebuild(user)
+                continue
+            diff = rollups.verify(user)
+            if diff:
+                mismatched += 1
+                for (category_id, month, transaction_type), (stored, raw) in sorted(diff.items(), key=str):
+                    self.stdout.write(
+                        f"user {user.id} category {category_id} {month:%Y-%m} {transaction_type}: "
+                        f"stored {stored}, actual {raw}"
+                    )
+
+        if not options['verify']:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt monthly totals for {count} users."))
+        elif mismatched:
+            raise CommandError(f"{mismatched} of {count} users have monthly totals that don't match their transactions.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Monthly totals match for all {count} users."))
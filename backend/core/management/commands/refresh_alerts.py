@@ -0,0 +1,21 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from core.engines.alerts import evaluate_user
+
+
+class Command(BaseCommand):
+    help = "Re-evaluate stored alerts from scratch, e.g. after deploying the alert engine or restoring data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Only this user id.")
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True).order_by('id')
+        if options['user']:
+            users = users.filter(id=options['user'])
+        count = 0
+        for user in users.iterator():
+            evaluate_user(user)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Re-evaluated alerts for {count} users."))
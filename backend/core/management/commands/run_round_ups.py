@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from core.engines import roundups
+from core.management.batches import run_in_batches
+from core.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Run round-ups for every user who has them enabled."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Size of the process pool; 1 runs in-process.")
+        parser.add_argument('--batch-size', type=int, default=200, help="Profiles handed to a worker at a time.")
+
+    def handle(self, *args, **options):
+        results, failed = run_in_batches(
+            UserProfile.objects.filter(
+                round_ups_enabled=True,
+                round_up_source_account__isnull=False,
+                round_up_target_account__isnull=False,
+            ),
+            roundups.run,
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+        )
+        total = sum((r[0] for r in results if r), Decimal('0'))
+        items = sum(r[1] for r in results if r)
+        self.stdout.write(self.style.SUCCESS(f"Ran round-ups for {len(results)} users: {total} from {items} transactions."))
+        if failed:
+            self.stderr.write(self.style.ERROR(f"Round-ups failed for {failed} users; see the log."))
@@ -0,0 +1,47 @@
+"""
+Market data access for the app: stock quotes behind a caching client.
+
+Use get_client() rather than constructing a client per request, so the
+connection pool, the single-flight bookkeeping and the provider are shared
+by the whole process. The provider is picked with settings.MARKETDATA_PROVIDER.
+"""
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from .client import MarketDataClient
+from .providers import (
+    AlphaVantageProvider, FileProvider, MarketDataError, ProviderError, Quote, QuoteNotFound, QuoteProvider,
+)
+
+__all__ = [
+    'AlphaVantageProvider', 'FileProvider', 'MarketDataClient', 'MarketDataError', 'ProviderError',
+    'Quote', 'QuoteNotFound', 'QuoteProvider', 'build_provider', 'get_client',
+]
+
+_client = None
+_lock = threading.Lock()
+
+
+def build_provider():
+    name = settings.MARKETDATA_PROVIDER
+    if name == 'alphavantage':
+        return AlphaVantageProvider(settings.ALPHA_VANTAGE_API_KEY, timeout=settings.MARKETDATA_TIMEOUT)
+    if name == 'file':
+        return FileProvider(settings.MARKETDATA_FIXTURE_PATH)
+    if '.' in name:
+        return import_string(name)()
+    raise ImproperlyConfigured(f"Unknown MARKETDATA_PROVIDER '{name}'.")
+
+
+def get_client():
+    global _client
+    with _lock:
+        if _client is None:
+            _client = MarketDataClient(
+                build_provider(), ttl=settings.MARKETDATA_QUOTE_TTL, stale_ttl=settings.MARKETDATA_STALE_TTL,
+                error_ttl=settings.MARKETDATA_ERROR_TTL,
+            )
+        return _client
@@ -0,0 +1,156 @@
+"""
+Caching client in front of a quote provider.
+
+Quotes and the "unknown symbol" markers are kept in the cache alias named
+by settings.MARKETDATA_CACHE. Worker processes only share them when that
+alias is a shared store such as Redis (ANALYTICS_CACHE_URL); with local
+memory each process keeps its own copy and calls the provider itself. A
+quote younger than `ttl` is served as is. An older one is still served,
+marked stale, for up to `stale_ttl` more seconds while a background thread
+fetches a fresh price (stale-while-revalidate). Concurrent requests for a
+symbol that isn't cached share a single provider call, and symbols the
+provider doesn't know are remembered for `ttl` so they don't eat into the
+rate limit either. Provider failures are remembered for the shorter
+`error_ttl`, so an outage or rate limit doesn't send every request back to
+the provider; anything a provider raises besides MarketDataError (a
+requests or JSON error it let through) is reported as a ProviderError. The
+single flight and the background refresh are per process.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import replace
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .providers import MarketDataError, ProviderError, QuoteNotFound
+
+QUOTE_KEY = 'marketdata-quote:{provider}:{symbol}'
+MISSING_KEY = 'marketdata-missing:{provider}:{symbol}'
+FAILED_KEY = 'marketdata-failed:{provider}:{symbol}'
+
+
+def _cache():
+    return caches[settings.MARKETDATA_CACHE]
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MarketDataClient:
+    def __init__(self, provider, ttl=60, stale_ttl=15 * 60, error_ttl=10, wait_timeout=15, max_workers=8):
+        self.provider = provider
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.error_ttl = error_ttl
+        self.wait_timeout = wait_timeout
+        self.max_workers = max_workers
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _key(self, template, symbol):
+        return template.format(provider=self.provider.name, symbol=symbol)
+
+    def get_quote(self, symbol):
+        """A Quote for `symbol`; raises QuoteNotFound or ProviderError."""
+        symbol = symbol.strip().upper()
+        cache = _cache()
+        quote = cache.get(self._key(QUOTE_KEY, symbol))
+        if quote is not None:
+            if time.time() - quote.fetched_at < self.ttl:
+                return quote
+            self._refresh_in_background(symbol)
+            return replace(quote, stale=True)
+        if cache.get(self._key(MISSING_KEY, symbol)):
+            raise QuoteNotFound(symbol)
+        failure = cache.get(self._key(FAILED_KEY, symbol))
+        if failure is not None:
+            raise ProviderError(failure)
+        return self._fetch(symbol)
+
+    def get_quotes(self, symbols, timeout=None):
+        """
+        ({symbol: Quote}, {symbol: error}) with cache misses fetched
+        concurrently. Symbols still being fetched after `timeout` seconds are
+        reported as errors; their fetches carry on in the background, so the
+        next call finds them cached.
+        """
+        symbols = sorted({s.strip().upper() for s in symbols if s and s.strip()})
+        quotes, errors = {}, {}
+        if not symbols:
+            return quotes, errors
+
+        pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols)))
+        futures = {pool.submit(self.get_quote, symbol): symbol for symbol in symbols}
+        done, _ = wait(futures, timeout=timeout)
+        pool.shutdown(wait=False)
+        for future, symbol in futures.items():
+            if future not in done:
+                errors[symbol] = MarketDataError(f'Timed out waiting for a quote for {symbol}.')
+            elif isinstance(future.exception(), MarketDataError):
+                errors[symbol] = future.exception()
+            else:
+                quotes[symbol] = future.result()
+        return quotes, errors
+
+    def _fetch(self, symbol):
+        # Single flight: the first caller fetches, everyone else waits for its result
+        with self._lock:
+            call = self._calls.get(symbol)
+            leader = call is None
+            if leader:
+                call = self._calls[symbol] = _Call()
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                raise MarketDataError(f'Timed out waiting for a quote for {symbol}.')
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            quote = replace(self.provider.get_quote(symbol), symbol=symbol, fetched_at=time.time())
+            _cache().set(self._key(QUOTE_KEY, symbol), quote, self.ttl + self.stale_ttl)
+            call.result = quote
+            return quote
+        except QuoteNotFound as e:
+            _cache().set(self._key(MISSING_KEY, symbol), True, self.ttl)
+            call.error = e
+            raise
+        except MarketDataError as e:
+            self._remember_failure(symbol, e)
+            call.error = e
+            raise
+        except Exception as e:
+            error = ProviderError(f'{self.provider.name} failed to quote {symbol}: {e!r}')
+            self._remember_failure(symbol, error)
+            call.error = error
+            raise error from e
+        finally:
+            with self._lock:
+                del self._calls[symbol]
+            call.done.set()
+
+    def _remember_failure(self, symbol, error):
+        if self.error_ttl:
+            _cache().set(self._key(FAILED_KEY, symbol), str(error), self.error_ttl)
+
+    def _refresh_in_background(self, symbol):
+        with self._lock:
+            if symbol in self._calls:
+                return
+        if _cache().get(self._key(FAILED_KEY, symbol)) is not None:
+            # The provider just failed for it; keep serving the stale quote
+            return
+        threading.Thread(target=self._refresh_quietly, args=(symbol,), daemon=True).start()
+
+    def _refresh_quietly(self, symbol):
+        try:
+            self._fetch(symbol)
+        except MarketDataError:
+            # Keep serving the stale quote until it expires
+            pass
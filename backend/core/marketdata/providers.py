@@ -0,0 +1,118 @@
+"""
+Quote providers.
+
+A provider turns a symbol into a Quote and knows nothing about caching;
+MarketDataClient wraps one. Raise QuoteNotFound for symbols the provider
+doesn't know and ProviderError for everything else (timeouts, rate limits,
+bad responses), so the client can fall back to a stale quote.
+"""
+import json
+import os
+import threading
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class MarketDataError(Exception):
+    pass
+
+
+class QuoteNotFound(MarketDataError):
+    pass
+
+
+class ProviderError(MarketDataError):
+    pass
+
+
+@dataclass(frozen=True)
+class Quote:
+    symbol: str
+    price: Decimal
+    source: str
+    # Set by MarketDataClient: when the price was fetched and whether it's past its TTL
+    fetched_at: float = None
+    stale: bool = False
+
+
+class QuoteProvider:
+    name = 'base'
+
+    def get_quote(self, symbol):
+        raise NotImplementedError
+
+
+def pooled_session(pool_size=10, retries=2):
+    """A requests session that keeps connections alive and retries transient failures."""
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=['GET'])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class AlphaVantageProvider(QuoteProvider):
+    name = 'alphavantage'
+    URL = 'https://www.alphavantage.co/query'
+
+    def __init__(self, api_key, timeout=(3.05, 5), session=None):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = session or pooled_session()
+
+    def get_quote(self, symbol):
+        params = {'function': 'GLOBAL_QUOTE', 'symbol': symbol, 'apikey': self.api_key}
+        try:
+            response = self.session.get(self.URL, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise ProviderError(f'Alpha Vantage request failed: {e}') from e
+
+        # Rate limiting comes back as a 200 with a note instead of the quote
+        if 'Note' in data or 'Information' in data:
+            raise ProviderError(data.get('Note') or data.get('Information'))
+        price = data.get('Global Quote', {}).get('05. price')
+        if not price:
+            raise QuoteNotFound(symbol)
+        try:
+            return Quote(symbol, Decimal(price), self.name)
+        except InvalidOperation:
+            raise ProviderError(f"Alpha Vantage returned an invalid price '{price}' for {symbol}.")
+
+
+class FileProvider(QuoteProvider):
+    """
+    Prices from a local JSON file of {"SYMBOL": "price"}, for development
+    and tests without network access. The file is re-read when it changes.
+    """
+    name = 'file'
+
+    def __init__(self, path):
+        self.path = path
+        self._prices = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            raise ProviderError(f'Quote file {self.path} is not readable: {e}') from e
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path) as f:
+                    self._prices = {symbol.upper(): Decimal(str(price)) for symbol, price in json.load(f).items()}
+                self._mtime = mtime
+            return self._prices
+
+    def get_quote(self, symbol):
+        price = self._load().get(symbol.upper())
+        if price is None:
+            raise QuoteNotFound(symbol)
+        return Quote(symbol, price, self.name)
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:32
+
+import hashlib
+import re
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Frozen copy of core.engines.fingerprints as of this migration, so later
+# changes to the live formula can't change what this backfill writes
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def base_key(account_id, date, amount, transaction_type, description):
+    amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+    if transaction_type == 'EXPENSE':
+        amount = -amount
+    if not isinstance(date, str):
+        date = date.isoformat()
+    description = _WHITESPACE.sub(' ', (description or '').casefold()).strip()
+    return f"{account_id}|{date}|{amount}|{description}"
+
+
+def fingerprint(key, ordinal):
+    return hashlib.sha256(f"{key}|{ordinal}".encode()).hexdigest()
+
+
+def backfill_fingerprints(apps, schema_editor):
+    Transaction = apps.get_model('core', 'Transaction')
+    batch = []
+    occurrences = {}
+    current_account = None
+    rows = Transaction.objects.order_by('account_id', 'id').values_list(
+        'id', 'account_id', 'date', 'amount', 'transaction_type', 'description'
+    )
+    for pk, account_id, date, amount, transaction_type, description in rows.iterator(chunk_size=2000):
+        if account_id != current_account:
+            occurrences = {}
+            current_account = account_id
+        key = base_key(account_id, date, amount, transaction_type, description)
+        ordinal = occurrences.get(key, 0)
+        occurrences[key] = ordinal + 1
+        batch.append(Transaction(id=pk, fingerprint=fingerprint(key, ordinal)))
+        if len(batch) >= 2000:
+            Transaction.objects.bulk_update(batch, ['fingerprint'])
+            batch = []
+    if batch:
+        Transaction.objects.bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_duplicate',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('fingerprint',), name='unique_transaction_fingerprint'),
+        ),
+    ]
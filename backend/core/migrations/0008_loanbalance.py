@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_transaction_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loandisbursement',
+            name='running_balance',
+            field=models.DecimalField(blank=True, decimal_places=8, editable=False, max_digits=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='loandisbursement',
+            name='running_interest',
+            field=models.DecimalField(blank=True, decimal_places=8, editable=False, max_digits=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='loanpayment',
+            name='running_balance',
+            field=models.DecimalField(blank=True, decimal_places=8, editable=False, max_digits=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='loanpayment',
+            name='running_interest',
+            field=models.DecimalField(blank=True, decimal_places=8, editable=False, max_digits=20, null=True),
+        ),
+        migrations.CreateModel(
+            name='LoanBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('accrued_interest', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('as_of_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('loan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoint', to='core.loan')),
+            ],
+        ),
+    ]
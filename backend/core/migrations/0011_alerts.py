@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:45
+
+import django.db.models.deletion
+from django.conf import settings
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_budget_spent(apps, schema_editor):
+    Budget = apps.get_model('core', 'Budget')
+    Transaction = apps.get_model('core', 'Transaction')
+    spent = Transaction.objects.filter(
+        account__user_id=OuterRef('user_id'), category_id=OuterRef('category_id'),
+        transaction_type='EXPENSE', date__gte=OuterRef('start_date'), date__lte=OuterRef('end_date'),
+    ).values('category_id').annotate(total=Sum('amount')).values('total')
+    Budget.objects.update(spent=Coalesce(Subquery(spent), Value(Decimal('0')), output_field=models.DecimalField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_spending_baselines'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='spent',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.RunPython(backfill_budget_spent, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='Alert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('SPENDING', 'Unusual weekly spending'), ('BUDGET', 'Budget')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('threshold', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('message', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('budget', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.budget')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'kind', 'period_start'], name='core_alert_user_id_eb8d4c_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind', 'SPENDING')), fields=('user', 'category', 'period_start'), name='unique_spending_alert_per_week'), models.UniqueConstraint(condition=models.Q(('kind', 'BUDGET')), fields=('budget',), name='unique_budget_alert')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_monthly_totals(apps, schema_editor):
+    Transaction = apps.get_model('core', 'Transaction')
+    MonthlyCategoryTotal = apps.get_model('core', 'MonthlyCategoryTotal')
+    rows = (
+        Transaction.objects.annotate(month=TruncMonth('date'))
+        .values('account__user_id', 'category_id', 'month', 'transaction_type')
+        .annotate(month_total=Sum('amount'), month_count=Count('id'))
+    )
+    MonthlyCategoryTotal.objects.bulk_create(
+        (
+            MonthlyCategoryTotal(
+                user_id=row['account__user_id'], category_id=row['category_id'], month=row['month'],
+                transaction_type=row['transaction_type'], total=row['month_total'], count=row['month_count'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_alerts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyCategoryTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('INCOME', 'Income'), ('EXPENSE', 'Expense')], max_length=7)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'month'], name='core_monthl_user_id_bce979_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('user', 'category', 'month', 'transaction_type'), name='unique_monthly_category_total'), models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'month', 'transaction_type'), name='unique_monthly_uncategorized_total')],
+            },
+        ),
+        migrations.RunPython(backfill_monthly_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_monthly_category_total'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscription',
+            name='cadence',
+            field=models.CharField(choices=[('WEEKLY', 'Weekly'), ('BIWEEKLY', 'Every two weeks'), ('MONTHLY', 'Monthly'), ('QUARTERLY', 'Quarterly'), ('ANNUAL', 'Annual')], default='MONTHLY', max_length=10),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:50
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_high_water_mark(apps, schema_editor):
+    # Treat everything dated on or before the last run as already rounded up
+    UserProfile = apps.get_model('core', 'UserProfile')
+    Transaction = apps.get_model('core', 'Transaction')
+    profiles = UserProfile.objects.exclude(last_round_up_run=None).exclude(round_up_source_account=None)
+    for profile in profiles:
+        last_id = Transaction.objects.filter(
+            account_id=profile.round_up_source_account_id,
+            transaction_type='EXPENSE',
+            date__lte=profile.last_round_up_run.date(),
+        ).aggregate(Max('id'))['id__max']
+        if last_id:
+            profile.last_round_up_transaction_id = last_id
+            profile.save(update_fields=['last_round_up_transaction_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_subscription_cadence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='last_round_up_transaction_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_high_water_mark, migrations.RunPython.noop),
+    ]
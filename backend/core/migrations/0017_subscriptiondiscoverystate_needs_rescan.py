@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_importjob_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscriptiondiscoverystate',
+            name='needs_rescan',
+            field=models.BooleanField(default=False),
+        ),
+    ]
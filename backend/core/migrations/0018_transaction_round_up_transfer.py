@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+# The descriptions round-up runs have written so far, e.g. "Round-up Transfer (12 items)"
+ROUND_UP_DESCRIPTION = r'^Round-up (Transfer|Savings) \([0-9]+ items\)$'
+
+
+def flag_round_up_transfers(apps, schema_editor):
+    Transaction = apps.get_model('core', 'Transaction')
+    Transaction.objects.filter(description__regex=ROUND_UP_DESCRIPTION).update(round_up_transfer=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_subscriptiondiscoverystate_needs_rescan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='round_up_transfer',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(flag_round_up_transfers, migrations.RunPython.noop),
+    ]
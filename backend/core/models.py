@@ -33,11 +33,42 @@ class Transaction(models.Model):
         ('EXPENSE', 'Expense'),
     ]
     account = models.ForeignKey(Account, on_delete=models.CASCADE)
+    # Copy of account.user, set on save, so per-user queries don't join through Account.
+    # The composite indexes below all lead with it, so it needs no index of its own.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, editable=False, db_index=False)
     description = models.CharField(max_length=255)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     transaction_type = models.CharField(max_length=7, choices=TRANSACTION_TYPES)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
     date = models.DateField()
+    # Hash of account, date, amount, description and occurrence ordinal; see core.engines.fingerprints
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    # Written by core.engines.roundups; never rounded up itself
+    round_up_transfer = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fingerprint'], name='unique_transaction_fingerprint'),
+        ]
+        indexes = [
+            # Listings and keyset pagination walk a user's rows by (date, id), newest first
+            models.Index(fields=['user', '-date', '-id'], name='txn_user_date_idx'),
+            models.Index(fields=['user', 'transaction_type', 'date'], name='txn_user_type_date_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='txn_user_category_date_idx'),
+            models.Index(fields=['account', 'date'], name='txn_account_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        from .engines.fingerprints import save_with_fingerprint
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'account' in update_fields:
+            self.user_id = self.account.user_id
+            if update_fields is not None:
+                kwargs['update_fields'] = update_fields = {*update_fields, 'user'}
+        if update_fields is None or 'fingerprint' in update_fields:
+            save_with_fingerprint(self, super().save, *args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.description} - {self.amount}"
@@ -48,6 +79,8 @@ class Budget(models.Model):
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     start_date = models.DateField()
     end_date = models.DateField()
+    # Expense total for the category over the budget period: budgets.actual_spend, stored by core.engines.alerts
+    spent = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
 
     def __str__(self):
         return f"{self.category.name} Budget for {self.user.username}"
@@ -91,6 +124,9 @@ class LoanDisbursement(models.Model):
     loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='disbursements')
     date = models.DateField()
     amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # Ledger state right after this event, maintained by core.engines.loan_ledger
+    running_balance = models.DecimalField(max_digits=20, decimal_places=8, null=True, blank=True, editable=False)
+    running_interest = models.DecimalField(max_digits=20, decimal_places=8, null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"Disbursement of {self.amount} for {self.loan.name} on {self.date}"
@@ -100,11 +136,24 @@ class LoanPayment(models.Model):
     loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='payments')
     date = models.DateField()
     amount = models.DecimalField(max_digits=12, decimal_places=2)
+    running_balance = models.DecimalField(max_digits=20, decimal_places=8, null=True, blank=True, editable=False)
+    running_interest = models.DecimalField(max_digits=20, decimal_places=8, null=True, blank=True, editable=False)
     # is_extra_payment is no longer needed with this calculation method
 
     def __str__(self):
         return f"Payment of {self.amount} for {self.loan.name} on {self.date}"
     
+class LoanBalance(models.Model):
+    """Balance checkpoint after a loan's last event, so reads don't replay its history."""
+    loan = models.OneToOneField(Loan, on_delete=models.CASCADE, related_name='balance_checkpoint')
+    balance = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    accrued_interest = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    as_of_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.loan.name} balance as of {self.as_of_date}"
+
 class NetWorthSnapshot(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     date = models.DateField()
@@ -120,10 +169,18 @@ class NetWorthSnapshot(models.Model):
         return f"{self.user.username}'s Net Worth on {self.date}"
     
 class Subscription(models.Model):
+    CADENCES = [
+        ('WEEKLY', 'Weekly'),
+        ('BIWEEKLY', 'Every two weeks'),
+        ('MONTHLY', 'Monthly'),
+        ('QUARTERLY', 'Quarterly'),
+        ('ANNUAL', 'Annual'),
+    ]
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=100) # e.g., "Netflix", "Spotify"
     last_payment_date = models.DateField()
     estimated_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    cadence = models.CharField(max_length=10, choices=CADENCES, default='MONTHLY')
     # Status to track if the user has confirmed this subscription
     is_active = models.BooleanField(default=True) 
 
@@ -150,6 +207,168 @@ class UserProfile(models.Model):
     round_up_source_account = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True, blank=True, related_name='round_up_source')
     round_up_target_account = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True, blank=True, related_name='round_up_target')
     last_round_up_run = models.DateTimeField(null=True, blank=True)
+    # Highest source account transaction id already rounded up
+    last_round_up_transaction_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user.username}'s Profile"
+
+class ImportJob(models.Model):
+    STATUSES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    account = models.ForeignKey(Account, on_delete=models.CASCADE)
+    file = models.FileField(upload_to='imports/')
+    status = models.CharField(max_length=10, choices=STATUSES, default='PENDING')
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_created = models.PositiveIntegerField(default=0)
+    rows_duplicate = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    error_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Touched by the worker after every chunk; a RUNNING job that stops updating it is reclaimed
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"Import {self.id} for {self.user.username} ({self.status})"
+
+
+class SubscriptionDiscoveryState(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='subscription_discovery_state')
+    # Highest expense transaction id already folded into MerchantCadence
+    last_transaction_id = models.BigIntegerField(default=0)
+    # Set when an already folded expense is edited or deleted; the next run rebuilds from scratch
+    needs_rescan = models.BooleanField(default=False)
+    last_run = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Subscription discovery state for {self.user.username}"
+
+
+class MerchantCadence(models.Model):
+    """Rolling payment statistics for one merchant, see core.engines.subscriptions.MerchantStats."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    merchant = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+    last_date = models.DateField(null=True, blank=True)
+    last_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    gap_count = models.PositiveIntegerField(default=0)
+    gap_sum = models.FloatField(default=0)
+    gap_sqsum = models.FloatField(default=0)
+    amount_sum = models.FloatField(default=0)
+    amount_sqsum = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'merchant')
+
+    def __str__(self):
+        return f"{self.merchant} cadence for {self.user.username}"
+
+
+class MonthlyCategoryTotal(models.Model):
+    """Sum and count of a user's transactions per category, month and type; see core.engines.rollups."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # NULL collects the uncategorized transactions
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    month = models.DateField()  # first day of the month
+    transaction_type = models.CharField(max_length=7, choices=Transaction.TRANSACTION_TYPES)
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category', 'month', 'transaction_type'],
+                condition=models.Q(category__isnull=False), name='unique_monthly_category_total',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'month', 'transaction_type'],
+                condition=models.Q(category__isnull=True), name='unique_monthly_uncategorized_total',
+            ),
+        ]
+        indexes = [models.Index(fields=['user', 'month'])]
+
+    def __str__(self):
+        return f"{self.transaction_type} {self.month:%Y-%m} for {self.user.username}: {self.total}"
+
+
+class WeeklyCategorySpend(models.Model):
+    """Expense total for one category in one (Monday-based) week, kept current on writes."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    week_start = models.DateField()
+    total = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        unique_together = ('user', 'category', 'week_start')
+
+    def __str__(self):
+        return f"{self.category.name} week of {self.week_start}: {self.total}"
+
+
+class SpendingBaseline(models.Model):
+    """Running moments of weekly spend per category over the user's lookback window."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    weeks = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0)
+    total_sq = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'category')
+
+    def __str__(self):
+        return f"{self.category.name} spending baseline for {self.user.username}"
+
+
+class SpendingBaselineState(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='spending_baseline_state')
+    lookback_weeks = models.PositiveIntegerField()
+    # Last closed week folded into the baselines
+    through_week = models.DateField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Spending baseline state for {self.user.username}"
+
+
+class Alert(models.Model):
+    """A triggered alert, written by core.engines.alerts when transactions change."""
+    KINDS = [
+        ('SPENDING', 'Unusual weekly spending'),
+        ('BUDGET', 'Budget'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='alerts')
+    kind = models.CharField(max_length=10, choices=KINDS)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, null=True, blank=True)
+    # Week start for spending alerts, budget start date for budget alerts
+    period_start = models.DateField()
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    threshold = models.DecimalField(max_digits=14, decimal_places=2)
+    message = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category', 'period_start'], condition=models.Q(kind='SPENDING'),
+                name='unique_spending_alert_per_week',
+            ),
+            models.UniqueConstraint(fields=['budget'], condition=models.Q(kind='BUDGET'), name='unique_budget_alert'),
+        ]
+        indexes = [models.Index(fields=['user', 'kind', 'period_start'])]
 
     def __str__(self):
-        return f"{self.user.username}'s Profile"
\ No newline at end of file
+        return f"{self.get_kind_display()} alert for {self.user.username}: {self.message}"
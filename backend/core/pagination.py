@@ -0,0 +1,85 @@
+import base64
+import binascii
+from datetime import date
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TransactionKeysetPagination(BasePagination):
+    """
+    Newest-first pages keyed on (date, id). The cursor holds the last row's
+    position and the next page starts strictly after it, so every page is an
+    index range scan with no OFFSET, however deep the client has scrolled.
+
+    ?page_size= picks the page size (up to 500). The total count is only
+    computed for the first page; pass ?count=false to skip it there too, or
+    ?count=true to get it on later pages as well.
+    """
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    # Ids are bigints; a larger one in a cursor would overflow the query parameter
+    max_id = 2 ** 63 - 1
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def encode_cursor(self, position):
+        day, pk = position
+        return base64.urlsafe_b64encode(f'{day.isoformat()}:{pk}'.encode()).decode()
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            day, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+            day, pk = date.fromisoformat(day), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound('Invalid cursor.')
+        if not 1 <= pk <= self.max_id:
+            raise NotFound('Invalid cursor.')
+        return day, pk
+
+    def wants_count(self, request, position):
+        value = request.query_params.get(self.count_query_param)
+        if value is None:
+            return position is None
+        return value.lower() in ('1', 'true', 'yes')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        self.count = queryset.count() if self.wants_count(request, position) else None
+        if position is not None:
+            day, pk = position
+            queryset = queryset.filter(Q(date__lt=day) | Q(date=day, id__lt=pk))
+        # One extra row tells us whether there is a next page without counting
+        rows = list(queryset.order_by('-date', '-id')[:size + 1])
+        self.next_position = (rows[size - 1].date, rows[size - 1].id) if len(rows) > size else None
+        return rows[:size]
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link()}
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['results'] = data
+        return Response(payload)
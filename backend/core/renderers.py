@@ -0,0 +1,56 @@
+"""
+orjson-backed JSON rendering.
+
+FastJSONRenderer produces exactly the bytes DRF's JSONRenderer would, just
+faster. Anything orjson doesn't handle the same way goes through DRF's own
+encoder: datetimes, Decimals (which serializers have already turned into
+strings, and which plain views get as floats), numpy values and so on.
+Output orjson would format differently is rendered by DRF instead:
+  - pretty printing (?indent or the browsable API)
+  - settings that turn off compact or unicode output
+  - floats json writes in exponent notation: orjson writes 1e16 for 1e+16
+    and 0.00001 for 1e-05
+  - ints too big for 64 bits
+The one difference left: NaN and infinity render as null, where
+JSONRenderer raises.
+
+Without orjson installed it is just JSONRenderer.
+"""
+import re
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional; fall back to the stdlib encoder
+    orjson = None
+
+OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+# Floats orjson formats differently from json: exponents ("1e16", "1e-7")
+# and small numbers in plain notation ("0.00001"). Either can also be string
+# text that happens to look like one, which only costs a re-render. Both
+# patterns start with a literal so the scan stays cheap on large pages.
+EXPONENT = re.compile(rb'e(?<=\de)[-\d]')
+SMALL = re.compile(rb'0\.0000(?<![\d.]0\.0000)')
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if EXPONENT.search(ret) or SMALL.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping as JSONRenderer, so the output stays a strict javascript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
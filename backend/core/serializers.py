@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.utils import timezone
 # Add , Transaction to this import line
-from .models import Account, Transaction, Category, Budget, InvestmentAccount, Holding, Loan, LoanPayment, LoanDisbursement, NetWorthSnapshot, Subscription, Goal, UserProfile
+from .models import Account, Transaction, Category, Budget, InvestmentAccount, Holding, Loan, LoanPayment, LoanDisbursement, NetWorthSnapshot, Subscription, Goal, UserProfile, ImportJob
 from rest_framework.validators import UniqueValidator
 
 # This serializer is ONLY for creating a new user.
@@ -55,28 +56,6 @@ class TransactionSerializer(serializers.ModelSerializer):
         model = Transaction
         fields = ['id', 'description', 'amount', 'transaction_type', 'date', 'account', 'category', 'account_name']
         
-class TransactionBulkCreateSerializer(serializers.ModelSerializer):
-    category_name = serializers.CharField(source='category.name', required=False, allow_blank=True)
-
-    class Meta:
-        model = Transaction
-        fields = ['description', 'amount', 'transaction_type', 'date', 'category', 'category_name', 'account']
-        read_only_fields = ['category']
-
-    def create(self, validated_data):
-        category_data = validated_data.pop('category', None)
-        category_name = category_data.get('name') if category_data else None
-
-        # Get the current user from the context
-        user = self.context['request'].user
-
-        if category_name:
-            # Find or create the category for the user
-            category, created = Category.objects.get_or_create(user=user, name__iexact=category_name, defaults={'name': category_name})
-            validated_data['category'] = category
-
-        return Transaction.objects.create(**validated_data)
-        
 class BudgetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Budget
@@ -96,6 +75,15 @@ class InvestmentAccountSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'brokerage', 'holdings']
         read_only_fields = ['user']
         
+class InvestmentAccountSummarySerializer(serializers.ModelSerializer):
+    # Filled in by annotations on the queryset, see InvestmentAccountListCreate
+    holding_count = serializers.IntegerField(read_only=True)
+    total_cost_basis = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = InvestmentAccount
+        fields = ['id', 'name', 'brokerage', 'holding_count', 'total_cost_basis']
+
 class LoanDisbursementSerializer(serializers.ModelSerializer):
     class Meta:
         model = LoanDisbursement
@@ -115,6 +103,18 @@ class LoanSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'interest_rate', 'repayment_start_date', 'payments', 'disbursements']
         read_only_fields = ['user', 'slug']
         
+class LoanSummarySerializer(serializers.ModelSerializer):
+    # Filled in by annotations on the queryset, see LoanListCreate
+    payment_count = serializers.IntegerField(read_only=True)
+    total_paid = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    disbursement_count = serializers.IntegerField(read_only=True)
+    total_disbursed = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Loan
+        fields = ['id', 'name', 'slug', 'interest_rate', 'repayment_start_date',
+                  'payment_count', 'total_paid', 'disbursement_count', 'total_disbursed']
+
 class NetWorthSnapshotSerializer(serializers.ModelSerializer):
     class Meta:
         model = NetWorthSnapshot
@@ -123,7 +123,7 @@ class NetWorthSnapshotSerializer(serializers.ModelSerializer):
 class SubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subscription
-        fields = ['id', 'name', 'last_payment_date', 'estimated_amount', 'is_active']
+        fields = ['id', 'name', 'last_payment_date', 'estimated_amount', 'cadence', 'is_active']
         read_only_fields = ['user']
         
 class GoalSerializer(serializers.ModelSerializer):
@@ -135,4 +135,20 @@ class GoalSerializer(serializers.ModelSerializer):
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
-        fields = ['round_ups_enabled', 'round_up_source_account', 'round_up_target_account']
\ No newline at end of file
+        fields = ['round_ups_enabled', 'round_up_source_account', 'round_up_target_account']
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    throughput = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = ['id', 'account', 'status', 'rows_processed', 'rows_created', 'rows_duplicate', 'rows_rejected',
+                  'throughput', 'errors', 'error_message', 'created_at', 'started_at', 'finished_at']
+
+    def get_throughput(self, obj):
+        # Rows per second since the worker picked the job up
+        if not obj.started_at:
+            return None
+        end = obj.finished_at or timezone.now()
+        elapsed = (end - obj.started_at).total_seconds()
+        return round(obj.rows_processed / elapsed, 1) if elapsed > 0 else None
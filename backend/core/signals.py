@@ -0,0 +1,269 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import versioned_cache
+from .engines import alerts, category_index, loan_ledger, rollups
+from .engines import subscriptions as subscription_discovery
+from .models import (
+    Account, Alert, Budget, Category, Holding, InvestmentAccount, Loan, LoanDisbursement, LoanPayment, Subscription,
+    Transaction,
+)
+
+
+def _delete_batch(origin, name, flush):
+    """
+    A dict shared by every row deleted together: a queryset delete, or a
+    cascade from one object, sends each row's signal with the same origin.
+    The first row creates it and schedules flush(batch) for after commit.
+    """
+    batch = getattr(origin, name, None) if origin is not None else None
+    if batch is None:
+        batch = {}
+        if origin is not None:
+            setattr(origin, name, batch)
+        transaction.on_commit(lambda: flush(batch))
+    return batch
+
+
+# --- Loan ledger ---
+
+@receiver(pre_save, sender=LoanPayment)
+@receiver(pre_save, sender=LoanDisbursement)
+def remember_previous_loan_event(sender, instance, **kwargs):
+    # An edit can move an event earlier or later, or onto another loan
+    instance._previous_state = None
+    if instance.pk:
+        instance._previous_state = sender.objects.filter(pk=instance.pk).values('loan_id', 'date').first()
+
+
+@receiver(post_save, sender=LoanPayment)
+@receiver(post_save, sender=LoanDisbursement)
+def update_ledger_on_event_save(sender, instance, **kwargs):
+    from_date = instance.date
+    previous = getattr(instance, '_previous_state', None)
+    if previous:
+        if previous['loan_id'] != instance.loan_id:
+            loan_ledger.rebuild(Loan.objects.get(pk=previous['loan_id']), previous['date'])
+        else:
+            from_date = min(from_date, previous['date'])
+    loan_ledger.rebuild(instance.loan, from_date)
+
+
+@receiver(post_delete, sender=LoanPayment)
+@receiver(post_delete, sender=LoanDisbursement)
+def update_ledger_on_event_delete(sender, instance, origin=None, **kwargs):
+    # When the loan (or its owner) is being deleted its checkpoint goes with it
+    if isinstance(origin, (Loan, User)) or getattr(origin, 'model', None) in (Loan, User):
+        return
+    loan = Loan.objects.filter(pk=instance.loan_id).first()
+    if loan is not None:
+        loan_ledger.rebuild(loan, instance.date)
+
+
+@receiver(pre_save, sender=Loan)
+def remember_previous_interest_rate(sender, instance, **kwargs):
+    instance._previous_rate = None
+    if instance.pk:
+        instance._previous_rate = sender.objects.filter(pk=instance.pk).values_list('interest_rate', flat=True).first()
+
+
+@receiver(post_save, sender=Loan)
+def update_ledger_on_loan_save(sender, instance, created, **kwargs):
+    # A new interest rate changes every accrual, so replay the whole history
+    if created or instance._previous_rate != instance.interest_rate:
+        loan_ledger.rebuild(instance)
+
+
+# --- Previous transaction state, for the handlers below ---
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, **kwargs):
+    instance._previous_state = None
+    if instance.pk:
+        instance._previous_state = sender.objects.filter(pk=instance.pk).values(
+            'description', 'category_id', 'user_id', 'transaction_type', 'date', 'amount'
+        ).first()
+
+
+# --- Monthly category totals ---
+# These run inside the write's own transaction so the rollup can't drift from the rows
+
+@receiver(post_save, sender=Transaction)
+def update_monthly_totals_on_save(sender, instance, **kwargs):
+    deltas = {}
+    previous = getattr(instance, '_previous_state', None)
+    if previous:
+        rollups.add(deltas, previous['user_id'], previous['category_id'], previous['date'],
+                    previous['transaction_type'], previous['amount'], sign=-1)
+    rollups.add(deltas, instance.user_id, instance.category_id, instance.date,
+                instance.transaction_type, instance.amount)
+    rollups.apply(deltas)
+
+
+@receiver(pre_delete, sender=Transaction)
+def collect_monthly_totals_on_delete(sender, instance, origin=None, **kwargs):
+    # The user's totals are deleted along with the user
+    if isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+    # A delete sends every row's pre_delete before the first post_delete, so
+    # rows deleted together (a queryset or a cascade) are applied as one batch
+    if origin is not None:
+        deltas = origin.__dict__.setdefault('_rollup_deltas', {})
+    else:
+        deltas = instance._rollup_deltas = {}
+    rollups.add(deltas, instance.user_id, instance.category_id, instance.date,
+                instance.transaction_type, instance.amount, sign=-1)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_monthly_totals_on_delete(sender, instance, origin=None, **kwargs):
+    deltas = (origin if origin is not None else instance).__dict__.pop('_rollup_deltas', None)
+    if deltas:
+        rollups.apply(deltas)
+
+
+@receiver(pre_delete, sender=Category)
+def uncategorize_monthly_totals(sender, instance, **kwargs):
+    # The category's transactions are set to NULL with an UPDATE that sends no signals
+    rollups.uncategorize(instance)
+
+
+# --- Subscription discovery ---
+# New expenses are picked up by the id high-water mark; edits and deletes of
+# rows already folded into the merchant statistics make the next run rescan
+
+DISCOVERY_FIELDS = ('description', 'date', 'amount', 'transaction_type', 'user_id')
+
+
+@receiver(post_save, sender=Transaction)
+def rescan_subscriptions_on_edit(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    if not previous or 'EXPENSE' not in (previous['transaction_type'], instance.transaction_type):
+        return
+    if all(previous[f] == getattr(instance, f) for f in DISCOVERY_FIELDS):
+        return
+    for user_id in {previous['user_id'], instance.user_id}:
+        subscription_discovery.mark_for_rescan(user_id, [instance.pk])
+
+
+@receiver(post_delete, sender=Transaction)
+def rescan_subscriptions_on_delete(sender, instance, origin=None, **kwargs):
+    if instance.transaction_type != 'EXPENSE' or isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+
+    def flush(batch):
+        for user_id, ids in batch.items():
+            subscription_discovery.mark_for_rescan(user_id, ids)
+    _delete_batch(origin, '_rescan_batch', flush).setdefault(instance.user_id, []).append(instance.pk)
+
+
+# --- Alerts ---
+
+def _expense_key(transaction_type, category_id, day):
+    return [(category_id, day)] if transaction_type == 'EXPENSE' and category_id else []
+
+
+@receiver(post_save, sender=Transaction)
+def evaluate_alerts_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    user_id = instance.user_id
+    touched = _expense_key(instance.transaction_type, instance.category_id, instance.date)
+    if previous:
+        old = _expense_key(previous['transaction_type'], previous['category_id'], previous['date'])
+        if previous['user_id'] != user_id:
+            transaction.on_commit(lambda: alerts.process(previous['user_id'], old))
+        else:
+            touched += old
+    if touched:
+        transaction.on_commit(lambda: alerts.process(user_id, touched))
+
+
+@receiver(post_delete, sender=Transaction)
+def evaluate_alerts_on_delete(sender, instance, origin=None, **kwargs):
+    touched = _expense_key(instance.transaction_type, instance.category_id, instance.date)
+    # A deleted user's alerts go with them
+    if not touched or isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+
+    # Rows deleted together (a queryset or a cascade from their account) are
+    # collected into a single evaluation
+    def flush(batch):
+        for user_id, keys in batch.items():
+            alerts.process(user_id, keys)
+    _delete_batch(origin, '_alert_batch', flush).setdefault(instance.user_id, []).extend(touched)
+
+
+@receiver(post_save, sender=Budget)
+def evaluate_budget_alert(sender, instance, **kwargs):
+    # Bulk updates of `spent` don't send signals, so this only runs for real edits
+    transaction.on_commit(lambda: alerts.refresh_budgets(instance.user_id, Budget.objects.filter(pk=instance.pk)))
+
+
+# --- Versioned analytics cache ---
+# Loan payments and disbursements bump 'loans' through the ledger rebuild.
+# Bulk writes (imports, subscription discovery, alert refreshes) bump their
+# domains themselves.
+
+CACHE_DOMAINS = {
+    Transaction: 'transactions',
+    Account: 'accounts',
+    Loan: 'loans',
+    Subscription: 'subscriptions',
+    Holding: 'holdings',
+    InvestmentAccount: 'holdings',
+    Alert: 'alerts',
+}
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+@receiver([post_save, post_delete], sender=Account)
+@receiver([post_save, post_delete], sender=Loan)
+@receiver([post_save, post_delete], sender=Subscription)
+@receiver([post_save, post_delete], sender=Holding)
+@receiver([post_save, post_delete], sender=InvestmentAccount)
+@receiver([post_save, post_delete], sender=Alert)
+def bump_cache_version(sender, instance, origin=None, **kwargs):
+    # origin is the deleted object or queryset that started a cascade
+    origin_model = type(origin) if isinstance(origin, Model) else getattr(origin, 'model', None)
+    # A deleted user's entries are never read again, and a deleted investment
+    # account bumps 'holdings' itself rather than once per holding
+    if origin_model is User or (sender is Holding and origin_model is InvestmentAccount):
+        return
+    user_id = instance.investment_account.user_id if sender is Holding else instance.user_id
+    versioned_cache.bump(user_id, CACHE_DOMAINS[sender])
+
+
+@receiver(pre_delete, sender=Category)
+def bump_cache_version_on_category_delete(sender, instance, **kwargs):
+    # The category's transactions are set to NULL with an UPDATE that sends no signals
+    versioned_cache.bump(instance.user_id, 'transactions')
+
+
+# --- Category suggestion index ---
+# Connected after bump_cache_version: outside a transaction on_commit runs at
+# once, and an index is only patched on top of its own write's version bump
+
+@receiver(post_save, sender=Transaction)
+def update_category_index_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    new = (instance.description, instance.category_id)
+    if previous and previous['user_id'] != instance.user_id:
+        category_index.invalidate(previous['user_id'])
+        category_index.apply_change(instance.user_id, new=new)
+    else:
+        old = (previous['description'], previous['category_id']) if previous else None
+        category_index.apply_change(instance.user_id, old=old, new=new)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_category_index_on_delete(sender, instance, **kwargs):
+    category_index.apply_change(instance.user_id, old=(instance.description, instance.category_id))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_index(sender, instance, **kwargs):
+    category_index.invalidate(instance.user_id)
@@ -1,3 +1,1548 @@
-from django.test import TestCase
+import io
+import json
+import random
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import versioned_cache
+from .checks import check_shared_caches
+from .engines import (
+    alerts, category_index, fingerprints, portfolio, recurrence, rollups, roundups, spending, subscriptions,
+)
+from .engines.fingerprints import base_key, fingerprint
+from .engines.forecast import PERCENTILES, deterministic_forecast, monte_carlo_forecast, scheduled_events
+from .engines.imports import TransactionImporter, claim_next_job, process_import_job
+from .engines.loans import LoanBook, compare_strategies, to_cents
+from .marketdata import FileProvider, MarketDataClient, ProviderError, Quote, QuoteNotFound, QuoteProvider
+from .models import (
+    Account, Budget, Category, Goal, Holding, ImportJob, InvestmentAccount, Loan, LoanBalance,
+    LoanDisbursement, LoanPayment, MerchantCadence, MonthlyCategoryTotal, NetWorthSnapshot, SpendingBaseline,
+    SpendingBaselineState, Subscription, SubscriptionDiscoveryState, Transaction, UserProfile,
+)
+from .pagination import TransactionKeysetPagination
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .serializers import TransactionSerializer
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImportTests(TestCase):
+    HEADER = 'Date,Description,Amount,Category\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('importer', password='x')
+        cls.account = Account.objects.create(user=cls.user, name='Checking', account_type='CHECKING', balance=Decimal('0'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, body, **data):
+        upload = SimpleUploadedFile('transactions.csv', body if isinstance(body, bytes) else body.encode())
+        return self.client.post('/api/transactions/bulk-upload/', {'file': upload, 'account_id': self.account.id, **data})
+
+    def test_long_category_rejects_only_its_row(self):
+        response = self.upload(self.HEADER + f'2024-01-02,Rent,-900,{"x" * 101}\n2024-01-03,Coffee,-4.50,Food\n')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['rows_created'], response.data['rows_rejected']), (1, 1))
+        self.assertEqual(response.data['errors'], [{'row': 2, 'error': 'Category is longer than 100 characters.'}])
+
+    def test_unreadable_file_reports_rows_already_imported(self):
+        body = (self.HEADER + ''.join(f'2024-01-{day:02},Coffee {day},-4.50,Food\n' for day in range(1, 6))).encode()
+        response = self.upload(body + b'2024-01-06,Caf\xe9,-4.50,Food\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['rows_created'], 5)
+        self.assertIn('5 transactions before that point were imported', response.data['error'])
+        self.assertEqual(Transaction.objects.filter(account=self.account).count(), 5)
+
+    def queue(self, body):
+        response = self.upload(body, background='1')
+        self.assertEqual(response.status_code, 202, response.data)
+        return ImportJob.objects.get(pk=response.data['id'])
+
+    def test_background_job_reports_progress(self):
+        queued = self.queue(self.HEADER + '2024-01-02,Coffee,-4.50,Food\n' * 2500 + 'not a date,Rent,-900,\n')
+        job = claim_next_job()
+        self.assertEqual((job.pk, job.status, job.attempts), (queued.pk, 'RUNNING', 1))
+        self.assertIsNone(claim_next_job())
+
+        with CaptureQueriesContext(connection) as queries:
+            process_import_job(job, chunk_size=1000)
+        progress = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "core_importjob"')]
+        self.assertGreaterEqual(len(progress), 3)  # one per chunk, then the final save
+
+        data = self.client.get(f'/api/imports/{job.pk}/').data
+        self.assertEqual(data['status'], 'DONE')
+        self.assertEqual((data['rows_processed'], data['rows_created'], data['rows_rejected']), (2501, 2500, 1))
+        self.assertFalse(ImportJob.objects.get(pk=job.pk).file)
+
+    def test_unreadable_job_fails_with_partial_counts(self):
+        self.queue((self.HEADER + '2024-01-02,Coffee,-4.50,Food\n').encode() + b'2024-01-03,Caf\xe9,-4.50,Food\n')
+        job = process_import_job(claim_next_job())
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIn('codec', job.error_message)
+        self.assertEqual(job.rows_created, 1)
+
+    def test_stale_running_job_is_reclaimed(self):
+        queued = self.queue(self.HEADER + '2024-01-02,Coffee,-4.50,Food\n')
+        stale = datetime.now(timezone.utc) - timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS + 1)
+        for attempt in range(1, settings.IMPORT_JOB_MAX_ATTEMPTS + 1):
+            job = claim_next_job()
+            self.assertEqual((job.pk, job.attempts), (queued.pk, attempt))
+            # The worker dies without another heartbeat
+            ImportJob.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+
+        self.assertIsNone(claim_next_job())
+        job = ImportJob.objects.get(pk=queued.pk)
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIn('stopped responding', job.error_message)
+
+
+class FingerprintTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('prints', password='x')
+        cls.account = Account.objects.create(user=cls.user, name='Checking', account_type='CHECKING', balance=Decimal('0'))
+
+    def coffee(self, **fields):
+        return Transaction.objects.create(**{
+            'account': self.account, 'description': 'Coffee', 'amount': Decimal('4.50'),
+            'transaction_type': 'EXPENSE', 'date': date(2024, 1, 2), **fields,
+        })
+
+    def key(self, description='Coffee'):
+        return base_key(self.account.id, date(2024, 1, 2), Decimal('4.50'), 'EXPENSE', description)
+
+    def test_identical_rows_get_consecutive_ordinals(self):
+        first, second = self.coffee(), self.coffee(description='  COFFEE ')
+        self.assertEqual([first.fingerprint, second.fingerprint], [fingerprint(self.key(), 0), fingerprint(self.key(), 1)])
+
+        # Unrelated edits keep the ordinal, and a freed ordinal is reused
+        first.category = Category.objects.create(user=self.user, name='Food')
+        first.save()
+        self.assertEqual(first.fingerprint, fingerprint(self.key(), 0))
+        first.delete()
+        self.assertEqual(self.coffee().fingerprint, fingerprint(self.key(), 0))
+
+    def test_reimport_skips_duplicates(self):
+        csv_file = 'Date,Description,Amount\n2024-01-02,Coffee,-4.50\n2024-01-02,Coffee,-4.50\n2024-01-03,Rent,-900\n'
+        report = TransactionImporter(self.account).run_csv(io.BytesIO(csv_file.encode()))
+        self.assertEqual((report.rows_created, report.rows_duplicate), (3, 0))
+
+        # The same export plus a third identical coffee: only the new one is added
+        overlap = csv_file + '2024-01-02,Coffee,-4.50\n'
+        report = TransactionImporter(self.account).run_csv(io.BytesIO(overlap.encode()))
+        self.assertEqual((report.rows_created, report.rows_duplicate), (1, 3))
+        self.assertEqual(Transaction.objects.filter(description='Coffee').count(), 3)
+
+        # Rows saved one by one line up with imported ones
+        self.assertEqual(self.coffee().fingerprint, fingerprint(self.key(), 3))
+
+    def test_concurrent_import_counts_overlap_as_duplicates(self):
+        csv_file = 'Date,Description,Amount\n2024-01-02,Coffee,-4.50\n2024-01-03,Rent,-900\n'
+        TransactionImporter(self.account).run_csv(io.BytesIO(csv_file.encode()))
+        skip_existing = TransactionImporter._skip_existing
+        calls = []
+
+        def stale_check(importer, chunk):
+            # The first check runs before the other import commits
+            calls.append(len(chunk))
+            return chunk if len(calls) == 1 else skip_existing(importer, chunk)
+
+        overlap = csv_file + '2024-01-04,Gym,-30\n'
+        with mock.patch.object(TransactionImporter, '_skip_existing', stale_check):
+            report = TransactionImporter(self.account).run_csv(io.BytesIO(overlap.encode()))
+        self.assertEqual((report.rows_created, report.rows_duplicate, report.rows_rejected), (1, 2, 0))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 3)
+
+    def test_concurrent_identical_save_takes_next_ordinal(self):
+        self.coffee()
+        real = fingerprints.assign_fingerprint
+        calls = []
+
+        def stale_read(instance):
+            # The first attempt sees the database from before the other save committed
+            calls.append(instance.fingerprint)
+            if len(calls) == 1:
+                instance.fingerprint = fingerprint(self.key(), 0)
+            else:
+                real(instance)
+
+        with mock.patch.object(fingerprints, 'assign_fingerprint', stale_read):
+            second = self.coffee()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(second.fingerprint, fingerprint(self.key(), 1))
+
+
+class LoanLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('borrower', password='x')
+
+    def setUp(self):
+        self.loan = Loan.objects.create(user=self.user, name='Car', interest_rate=Decimal('6.00'), repayment_start_date=date(2024, 1, 1))
+        LoanDisbursement.objects.create(loan=self.loan, date=date(2024, 1, 1), amount=Decimal('10000.00'))
+        self.payments = [
+            LoanPayment.objects.create(loan=self.loan, date=date(2024, month, 15), amount=Decimal('500.00'))
+            for month in range(2, 8)
+        ]
+
+    def replay(self, loan):
+        """(balance, interest) after every event, straight from the full history."""
+        events = sorted(
+            [(d.date, 0, d.id, d.amount) for d in loan.disbursements.all()]
+            + [(p.date, 1, p.id, -p.amount) for p in loan.payments.all()]
+        )
+        rate = Decimal(str(loan.interest_rate)) / 100 / 365
+        balance = interest = Decimal('0')
+        last, states = None, {}
+        for day, kind, pk, amount in events:
+            if last is not None and balance > 0:
+                accrued = balance * rate * (day - last).days
+                balance += accrued
+                interest += accrued
+            balance += amount
+            last = day
+            states[(kind, pk)] = (balance, interest)
+        return states, balance, last
+
+    def assertLedgerMatchesReplay(self, loan):
+        loan.refresh_from_db()
+        states, balance, last = self.replay(loan)
+        stored = {(0, d.id): (d.running_balance, d.running_interest) for d in loan.disbursements.all()}
+        stored.update({(1, p.id): (p.running_balance, p.running_interest) for p in loan.payments.all()})
+        self.assertEqual(stored.keys(), states.keys())
+        for key, (balance_after, interest_after) in states.items():
+            self.assertAlmostEqual(stored[key][0], balance_after, places=6, msg=key)
+            self.assertAlmostEqual(stored[key][1], interest_after, places=6, msg=key)
+        checkpoint = LoanBalance.objects.get(loan=loan)
+        self.assertAlmostEqual(checkpoint.balance, balance, places=6)
+        self.assertEqual(checkpoint.as_of_date, last)
+
+    def test_edits_replay_from_the_affected_date(self):
+        self.assertLedgerMatchesReplay(self.loan)
+
+        payment = self.payments[3]
+        payment.amount = Decimal('2000.00')
+        payment.save()
+        self.assertLedgerMatchesReplay(self.loan)
+
+        # Moving a payment earlier replays from its old position's predecessor onwards
+        payment.date = date(2024, 1, 20)
+        payment.save()
+        self.assertLedgerMatchesReplay(self.loan)
+
+    def test_delete_and_move_between_loans(self):
+        self.payments[1].delete()
+        self.assertLedgerMatchesReplay(self.loan)
+
+        other = Loan.objects.create(user=self.user, name='Bike', interest_rate=Decimal('3.00'), repayment_start_date=date(2024, 1, 1))
+        LoanDisbursement.objects.create(loan=other, date=date(2024, 1, 1), amount=Decimal('3000.00'))
+        moved = self.payments[4]
+        moved.loan = other
+        moved.save()
+        self.assertLedgerMatchesReplay(self.loan)
+        self.assertLedgerMatchesReplay(other)
+
+    def test_rate_change_replays_everything(self):
+        self.loan.interest_rate = Decimal('12.00')
+        self.loan.save()
+        self.assertLedgerMatchesReplay(self.loan)
+        self.assertGreater(LoanBalance.objects.get(loan=self.loan).accrued_interest, Decimal('300'))
+
+    def test_deleting_the_borrower_skips_the_rebuild(self):
+        user = User.objects.create_user('leaving', password='x')
+        loan = Loan.objects.create(user=user, name='Bike', interest_rate=Decimal('5.00'), repayment_start_date=date(2024, 1, 1))
+        LoanDisbursement.objects.create(loan=loan, date=date(2024, 1, 1), amount=Decimal('1000.00'))
+        LoanPayment.objects.create(loan=loan, date=date(2024, 2, 1), amount=Decimal('100.00'))
+        user.delete()
+        self.assertFalse(Loan.objects.filter(pk=loan.pk).exists())
+        self.assertFalse(LoanBalance.objects.filter(loan_id=loan.pk).exists())
+
+
+FakeLoan = namedtuple('FakeLoan', ['id', 'interest_rate'])
+
+
+def decimal_simulate_payoff(loans_with_balances, extra_payment):
+    """The debt optimizer's original Decimal loop, kept as the reference implementation."""
+    months = 0
+    total_interest_paid = Decimal('0')
+    sim_loans = [{'loan': l, 'balance': b} for l, b in loans_with_balances if b > 0]
+    while any(l['balance'] > 0 for l in sim_loans):
+        months += 1
+        monthly_extra_payment = extra_payment
+        for l_data in sim_loans:
+            if l_data['balance'] > 0:
+                monthly_interest = l_data['balance'] * (l_data['loan'].interest_rate / 100 / 12)
+                l_data['balance'] += monthly_interest
+                total_interest_paid += monthly_interest
+        for l_data in sim_loans:
+            if l_data['balance'] > 0:
+                monthly_interest = l_data['balance'] * (l_data['loan'].interest_rate / 100 / 12)
+                payment = min(l_data['balance'], monthly_interest + 50)
+                l_data['balance'] -= payment
+        for l_data in sim_loans:
+            if l_data['balance'] > 0 and monthly_extra_payment > 0:
+                payment = min(l_data['balance'], monthly_extra_payment)
+                l_data['balance'] -= payment
+                monthly_extra_payment -= payment
+        if months > 1200:
+            return {'error': 'Calculation timed out.'}
+    return {'months_to_payoff': months, 'total_interest_paid': round(total_interest_paid, 2)}
+
+
+class LoanSimulationTests(SimpleTestCase):
+    def random_loans(self, rng, count):
+        return [
+            (FakeLoan(i + 1, Decimal(rng.randint(100, 2500)) / 100), Decimal(rng.randint(50000, 5000000)) / 100)
+            for i in range(count)
+        ]
+
+    def assert_matches_reference(self, pairs, extras):
+        book = LoanBook.from_loans(pairs)
+        result = compare_strategies(book, ['avalanche', 'snowball'], extras)
+        orderings = {
+            'avalanche': sorted(pairs, key=lambda p: p[0].interest_rate, reverse=True),
+            'snowball': sorted(pairs, key=lambda p: p[1]),
+        }
+        for i, strategy in enumerate(['avalanche', 'snowball']):
+            for j, extra in enumerate(extras):
+                expected = decimal_simulate_payoff(orderings[strategy], Decimal(extra))
+                if 'error' in expected:
+                    self.assertTrue(result.timed_out[i, j])
+                    continue
+                self.assertFalse(result.timed_out[i, j])
+                self.assertEqual(int(result.months[i, j]), expected['months_to_payoff'])
+                self.assertEqual(to_cents(result.total_interest[i, j]), expected['total_interest_paid'])
+
+    def test_matches_decimal_reference(self):
+        rng = random.Random(42)
+        for count in (1, 2, 3, 5):
+            self.assert_matches_reference(self.random_loans(rng, count), [0, 50, 100, 500, 2000])
+
+    def test_timeout_matches_reference(self):
+        # Interest outpaces the minimum payment, so the balance never clears
+        pairs = [(FakeLoan(1, Decimal('24.00')), Decimal('1000000.00'))]
+        self.assert_matches_reference(pairs, [0])
+
+    def test_no_loans(self):
+        result = compare_strategies(LoanBook.from_loans([]), ['avalanche', 'snowball'], [0, 100])
+        self.assertEqual(result.months.tolist(), [[0, 0], [0, 0]])
+        self.assertFalse(result.timed_out.any())
+
+    def test_custom_order(self):
+        pairs = [(FakeLoan(7, Decimal('5.00')), Decimal('1000')), (FakeLoan(9, Decimal('9.00')), Decimal('2000'))]
+        book = LoanBook.from_loans(pairs)
+        custom = compare_strategies(book, ['custom'], [300], custom_order=[9, 7])
+        avalanche = compare_strategies(book, ['avalanche'], [300])
+        self.assertEqual(custom.months.tolist(), avalanche.months.tolist())
+        with self.assertRaises(ValueError):
+            book.order('custom', custom_order=[9])
+
+
+class DebtOptimizerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('debtor', password='x')
+        today = date.today()
+        cls.loans = []
+        for name, rate, amount in (('Card', '19.99', '4000.00'), ('Car', '5.00', '12000.00'), ('Student', '4.00', '2000.00')):
+            loan = Loan.objects.create(user=cls.user, name=name, interest_rate=Decimal(rate), repayment_start_date=today)
+            LoanDisbursement.objects.create(loan=loan, date=today, amount=Decimal(amount))
+            cls.loans.append(loan)
+
+    def setUp(self):
+        versioned_cache.backend().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, query, status=200):
+        response = self.client.get(f'/api/debt-optimizer/?{query}')
+        self.assertEqual(response.status_code, status, response.data)
+        return response.data
+
+    def test_single_scenario(self):
+        data = self.get('extra_payment=100')
+        self.assertEqual(list(data), ['avalanche', 'snowball'])
+        self.assertLessEqual(data['avalanche']['total_interest_paid'], data['snowball']['total_interest_paid'])
+
+    def test_sweeps(self):
+        data = self.get('extra_payments=0,50,,200&strategies=avalanche')
+        self.assertEqual(data['extra_payments'], [Decimal('0'), Decimal('50'), Decimal('200')])
+        self.assertEqual((len(data['months_to_payoff']), len(data['months_to_payoff'][0])), (1, 3))
+        # More extra money never makes payoff slower
+        months = data['months_to_payoff'][0]
+        self.assertEqual(months, sorted(months, reverse=True))
+
+        data = self.get('extra_min=100&extra_max=300&extra_step=100')
+        self.assertEqual(data['strategies'], ['avalanche', 'snowball'])
+        self.assertEqual(data['extra_payments'], [Decimal('100'), Decimal('200'), Decimal('300')])
+        # extra_max defaults to extra_min
+        self.assertEqual(self.get('extra_min=75')['extra_payments'], [Decimal('75')])
+
+        order = ','.join(str(loan.id) for loan in reversed(self.loans))
+        data = self.get(f'strategies=custom,avalanche&custom_order={order}&extra_payments=100')
+        self.assertEqual(data['strategies'], ['custom', 'avalanche'])
+
+    def test_invalid_sweeps(self):
+        for query in (
+            'extra_payments=10,abc',
+            'extra_payments=-5',
+            'extra_payments=NaN',
+            'extra_min=100&extra_max=50',
+            'extra_min=0&extra_max=100&extra_step=0',
+            'extra_min=0&extra_max=100000&extra_step=1',
+            'strategies=avalanche,random',
+            f'strategies=custom&custom_order={self.loans[0].id}',
+            'strategies=avalanche,snowball&extra_min=0&extra_max=999&extra_step=1',
+        ):
+            with self.subTest(query):
+                self.assertIn('error', self.get(query, status=400))
+
+
+class CadenceDetectionTests(SimpleTestCase):
+    def stats(self, gaps, amounts=None, start=date(2024, 1, 3)):
+        merchant = subscriptions.MerchantStats()
+        when = start
+        amounts = amounts or [Decimal('15.99')] * (len(gaps) + 1)
+        merchant.add(when, amounts[0])
+        for gap, amount in zip(gaps, amounts[1:]):
+            when += timedelta(days=gap)
+            merchant.add(when, amount)
+        return merchant
+
+    def test_known_cadences(self):
+        for gaps, cadence in (
+            ([7] * 8, 'WEEKLY'),
+            ([14, 13, 15, 14], 'BIWEEKLY'),
+            ([31, 29, 31, 30, 31, 30], 'MONTHLY'),
+            ([92, 91, 90], 'QUARTERLY'),
+            ([365, 366], 'ANNUAL'),
+        ):
+            with self.subTest(cadence):
+                detected, confidence = self.stats(gaps).detect_cadence()
+                self.assertEqual(detected, cadence)
+                self.assertGreater(confidence, 0.9)
+
+    def test_irregular_or_unstable_payments_are_not_subscriptions(self):
+        self.assertIsNone(self.stats([]).detect_cadence())  # a single payment
+        self.assertIsNone(self.stats([50, 45, 55]).detect_cadence())  # mean matches no cadence
+        self.assertIsNone(self.stats([2, 58, 3, 57]).detect_cadence())  # monthly on average, but irregular
+        amounts = [Decimal(a) for a in ('5.00', '80.00', '12.00', '150.00')]
+        self.assertIsNone(self.stats([30, 31, 30], amounts).detect_cadence())
+
+    def test_same_day_charges_dont_count_as_gaps(self):
+        merchant = self.stats([30, 0, 31, 30])
+        self.assertEqual((merchant.count, merchant.gap_count), (5, 3))
+        self.assertEqual(merchant.detect_cadence()[0], 'MONTHLY')
+
+    def test_merchant_key(self):
+        self.assertEqual(subscriptions.normalize_description('NETFLIX.COM  0412 #88231'), 'netflix.com #')
+        self.assertEqual(
+            subscriptions.normalize_description('Spotify 2024-03'), subscriptions.normalize_description('SPOTIFY 2024-04')
+        )
+
+
+class IncrementalDiscoveryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('streamer', password='x')
+        cls.account = Account.objects.create(user=cls.user, name='Checking', account_type='CHECKING', balance=Decimal('0'))
+
+    def pay(self, month, amount='15.99', description='NETFLIX.COM'):
+        return Transaction.objects.create(
+            account=self.account, description=description, amount=Decimal(amount),
+            transaction_type='EXPENSE', date=date(2024, month, 5),
+        )
+
+    def merchant_stats(self):
+        return {
+            row['merchant']: row
+            for row in MerchantCadence.objects.filter(user=self.user).values(*subscriptions.STAT_FIELDS, 'merchant')
+        }
+
+    def assertMatchesFullRescan(self):
+        incremental = self.merchant_stats()
+        subscriptions.discover(self.user, full=True)
+        self.assertEqual(incremental, self.merchant_stats())
+
+    def test_new_payments_are_folded_in(self):
+        for month in (3, 4, 5):
+            self.pay(month)
+        self.assertEqual([sub.name for sub, _, _ in subscriptions.discover(self.user)], ['Netflix.Com'])
+        self.pay(6)
+        self.assertEqual(subscriptions.discover(self.user), [])
+        self.assertEqual(self.merchant_stats()['netflix.com']['count'], 4)
+        self.assertEqual(Subscription.objects.get(user=self.user).last_payment_date, date(2024, 6, 5))
+        self.assertMatchesFullRescan()
+
+    def test_backdated_import_rescans(self):
+        for month in (4, 5, 6):
+            self.pay(month)
+        subscriptions.discover(self.user)
+        csv_file = 'Date,Description,Amount\n2024-02-05,NETFLIX.COM,-15.99\n2024-03-05,NETFLIX.COM,-15.99\n'
+        TransactionImporter(self.account).run_csv(io.BytesIO(csv_file.encode()))
+        subscriptions.discover(self.user)
+        stats = self.merchant_stats()['netflix.com']
+        self.assertEqual((stats['count'], stats['gap_count']), (5, 4))
+        self.assertMatchesFullRescan()
+
+    def test_edits_and_deletes_of_folded_rows_rescan(self):
+        payments = [self.pay(month) for month in range(1, 7)]
+        self.pay(3, amount='40.00', description='Gym')
+        subscriptions.discover(self.user)
+        state = SubscriptionDiscoveryState.objects.get(user=self.user)
+
+        payments[1].description = 'Gym'
+        payments[1].save()
+        state.refresh_from_db()
+        self.assertTrue(state.needs_rescan)
+        subscriptions.discover(self.user)
+        self.assertEqual(self.merchant_stats()['gym']['count'], 2)
+        self.assertMatchesFullRescan()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.filter(pk__in=[payments[2].pk, payments[3].pk]).delete()
+        subscriptions.discover(self.user)
+        self.assertEqual(self.merchant_stats()['netflix.com']['count'], 3)
+        self.assertMatchesFullRescan()
+
+        # A category change doesn't touch the statistics
+        payments[0].category = Category.objects.create(user=self.user, name='Fun')
+        payments[0].save()
+        state.refresh_from_db()
+        self.assertFalse(state.needs_rescan)
+
+
+class CategoryIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('suggest', password='x')
+        cls.account = Account.objects.create(user=cls.user, name='Checking', account_type='CHECKING', balance=Decimal('0'))
+        cls.food = Category.objects.create(user=cls.user, name='Food')
+        cls.drinks = Category.objects.create(user=cls.user, name='Drinks')
+
+    def expense(self, description, category):
+        return Transaction.objects.create(
+            account=self.account, description=description, amount=Decimal('4.50'),
+            transaction_type='EXPENSE', date=date(2024, 1, 2), category=category,
+        )
+
+    def test_writes_from_other_workers_rebuild_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            coffee = self.expense('Blue Bottle Coffee', self.food)
+        self.assertEqual(category_index.suggest(self.user.id, 'blue bot'), {'id': self.food.id, 'name': 'Food'})
+
+        # Another worker recategorizes the row: only the shared version moves here
+        Transaction.objects.filter(pk=coffee.pk).update(category=self.drinks)
+        with self.captureOnCommitCallbacks(execute=True):
+            versioned_cache.bump(self.user.id, 'transactions')
+        self.assertEqual(category_index.suggest(self.user.id, 'blue bot'), {'id': self.drinks.id, 'name': 'Drinks'})
+
+    def test_writes_in_one_commit_patch_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.expense('Corner Cafe', self.food)
+        index = category_index.get_index(self.user.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.expense('Corner Bar', self.drinks)
+            self.expense('Corner Bar Tab', self.drinks)
+        self.assertIs(category_index.get_index(self.user.id), index)
+        self.assertEqual(category_index.suggest(self.user.id, 'corner'), {'id': self.drinks.id, 'name': 'Drinks'})
+
+    def test_deploy_check_flags_per_process_caches(self):
+        self.assertEqual([w.id for w in check_shared_caches(None)], ['core.W001'])
+        redis = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/1'}
+        with override_settings(CACHES={**settings.CACHES, 'analytics': redis}):
+            self.assertEqual(check_shared_caches(None), [])
+
+
+class CashFlowForecastTests(SimpleTestCase):
+    def income_events(self, latest_date, today=date(2025, 3, 10), days=90):
+        income = [('Salary', latest_date, Decimal('2500.00'))]
+        events = scheduled_events(None, today, today + timedelta(days=days), subscriptions=[], recurring_income=income)
+        return [event_date for event_date, _, _ in events]
+
+    def test_every_income_occurrence_in_the_horizon(self):
+        self.assertEqual(self.income_events(date(2025, 2, 28)), [date(2025, 3, 28), date(2025, 4, 28), date(2025, 5, 28)])
+
+    def test_stopped_income_is_dropped(self):
+        self.assertEqual(self.income_events(date(2023, 1, 31)), [])
+        # Next payment due Feb 28 and still missing twelve days later
+        self.assertEqual(self.income_events(date(2025, 1, 28)), [])
+        # A few days late is still a running source
+        self.assertEqual(self.income_events(date(2025, 2, 6))[0], date(2025, 4, 6))
+
+    def test_daily_balances(self):
+        today = date(2025, 3, 1)
+        events = [(today + timedelta(days=2), Decimal('100.00'), 'Pay'), (today + timedelta(days=3), Decimal('-40.00'), 'Gym')]
+        balances = [point['balance'] for point in deterministic_forecast(Decimal('10.00'), events, today, 4)]
+        self.assertEqual(balances, [10.0, 10.0, 110.0, 70.0, 70.0])
+
+
+class MonteCarloForecastTests(SimpleTestCase):
+    def run_forecast(self, seed, paths=10000, days=90):
+        today = date(2025, 3, 1)
+        events = [
+            (today + timedelta(days=14), Decimal('2500.00'), 'Salary'),
+            (today + timedelta(days=44), Decimal('2500.00'), 'Salary'),
+            (today + timedelta(days=5), Decimal('-15.99'), 'Netflix'),
+        ]
+        history = np.array([0, 12.5, 40, 0, 85.2, 3.1, 0, 27] * 10, dtype=np.float64)
+        return monte_carlo_forecast(Decimal('1000.00'), events, history, {'Salary': 3}, today, days, paths, seed)
+
+    def test_seed_reproduces_bands(self):
+        self.assertEqual(self.run_forecast(seed=7), self.run_forecast(seed=7))
+        self.assertNotEqual(self.run_forecast(seed=7)['p50'], self.run_forecast(seed=8)['p50'])
+
+    def test_bands_are_ordered(self):
+        result = self.run_forecast(seed=1)
+        self.assertEqual(len(result['dates']), 91)
+        self.assertEqual(result['p50'][0], 1000.0)
+        for low, mid, high in zip(result['p10'], result['p50'], result['p90']):
+            self.assertLessEqual(low, mid)
+            self.assertLessEqual(mid, high)
+
+    def test_day_zero_matches_deterministic_forecast(self):
+        today = date(2025, 3, 1)
+        events = [(today, Decimal('500.00'), 'Bonus'), (today + timedelta(days=1), Decimal('-20.00'), 'Gym')]
+        line = [point['balance'] for point in deterministic_forecast(Decimal('100.00'), events, today, 3)]
+        bands = monte_carlo_forecast(Decimal('100.00'), events, np.zeros(0), {'Bonus': 2}, today, 3, 50, seed=1)
+        for percentile in PERCENTILES:
+            self.assertEqual(bands[f'p{percentile}'], line)
+
+    def test_negative_seed_is_rejected(self):
+        client = APIClient()
+        client.force_authenticate(User(id=1, username='forecaster'))
+        response = client.get('/api/cash-flow-forecast/?mode=monte_carlo&seed=-1')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'seed must not be negative.'})
+
+
+class SpendingBaselineTests(TestCase):
+    today = date(2025, 6, 4)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('spender', password='x')
+        account = Account.objects.create(user=cls.user, name='Checking', account_type='CHECKING', balance=0)
+        cls.category = Category.objects.create(user=cls.user, name='Dining')
+        this_week = spending.week_start(cls.today)
+        # 100 a week half a year ago, 10 a week for the last 13 closed weeks and 50 so far this week
+        weekly = [(weeks, '100.00') for weeks in range(14, 27)] + [(weeks, '10.00') for weeks in range(1, 14)] + [(0, '50.00')]
+        Transaction.objects.bulk_create([
+            Transaction(
+                account=account, user=cls.user, category=cls.category, description='Dinner',
+                amount=Decimal(amount), transaction_type='EXPENSE', date=this_week - timedelta(weeks=weeks),
+            )
+            for weeks, amount in weekly
+        ])
+
+    def baselines(self):
+        return list(SpendingBaseline.objects.filter(user=self.user).values_list('category_id', 'weeks', 'total', 'total_sq'))
+
+    def test_adhoc_lookback_leaves_persisted_baselines_alone(self):
+        self.assertEqual(len(spending.evaluate_alerts(self.user, self.today)), 1)
+        stored = self.baselines()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(spending.evaluate_alerts(self.user, self.today, lookback_weeks=26), [])
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        self.assertEqual(writes, [])
+
+        state = SpendingBaselineState.objects.get(user=self.user)
+        self.assertEqual(state.lookback_weeks, spending.DEFAULT_LOOKBACK_WEEKS)
+        self.assertEqual(self.baselines(), stored)
+        self.assertEqual(len(spending.evaluate_alerts(self.user, self.today)), 1)
+
+
+class AlertTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alerted', password='x')
+        cls.account = Account.objects.create(user=cls.user, name='Checking', account_type='CHECKING', balance=0)
+        cls.category = Category.objects.create(user=cls.user, name='Dining')
+        cls.today = date.today()
+        cls.this_week = spending.week_start(cls.today)
+
+    def spend(self, amount, day=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Transaction.objects.create(
+                account=self.account, category=self.category, description='Dinner',
+                amount=Decimal(amount), transaction_type='EXPENSE', date=day or self.today,
+            )
+
+    def messages(self, kind):
+        return list(alerts.active_alerts(self.user, self.today).filter(kind=kind).values_list('message', flat=True))
+
+    def add_history(self, weeks=8, amount='10.00'):
+        Transaction.objects.bulk_create([
+            Transaction(
+                account=self.account, user=self.user, category=self.category, description='Dinner',
+                amount=Decimal(amount), transaction_type='EXPENSE', date=self.this_week - timedelta(weeks=week),
+            )
+            for week in range(1, weeks + 1)
+        ])
+        alerts.close_weeks(self.user, self.today)
+
+    def test_budget_alert_fires_and_clears(self):
+        budget = Budget.objects.create(
+            user=self.user, category=self.category, amount=Decimal('100.00'),
+            start_date=self.today - timedelta(days=3), end_date=self.today + timedelta(days=30),
+        )
+        first = self.spend('95.00')
+        self.assertEqual(self.messages('BUDGET'), ["You've used 95% of your 'Dining' budget."])
+        second = self.spend('10.00')
+        self.assertEqual(self.messages('BUDGET'), ["You've gone over your 'Dining' budget by $5.00."])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.filter(pk__in=[first.pk, second.pk]).delete()
+        self.assertEqual(self.messages('BUDGET'), [])
+        budget.refresh_from_db()
+        self.assertEqual(budget.spent, 0)
+
+    def test_spending_alert_fires_and_clears(self):
+        self.add_history()
+        expense = self.spend('100.00')
+        self.assertEqual(
+            self.messages('SPENDING'),
+            ["Heads up! Your spending on 'Dining' this week is $90.00 higher than your weekly average."],
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            expense.amount = Decimal('5.00')
+            expense.save()
+        self.assertEqual(self.messages('SPENDING'), [])
+
+    def test_late_edit_patches_the_baseline(self):
+        self.add_history()
+        old = Transaction.objects.filter(user=self.user).order_by('date').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            old.amount = Decimal('50.00')
+            old.save()
+        patched = SpendingBaseline.objects.values_list('weeks', 'total', 'total_sq').get(user=self.user)
+
+        SpendingBaselineState.objects.filter(user=self.user).delete()
+        spending.refresh_baselines(self.user, self.today)
+        self.assertEqual(SpendingBaseline.objects.values_list('weeks', 'total', 'total_sq').get(user=self.user), patched)
+
+    def test_writes_leave_folding_to_the_first_read(self):
+        self.spend('20.00')
+        self.assertFalse(SpendingBaselineState.objects.filter(user=self.user).exists())
+
+        alerts.close_weeks(self.user, self.today)
+        state = SpendingBaselineState.objects.get(user=self.user)
+        self.assertEqual(state.through_week, self.this_week - timedelta(weeks=1))
+        with self.assertNumQueries(1):
+            alerts.close_weeks(self.user, self.today)
+
+
+class BudgetProgressTests(TestCase):
+    def test_progress_and_alerts_agree_on_spent(self):
+        user = User.objects.create_user('budgeter', password='x')
+        account = Account.objects.create(user=user, name='Checking', account_type='CHECKING', balance=0)
+        category = Category.objects.create(user=user, name='Travel')
+        today = date.today()
+        start = today.replace(day=1) - relativedelta(months=3) + timedelta(days=10)
+        budget = Budget.objects.create(
+            user=user, category=category, amount=Decimal('500.00'), start_date=start, end_date=today,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            for months in range(5):
+                # Partial first month, whole past months from the rollup and this month from raw rows
+                Transaction.objects.create(
+                    account=account, category=category, description='Trip', amount=Decimal('40.00'),
+                    transaction_type='EXPENSE', date=max(start, today - relativedelta(months=months)),
+                )
+            Transaction.objects.create(
+                account=account, category=category, description='Too early', amount=Decimal('99.00'),
+                transaction_type='EXPENSE', date=start - timedelta(days=1),
+            )
+
+        budget.refresh_from_db()
+        self.assertEqual(budget.spent, Decimal('200.00'))
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/budgets/progress/')
+        self.assertEqual(response.data[0]['spent'], budget.spent)
+
+
+class MonthlyTotalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('rolled', password='x')
+        cls.account = Account.objects.create(user=cls.user, name='Checking', account_type='CHECKING', balance=0)
+        cls.groceries = Category.objects.create(user=cls.user, name='Groceries')
+        cls.rent = Category.objects.create(user=cls.user, name='Rent')
+
+    def add(self, amount, day, category=None, transaction_type='EXPENSE', account=None):
+        return Transaction.objects.create(
+            account=account or self.account, category=category, description='Row', amount=Decimal(amount),
+            transaction_type=transaction_type, date=day,
+        )
+
+    def assertVerifies(self):
+        out = io.StringIO()
+        call_command('rebuild_monthly_totals', '--verify', stdout=out)
+        self.assertIn('match', out.getvalue())
+
+    def test_signals_keep_totals_verifiable(self):
+        groceries = self.add('40.00', date(2025, 1, 5), self.groceries)
+        self.add('900.00', date(2025, 1, 1), self.rent)
+        self.add('12.00', date(2025, 2, 3))
+        self.add('2500.00', date(2025, 1, 25), transaction_type='INCOME')
+        self.assertVerifies()
+
+        groceries.amount = Decimal('45.00')
+        groceries.date = date(2025, 2, 7)
+        groceries.category = self.rent
+        groceries.save()
+        self.assertVerifies()
+
+        groceries.delete()
+        self.assertVerifies()
+
+        self.add('30.00', date(2025, 3, 2), self.groceries)
+        self.groceries.delete()
+        self.assertVerifies()
+
+        Transaction.objects.filter(user=self.user, date__month=1).delete()
+        self.assertVerifies()
+
+    def test_verify_reports_drift(self):
+        self.add('40.00', date(2025, 1, 5), self.groceries)
+        # queryset.update() sends no signals
+        Transaction.objects.filter(user=self.user).update(amount=Decimal('41.00'))
+        with self.assertRaises(CommandError):
+            call_command('rebuild_monthly_totals', '--verify', stdout=io.StringIO())
+        call_command('rebuild_monthly_totals', stdout=io.StringIO())
+        self.assertVerifies()
+
+    def test_cascade_applies_one_batch(self):
+        savings = Account.objects.create(user=self.user, name='Savings', account_type='SAVINGS', balance=0)
+        for i in range(40):
+            self.add('5.00', date(2025, 1, 1) + timedelta(days=9 * i), self.groceries if i % 2 else None, account=savings)
+        with CaptureQueriesContext(connection) as queries:
+            savings.delete()
+        rollup_queries = [q for q in queries if 'core_monthlycategorytotal' in q['sql']]
+        self.assertLessEqual(len(rollup_queries), 3)
+        self.assertFalse(MonthlyCategoryTotal.objects.filter(user=self.user).exists())
+
+    def test_concurrent_first_write_adds_to_the_winner(self):
+        self.add('40.00', date(2025, 1, 5), self.groceries)
+        locked_rows = rollups._locked_rows
+        reads = []
+
+        def stale_first_read(keys):
+            # The first read misses the row another writer inserted just before
+            reads.append(keys)
+            return {} if len(reads) == 1 else locked_rows(keys)
+
+        deltas = {}
+        rollups.add(deltas, self.user.id, self.groceries.id, date(2025, 1, 20), 'EXPENSE', Decimal('10.00'))
+        with mock.patch.object(rollups, '_locked_rows', stale_first_read):
+            rollups.apply(deltas)
+        row = MonthlyCategoryTotal.objects.get(user=self.user, category=self.groceries)
+        self.assertEqual((row.total, row.count), (Decimal('50.00'), 2))
+
+
+class RecurrenceTests(SimpleTestCase):
+    def test_month_end_clamps_without_drifting(self):
+        self.assertEqual(
+            recurrence.occurrences(date(2024, 1, 31), 'MONTHLY', date(2024, 2, 1), date(2024, 5, 31)),
+            [date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30), date(2024, 5, 31)],
+        )
+        self.assertEqual(
+            recurrence.occurrences(date(2023, 11, 30), 'QUARTERLY', date(2024, 1, 1), date(2024, 12, 31)),
+            [date(2024, 2, 29), date(2024, 5, 30), date(2024, 8, 30), date(2024, 11, 30)],
+        )
+        self.assertEqual(
+            recurrence.occurrences(date(2024, 2, 29), 'ANNUAL', date(2024, 3, 1), date(2028, 12, 31)),
+            [date(2025, 2, 28), date(2026, 2, 28), date(2027, 2, 28), date(2028, 2, 29)],
+        )
+
+    def test_window_edges_and_limit(self):
+        # A clamped occurrence just before `start` is skipped, one on `end` is kept
+        self.assertEqual(
+            recurrence.occurrences(date(2024, 1, 31), 'MONTHLY', date(2024, 3, 1), date(2024, 4, 30), limit=5),
+            [date(2024, 3, 31), date(2024, 4, 30)],
+        )
+        self.assertEqual(
+            recurrence.occurrences(date(2024, 1, 1), 'WEEKLY', date(2024, 1, 1), date(2024, 12, 31), limit=2),
+            [date(2024, 1, 8), date(2024, 1, 15)],
+        )
+
+    def test_upcoming_bills_days_is_capped(self):
+        client = APIClient()
+        client.force_authenticate(User(id=1, username='biller'))
+        response = client.get('/api/upcoming-bills/?days=3000000')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'count must be between 1 and 12 and days between 0 and 3650.'})
+
+
+class RoundUpTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('saver', password='x')
+        cls.checking = Account.objects.create(user=cls.user, name='Checking', account_type='CHECKING', balance=0)
+        cls.savings = Account.objects.create(user=cls.user, name='Savings', account_type='SAVINGS', balance=0)
+        cls.profile = UserProfile.objects.create(
+            user=cls.user, round_ups_enabled=True,
+            round_up_source_account=cls.checking, round_up_target_account=cls.savings,
+        )
+
+    def spend(self, amount, description='Coffee'):
+        return Transaction.objects.create(
+            account=self.checking, description=description, amount=Decimal(amount),
+            transaction_type='EXPENSE', date=date(2025, 3, 4),
+        )
+
+    def test_rounds_up_new_expenses_once(self):
+        self.spend('3.40')
+        self.spend('2.00')
+        self.spend('10.75')
+        self.assertEqual(roundups.run(self.profile, today=date(2025, 3, 5)), (Decimal('0.85'), 2))
+
+        transfers = Transaction.objects.filter(round_up_transfer=True).order_by('transaction_type')
+        self.assertEqual(
+            [(t.account_id, t.transaction_type, t.amount, t.description) for t in transfers],
+            [
+                (self.checking.id, 'EXPENSE', Decimal('0.85'), 'Round-up Transfer (2 items)'),
+                (self.savings.id, 'INCOME', Decimal('0.85'), 'Round-up Savings (2 items)'),
+            ],
+        )
+        self.assertTrue(all(t.user_id == self.user.id and t.fingerprint for t in transfers))
+        self.assertEqual(rollups.verify(self.user), {})
+        # The transfer expense itself is not rounded up by the next run
+        self.assertEqual(roundups.run(self.profile, today=date(2025, 3, 5)), (Decimal('0'), 0))
+
+    def test_real_expenses_with_the_transfer_prefix_are_rounded_up(self):
+        self.spend('4.50', description='Round-up Transfer fee')
+        self.assertEqual(roundups.run(self.profile, today=date(2025, 3, 5)), (Decimal('0.50'), 1))
+
+    def test_transfers_skip_the_per_row_signals(self):
+        for amount in ('1.10', '2.20', '3.30'):
+            self.spend(amount)
+        with CaptureQueriesContext(connection) as queries:
+            roundups.run(self.profile, today=date(2025, 3, 5))
+        # Two saves through the signal cascade cost about 60
+        self.assertLessEqual(len(queries), 15)
+
+    def test_nightly_run_survives_a_failing_user(self):
+        other = User.objects.create_user('spender', password='x')
+        source = Account.objects.create(user=other, name='Checking', account_type='CHECKING', balance=0)
+        target = Account.objects.create(user=other, name='Savings', account_type='SAVINGS', balance=0)
+        UserProfile.objects.create(user=other, round_ups_enabled=True, round_up_source_account=source, round_up_target_account=target)
+        self.spend('3.40')
+        run = roundups.run
+
+        def flaky(profile):
+            if profile.user_id == other.id:
+                raise RuntimeError('bad data')
+            return run(profile)
+
+        out, err = io.StringIO(), io.StringIO()
+        with mock.patch.object(roundups, 'run', flaky), self.assertLogs('core.management.batches', 'ERROR'):
+            call_command('run_round_ups', '--workers', '1', stdout=out, stderr=err)
+        self.assertIn('Ran round-ups for 1 users: 0.60 from 1 transactions.', out.getvalue())
+        self.assertIn('failed for 1 users', err.getvalue())
+
+
+class CountingProvider(QuoteProvider):
+    name = 'counting'
+
+    def __init__(self, prices, delay=0):
+        self.prices = prices
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    def get_quote(self, symbol):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ProviderError('down')
+        if symbol not in self.prices:
+            raise QuoteNotFound(symbol)
+        return Quote(symbol, self.prices[symbol], self.name)
+
+
+class MarketDataClientTests(SimpleTestCase):
+    def setUp(self):
+        caches[settings.MARKETDATA_CACHE].clear()
+
+    def test_file_provider(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump({'aapl': '190.5'}, f)
+        client = MarketDataClient(FileProvider(f.name))
+        self.assertEqual(client.get_quote('AAPL').price, Decimal('190.5'))
+        with self.assertRaises(QuoteNotFound):
+            client.get_quote('MSFT')
+
+    def test_fresh_quotes_come_from_cache(self):
+        provider = CountingProvider({'AAPL': Decimal('190')})
+        client = MarketDataClient(provider, ttl=60)
+        client.get_quote('aapl')
+        client.get_quote('AAPL ')
+        self.assertEqual(provider.calls, 1)
+
+    def test_quotes_live_in_the_configured_alias(self):
+        shared = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.mkdtemp()}
+        provider = CountingProvider({'AAPL': Decimal('190')})
+        with override_settings(CACHES={**settings.CACHES, 'shared': shared}, MARKETDATA_CACHE='shared'):
+            MarketDataClient(provider).get_quote('AAPL')
+            # Another worker's client finds the quote in the shared store
+            self.assertEqual(MarketDataClient(provider).get_quote('AAPL').price, Decimal('190'))
+            self.assertEqual(provider.calls, 1)
+        # The default alias is local memory here, which the deploy check flags
+        self.assertIn('MARKETDATA_CACHE', check_shared_caches(None)[0].msg)
+
+    def test_concurrent_misses_share_one_call(self):
+        provider = CountingProvider({'AAPL': Decimal('190')}, delay=0.2)
+        client = MarketDataClient(provider)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.get_quote('AAPL'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(provider.calls, 1)
+        self.assertEqual({q.price for q in results}, {Decimal('190')})
+
+    def test_stale_quote_is_served_while_refreshing(self):
+        provider = CountingProvider({'AAPL': Decimal('190')})
+        client = MarketDataClient(provider, ttl=0.05, stale_ttl=60)
+        client.get_quote('AAPL')
+        time.sleep(0.1)
+        provider.prices['AAPL'] = Decimal('200')
+        stale = client.get_quote('AAPL')
+        self.assertTrue(stale.stale)
+        self.assertEqual(stale.price, Decimal('190'))
+        # The refresh runs in a background thread
+        for _ in range(100):
+            if client.get_quote('AAPL').price == Decimal('200'):
+                break
+            time.sleep(0.01)
+        self.assertEqual(client.get_quote('AAPL').price, Decimal('200'))
+
+    def test_errors(self):
+        provider = CountingProvider({})
+        client = MarketDataClient(provider)
+        quotes, errors = client.get_quotes(['XYZ'])
+        self.assertEqual(quotes, {})
+        self.assertIsInstance(errors['XYZ'], QuoteNotFound)
+        # Unknown symbols are remembered for the TTL
+        with self.assertRaises(QuoteNotFound):
+            client.get_quote('XYZ')
+        self.assertEqual(provider.calls, 1)
+
+        provider.fail = True
+        with self.assertRaises(ProviderError):
+            client.get_quote('AAPL')
+
+    def test_unexpected_provider_errors_are_wrapped_and_cached(self):
+        provider = CountingProvider({'AAPL': Decimal('190')})
+        client = MarketDataClient(provider, error_ttl=0.1)
+        with mock.patch.object(provider, 'get_quote', side_effect=ValueError('bad JSON')) as get_quote:
+            _, errors = client.get_quotes(['AAPL'])
+            self.assertIsInstance(errors['AAPL'], ProviderError)
+            # The failure is replayed from the cache instead of calling the provider again
+            with self.assertRaises(ProviderError):
+                client.get_quote('AAPL')
+            self.assertEqual(get_quote.call_count, 1)
+        time.sleep(0.15)
+        self.assertEqual(client.get_quote('AAPL').price, Decimal('190'))
+
+
+class PortfolioValuationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('investor', password='x')
+        cls.brokerage = InvestmentAccount.objects.create(user=cls.user, name='Brokerage', brokerage='Acme')
+        cls.ira = InvestmentAccount.objects.create(user=cls.user, name='IRA', brokerage='Acme')
+        Holding.objects.create(investment_account=cls.brokerage, symbol='aapl', shares=Decimal('10'), cost_basis=Decimal('1500.00'))
+        Holding.objects.create(investment_account=cls.brokerage, symbol='GIFT', shares=Decimal('5'), cost_basis=Decimal('0.00'))
+        Holding.objects.create(investment_account=cls.ira, symbol='DELISTED', shares=Decimal('3'), cost_basis=Decimal('300.00'))
+
+    def setUp(self):
+        caches[settings.MARKETDATA_CACHE].clear()
+
+    def value(self, provider, **kwargs):
+        return portfolio.valuation(self.user, client=MarketDataClient(provider), **kwargs)
+
+    def test_unpriced_holdings_stay_at_cost_basis(self):
+        result = self.value(CountingProvider({'AAPL': Decimal('200'), 'GIFT': Decimal('40')}))
+        holdings = {row['symbol']: row for row in result['holdings']}
+
+        self.assertEqual(holdings['aapl']['market_value'], Decimal('2000.00'))
+        self.assertEqual(holdings['DELISTED']['market_value'], Decimal('300.00'))
+        self.assertFalse(holdings['DELISTED']['priced'])
+        self.assertIsNone(holdings['DELISTED']['price'])
+        self.assertEqual(result['unpriced_symbols'], ['DELISTED'])
+        self.assertEqual(result['market_value'], Decimal('2500.00'))
+        self.assertEqual(result['unrealized_gain'], Decimal('700.00'))
+
+    def test_weights(self):
+        result = self.value(CountingProvider({'AAPL': Decimal('200'), 'GIFT': Decimal('40')}))
+        self.assertEqual([row['weight'] for row in result['holdings']], [0.8, 0.08, 0.12])
+        self.assertEqual([account['weight'] for account in result['accounts']], [0.88, 0.12])
+        # Unpriced, a free holding is carried at its zero cost basis
+        caches[settings.MARKETDATA_CACHE].clear()
+        self.assertEqual([row['weight'] for row in self.value(CountingProvider({}))['holdings']], [0.8333, 0.0, 0.1667])
+
+    def test_zero_cost_basis(self):
+        result = self.value(CountingProvider({'AAPL': Decimal('200'), 'GIFT': Decimal('40')}))
+        gift = next(row for row in result['holdings'] if row['symbol'] == 'GIFT')
+        self.assertEqual(gift['unrealized_gain'], Decimal('200.00'))
+        self.assertIsNone(gift['unrealized_gain_percent'])
+
+        Holding.objects.update(cost_basis=Decimal('0.00'))
+        caches[settings.MARKETDATA_CACHE].clear()
+        result = self.value(CountingProvider({}))
+        self.assertEqual(result['market_value'], Decimal('0'))
+        self.assertIsNone(result['unrealized_gain_percent'])
+        self.assertEqual([row['weight'] for row in result['holdings']], [0.0, 0.0, 0.0])
+
+    def test_slow_provider_is_bounded_by_the_timeout(self):
+        provider = CountingProvider({'AAPL': Decimal('200'), 'GIFT': Decimal('40'), 'DELISTED': Decimal('1')}, delay=0.5)
+        client = MarketDataClient(provider)
+        started = time.perf_counter()
+        result = portfolio.valuation(self.user, client=client, timeout=0.05)
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertEqual(result['unpriced_symbols'], ['DELISTED', 'GIFT', 'aapl'])
+        self.assertEqual(result['market_value'], Decimal('1800.00'))
+        # The fetches finish in the background and the next valuation is priced from the cache
+        time.sleep(0.6)
+        self.assertEqual(portfolio.valuation(self.user, client=client, timeout=0.05)['unpriced_symbols'], [])
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('scroller', password='x')
+        account = Account.objects.create(user=cls.user, name='Checking', account_type='CHECKING', balance=0)
+        # Long runs of rows sharing a date, so pages have to split inside a day
+        Transaction.objects.bulk_create([
+            Transaction(
+                account=account, user=cls.user, description=f'Row {i}', amount=Decimal('1.00'),
+                transaction_type='EXPENSE', date=date(2025, 1, 1) + timedelta(days=i // 25),
+            )
+            for i in range(120)
+        ])
+        cls.expected = list(Transaction.objects.filter(user=cls.user).order_by('-date', '-id').values_list('id', flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_pages_cover_every_row_once_across_shared_dates(self):
+        seen, url, pages = [], '/api/transactions/cursor/?page_size=7', 0
+        while url:
+            page = self.get(url)
+            seen += [row['id'] for row in page['results']]
+            url = page['next']
+            pages += 1
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(pages, 18)
+
+    def test_invalid_cursor_is_not_found(self):
+        # Not base64, no separator ('abc'), an impossible date ('2025-13-01:5'),
+        # ids no row can have ('2025-01-01:9223372036854775808', '2025-01-01:-5')
+        for cursor in ('not base64!', 'YWJj', 'MjAyNS0xMy0wMTo1', 'MjAyNS0wMS0wMTo5MjIzMzcyMDM2ODU0Nzc1ODA4', 'MjAyNS0wMS0wMTotNQ=='):
+            response = self.client.get(f'/api/transactions/cursor/?cursor={cursor}')
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(response.data, {'detail': 'Invalid cursor.'})
+
+    def test_page_size_is_clamped(self):
+        self.assertEqual(len(self.get('/api/transactions/cursor/?page_size=0')['results']), 1)
+        self.assertEqual(len(self.get('/api/transactions/cursor/?page_size=abc')['results']), 50)
+        with mock.patch.object(TransactionKeysetPagination, 'max_page_size', 100):
+            self.assertEqual(len(self.get('/api/transactions/cursor/?page_size=1000')['results']), 100)
+
+    def test_count_is_opt_in_after_the_first_page(self):
+        first = self.get('/api/transactions/cursor/')
+        self.assertEqual(first['count'], 120)
+        self.assertNotIn('count', self.get(first['next']))
+        self.assertEqual(self.get(first['next'] + '&count=true')['count'], 120)
+        self.assertNotIn('count', self.get('/api/transactions/cursor/?count=false'))
+
+
+class TransactionQueryPlanTests(TestCase):
+    """The hot transaction queries should stay on their composite indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('plans', password='x')
+        other = User.objects.create_user('other', password='x')
+        cls.account = Account.objects.create(user=cls.user, name='Checking', account_type='CHECKING', balance=0)
+        other_account = Account.objects.create(user=other, name='Checking', account_type='CHECKING', balance=0)
+        cls.category = Category.objects.create(user=cls.user, name='Groceries')
+        start = date(2025, 1, 1)
+        Transaction.objects.bulk_create([
+            Transaction(
+                account=account, user_id=account.user_id, description=f'Row {i}',
+                amount=Decimal('10.00'), transaction_type='EXPENSE' if i % 3 else 'INCOME',
+                date=start + timedelta(days=i % 365),
+                category=cls.category if account == cls.account and i % 2 else None,
+            )
+            for i in range(600)
+            for account in (cls.account, other_account)
+        ])
+
+    def assertUsesIndex(self, queryset, index):
+        if connection.vendor == 'postgresql':
+            # A small test table is cheaper to scan; make the planner show what it would pick at scale
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+
+    def test_user_is_copied_from_account(self):
+        txn = Transaction.objects.create(
+            account=self.account, description='Coffee', amount=Decimal('3.50'),
+            transaction_type='EXPENSE', date=date(2025, 6, 1),
+        )
+        self.assertEqual(txn.user_id, self.user.id)
+
+    def test_listing(self):
+        self.assertUsesIndex(Transaction.objects.filter(user=self.user).order_by('-date', '-id'), 'txn_user_date_idx')
+
+    def test_type_and_date_range(self):
+        queryset = Transaction.objects.filter(
+            user=self.user, transaction_type='EXPENSE', date__gte=date(2025, 3, 1), date__lte=date(2025, 3, 31),
+        )
+        self.assertUsesIndex(queryset, 'txn_user_type_date_idx')
+
+    def test_category_and_date_range(self):
+        queryset = Transaction.objects.filter(
+            user=self.user, category=self.category, date__gte=date(2025, 3, 1), date__lte=date(2025, 3, 31),
+        )
+        self.assertUsesIndex(queryset, 'txn_user_category_date_idx')
+
+    def test_account_and_date_range(self):
+        queryset = Transaction.objects.filter(
+            account=self.account, date__gte=date(2025, 3, 1), date__lte=date(2025, 3, 31),
+        )
+        self.assertUsesIndex(queryset, 'txn_account_date_idx')
+
+
+class ListQueryCountTests(TestCase):
+    """List endpoints should cost the same number of queries however many rows they return."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('lists', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_rows(self, n):
+        account = Account.objects.create(user=self.user, name=f'Checking {n}', account_type='CHECKING', balance=0)
+        for i in range(n):
+            Transaction.objects.create(
+                account=account, description=f'Row {i}', amount=Decimal('5.00'),
+                transaction_type='EXPENSE', date=date(2025, 1, 1) + timedelta(days=i),
+            )
+            loan = Loan.objects.create(
+                user=self.user, name=f'Loan {n}-{i}', interest_rate=Decimal('5.00'), repayment_start_date=date(2025, 1, 1),
+            )
+            LoanDisbursement.objects.create(loan=loan, date=date(2025, 1, 1), amount=Decimal('1000.00'))
+            LoanPayment.objects.create(loan=loan, date=date(2025, 2, 1), amount=Decimal('100.00'))
+            LoanPayment.objects.create(loan=loan, date=date(2025, 3, 1), amount=Decimal('150.00'))
+            investments = InvestmentAccount.objects.create(user=self.user, name=f'Brokerage {n}-{i}', brokerage='Acme')
+            Holding.objects.create(investment_account=investments, symbol='AAPL', shares=Decimal('2'), cost_basis=Decimal('300.00'))
+            Holding.objects.create(investment_account=investments, symbol='MSFT', shares=Decimal('1'), cost_basis=Decimal('400.00'))
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+    def assertFlatQueryCount(self, url, expected):
+        self.add_rows(2)
+        small, _ = self.count_queries(url)
+        self.add_rows(6)
+        large, data = self.count_queries(url)
+        self.assertEqual((small, large), (expected, expected))
+        return data
+
+    def test_transactions(self):
+        # Page count + page
+        data = self.assertFlatQueryCount('/api/transactions/', 2)
+        self.assertTrue(all(row['account_name'].startswith('Checking') for row in data['results']))
+
+    def test_loans(self):
+        # Page count + page + payments + disbursements
+        data = self.assertFlatQueryCount('/api/loans/', 4)
+        self.assertEqual(len(data['results'][0]['payments']), 2)
+
+    def test_loan_summary(self):
+        data = self.assertFlatQueryCount('/api/loans/?summary=1', 2)
+        row = data['results'][0]
+        self.assertNotIn('payments', row)
+        self.assertEqual((row['payment_count'], row['total_paid']), (2, '250.00'))
+        self.assertEqual((row['disbursement_count'], row['total_disbursed']), (1, '1000.00'))
+
+    def test_investment_accounts(self):
+        data = self.assertFlatQueryCount('/api/investments/', 3)
+        self.assertEqual(len(data['results'][0]['holdings']), 2)
+
+    def test_investment_account_summary(self):
+        data = self.assertFlatQueryCount('/api/investments/?summary=1', 2)
+        row = data['results'][0]
+        self.assertNotIn('holdings', row)
+        self.assertEqual((row['holding_count'], row['total_cost_basis']), (2, '700.00'))
+
+
+class FastJSONTests(SimpleTestCase):
+    """FastJSONRenderer and FastJSONParser must be drop-in replacements, byte for byte."""
+
+    def assertSameBytes(self, data, accepted_media_type='application/json'):
+        expected = JSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(FastJSONRenderer().render(data, accepted_media_type), expected)
+
+    def test_serializer_output(self):
+        account = Account(id=1, name='Everyday Checking', account_type='CHECKING', balance=Decimal('0'))
+        transactions = [
+            Transaction(id=i, account=account, description=f'Café № {i} \u2028 "quoted" \\ </script>',
+                        amount=Decimal('1234.50') + i, transaction_type='EXPENSE', date=date(2025, 1, i), category_id=None)
+            for i in range(1, 20)
+        ]
+        self.assertSameBytes({'count': 19, 'next': None, 'results': TransactionSerializer(transactions, many=True).data})
+
+    def test_python_values(self):
+        self.assertSameBytes({
+            'decimal': Decimal('1.20'),
+            'numpy': [np.float64(0.1), np.int64(3), np.array([1.5, 2.5])],
+            'aware': datetime(2025, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+            'naive': datetime(2025, 3, 1, 12, 30),
+            'day': date(2025, 3, 1),
+            'id': uuid.UUID(int=7),
+            'lazy': gettext_lazy('Transactions'),
+            'control': '\x00\t\n\x1f\x7f\u2029',
+            1: 'int key',
+            'set': {3},
+        })
+
+    def test_floats_json_formats_differently(self):
+        for value in (1e16, -1.2345678901234568e17, 1e-5, 2.5e-5, 1e-7, 1e300, 0.1, 123.456, 10.00001):
+            self.assertSameBytes({'value': value, 'list': [value]})
+            self.assertSameBytes(value)
+
+    def test_big_ints_and_indent(self):
+        self.assertSameBytes({'big': 2 ** 70})
+        self.assertSameBytes({'nested': {'a': [1, 2]}}, 'application/json; indent=4')
+
+    def test_parser(self):
+        body = json.dumps({'amount': '12.50', 'n': 3, 'f': 0.1, 'text': 'Café', 'list': [None, True]}).encode()
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+
+    def test_parser_errors_match(self):
+        for body in (b'{"a": ', b'', b'[NaN]', b'"\\ud800"'):
+            try:
+                expected = JSONParser().parse(io.BytesIO(body))
+            except ParseError as exc:
+                with self.assertRaisesMessage(ParseError, str(exc.detail)):
+                    FastJSONParser().parse(io.BytesIO(body))
+            else:
+                self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), expected)
+
+
+class DashboardTests(TestCase):
+    STANDALONE = {
+        'net_worth': '/api/net-worth/',
+        'cash_flow_forecast': '/api/cash-flow-forecast/',
+        'upcoming_bills': '/api/upcoming-bills/',
+        'spending_alerts': '/api/spending-alerts/',
+        'accounts': '/api/accounts/',
+        'goals': '/api/goals/',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('dash', password='x')
+        today = date.today()
+        checking = Account.objects.create(user=cls.user, name='Checking', account_type='CHECKING', balance=Decimal('2500.00'))
+        Account.objects.create(user=cls.user, name='Savings', account_type='SAVINGS', balance=Decimal('10000.00'))
+        for months_ago in (1, 2):
+            Transaction.objects.create(
+                account=checking, description='Payroll', amount=Decimal('3000.00'),
+                transaction_type='INCOME', date=today - timedelta(days=30 * months_ago),
+            )
+        for i in range(3):
+            Subscription.objects.create(
+                user=cls.user, name=f'Service {i}', last_payment_date=today - timedelta(days=20 + i),
+                estimated_amount=Decimal('9.99') + i, cadence='MONTHLY', is_active=True,
+            )
+        loan = Loan.objects.create(user=cls.user, name='Car', interest_rate=Decimal('6.00'), repayment_start_date=today)
+        LoanDisbursement.objects.create(loan=loan, date=today - timedelta(days=60), amount=Decimal('8000.00'))
+        Goal.objects.create(user=cls.user, name='Trip', target_amount=Decimal('2000.00'), target_date=today + timedelta(days=200))
+
+    def setUp(self):
+        # Real JWT auth, so every request pays for its own user lookup like in production
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        versioned_cache.backend().clear()
+
+    def get(self, url, cold=False):
+        if cold:
+            versioned_cache.backend().clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data, [query['sql'] for query in queries]
+
+    def test_matches_standalone_endpoints(self):
+        widgets, _ = self.get('/api/dashboard/')
+        for name, url in self.STANDALONE.items():
+            data, _ = self.get(url)
+            if name in ('accounts', 'goals'):
+                data = data['results']
+            self.assertEqual(widgets[name], data, name)
+        self.assertEqual(NetWorthSnapshot.objects.filter(user=self.user).count(), 1)
+
+    def test_fewer_round_trips(self):
+        self.get('/api/dashboard/')  # first load of the day writes today's snapshot
+        # Cold analytics cache every time, so each request computes its widgets
+        standalone = sum(len(self.get(url, cold=True)[1]) for url in self.STANDALONE.values())
+        _, queries = self.get(f"/api/dashboard/?widgets={','.join(self.STANDALONE)}", cold=True)
+        self.assertFalse([sql for sql in queries if not sql.startswith('SELECT')])
+        # One query per table read (9 here) against 19 for the separate endpoints
+        self.assertLessEqual(len(queries) * 2, standalone)
+
+    def test_widget_selection(self):
+        data, _ = self.get('/api/dashboard/?widgets=upcoming_bills,goals')
+        self.assertEqual(list(data), ['upcoming_bills', 'goals'])
+        self.assertEqual(len(data['upcoming_bills']), 3)
+        response = self.client.get('/api/dashboard/?widgets=goals,weather')
+        self.assertEqual(response.status_code, 400)
+
+
+class VersionedCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cached', password='x')
+        cls.other = User.objects.create_user('other', password='x')
+        cls.account = Account.objects.create(user=cls.user, name='Checking', account_type='CHECKING', balance=Decimal('100.00'))
+
+    def setUp(self):
+        versioned_cache.backend().clear()
+        self.entry = versioned_cache.Entry('test-balance', ('accounts', 'transactions'))
+        self.calls = 0
+
+    def tearDown(self):
+        versioned_cache.REGISTRY.pop('test-balance')
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def cached(self, user=None, params=()):
+        return self.entry.get_or_compute((user or self.user).id, params, self.compute)
+
+    def test_hit_until_bumped(self):
+        for alias in (
+            {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'versioned-test'},
+            {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.mkdtemp()},
+        ):
+            with self.subTest(alias['BACKEND']), override_settings(CACHES={'default': alias, 'analytics': alias}):
+                self.calls = 0
+                self.assertEqual([self.cached(), self.cached()], [1, 1])
+                self.assertEqual(self.cached(params=[30]), 2)
+                self.assertEqual(self.cached(self.other), 3)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    versioned_cache.bump(self.user.id, 'transactions')
+                    versioned_cache.bump(self.user.id, 'transactions', 'accounts')
+                self.assertEqual(self.cached(), 4)
+                self.assertEqual(self.cached(self.other), 3)
+
+                # Domains the entry isn't derived from leave it alone
+                with self.captureOnCommitCallbacks(execute=True):
+                    versioned_cache.bump(self.user.id, 'loans')
+                self.assertEqual(self.cached(), 4)
+
+    def test_bump_waits_for_commit(self):
+        self.cached()
+        with self.captureOnCommitCallbacks() as callbacks:
+            versioned_cache.bump(self.user.id, 'accounts')
+            self.assertEqual(self.cached(), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.cached(), 2)
+
+    def test_writes_invalidate(self):
+        self.cached()
+        with self.captureOnCommitCallbacks(execute=True):
+            txn = Transaction.objects.create(
+                account=self.account, description='Coffee', amount=Decimal('4.50'),
+                transaction_type='EXPENSE', date=date.today(),
+            )
+        self.assertEqual(self.cached(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            txn.delete()
+        self.assertEqual(self.cached(), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TransactionImporter(self.account).run_csv(io.BytesIO(b'Date,Description,Amount\n2024-01-02,Rent,-900\n'))
+        self.assertEqual(self.cached(), 4)
+
+        # Another user's writes don't touch this user's results
+        with self.captureOnCommitCallbacks(execute=True):
+            Account.objects.create(user=self.other, name='Other', account_type='CHECKING', balance=Decimal('0'))
+        self.assertEqual(self.cached(), 4)
+
+    def test_debt_optimizer_sees_new_payments(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        loan = Loan.objects.create(user=self.user, name='Car', interest_rate=Decimal('6.00'), repayment_start_date=date.today())
+        with self.captureOnCommitCallbacks(execute=True):
+            LoanDisbursement.objects.create(loan=loan, date=date.today() - timedelta(days=60), amount=Decimal('8000.00'))
+        before = client.get('/api/debt-optimizer/?extra_payment=100').data
+        self.assertEqual(client.get('/api/debt-optimizer/?extra_payment=100').data, before)
+        with self.captureOnCommitCallbacks(execute=True):
+            LoanPayment.objects.create(loan=loan, date=date.today(), amount=Decimal('4000.00'))
+        after = client.get('/api/debt-optimizer/?extra_payment=100').data
+        self.assertLess(after['avalanche']['months_to_payoff'], before['avalanche']['months_to_payoff'])
+
+    def test_stats(self):
+        versioned_cache.reset_stats()
+        self.cached()
+        self.cached()
+        self.cached()
+        self.assertEqual(versioned_cache.stats()['test-balance'], {'hits': 2, 'misses': 1, 'hit_rate': 0.6667})
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get('/api/cache-stats/').status_code, 403)
+        client.force_authenticate(User.objects.create_user('admin', password='x', is_staff=True))
+        self.assertEqual(client.get('/api/cache-stats/').data['test-balance']['hits'], 2)
+        self.assertEqual(client.delete('/api/cache-stats/').status_code, 204)
+        self.assertEqual(versioned_cache.stats()['test-balance']['hit_rate'], None)
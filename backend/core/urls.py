@@ -21,11 +21,13 @@ urlpatterns = [
 
     # Transaction URLs
     path('transactions/', views.TransactionList.as_view(), name='transaction-list'),
+    path('transactions/cursor/', views.TransactionCursorList.as_view(), name='transaction-cursor-list'),
     path('transactions/create/', views.TransactionCreate.as_view(), name='transaction-create'),
     path('transactions/<int:pk>/', views.TransactionDetail.as_view(), name='transaction-detail'),
     
     # CSV Upload URL
     path('transactions/bulk-upload/', views.TransactionBulkUploadView.as_view(), name='transaction-bulk-upload'),
+    path('imports/<int:pk>/', views.ImportJobDetail.as_view(), name='import-job-detail'),
     
     # Category URLs
     path('categories/', views.CategoryListCreate.as_view(), name='category-list-create'),
@@ -33,6 +35,7 @@ urlpatterns = [
     
     # Budget URLs - one for the list, one for a single item
     path('budgets/', views.BudgetListCreate.as_view(), name='budget-list-create'),
+    path('budgets/progress/', views.BudgetProgressView.as_view(), name='budget-progress'),
     path('budgets/<int:pk>/', views.BudgetDetail.as_view(), name='budget-detail'),
     
     path('stock-price/', views.StockPriceView.as_view(), name='stock-price'),
@@ -42,6 +45,7 @@ urlpatterns = [
     path('investments/<int:pk>/', views.InvestmentAccountDetail.as_view(), name='investment-detail'),
     path('holdings/', views.HoldingListCreate.as_view(), name='holding-list-create'),
     path('holdings/<int:pk>/', views.HoldingDetail.as_view(), name='holding-detail'),
+    path('portfolio/valuation/', views.PortfolioValuationView.as_view(), name='portfolio-valuation'),
     
     # Loan URLs
     path('loans/', views.LoanListCreate.as_view(), name='loan-list-create'),
@@ -55,6 +59,9 @@ urlpatterns = [
     path('loan-payments/', views.LoanPaymentListCreate.as_view(), name='loan-payment-list-create'),
     path('loan-payments/<int:pk>/', views.LoanPaymentDetail.as_view(), name='loan-payment-detail'),
     
+    # Dashboard URL
+    path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
+
     # Net Worth URL 
     path('net-worth/', views.NetWorthView.as_view(), name='net-worth'),
     
@@ -80,6 +87,9 @@ urlpatterns = [
     # Spending Alerts URL
     path('spending-alerts/', views.SpendingAlertsView.as_view(), name='spending-alerts'),
 
+    # Analytics cache hit/miss counters (admins only)
+    path('cache-stats/', views.CacheStatsView.as_view(), name='cache-stats'),
+
     # Natural Language Query URL
     path('ai/natural-language-query/', views.AILanguageQueryView.as_view(), name='ai-language-query'),
     
@@ -0,0 +1,138 @@
+"""
+Versioned per-user cache for derived results.
+
+Every user has a version counter per data domain (transactions, accounts,
+loans, subscriptions, holdings, alerts). A cached result is stored under a
+key that includes the current versions of the domains it was computed
+from, so bumping a counter makes everything built from the old data
+unreachable at once; nothing is deleted or scanned, old entries just
+expire. Versions are read before computing, so a write that commits
+mid-computation leaves the result under the old, already dead key.
+
+Counters are bumped after the writing transaction commits: by signals for
+single-row saves and deletes, and explicitly by the code paths that write
+in bulk (CSV imports, subscription discovery, alert refreshes, ledger
+rebuilds).
+
+Storage is the 'analytics' entry in CACHES, so any Django cache backend
+works: local memory or files in development and tests, Redis in production
+(see ANALYTICS_CACHE_URL). Hits and misses are counted per entry in the
+same cache; `stats()` reports them.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+ALIAS = 'analytics'
+DOMAINS = ('transactions', 'accounts', 'loans', 'subscriptions', 'holdings', 'alerts')
+VERSION_KEY = 'version:{user_id}:{domain}'
+STAT_KEY = 'stats:{name}:{kind}'
+
+# Entry name -> Entry, so stats() can list every kind of cached result
+REGISTRY = {}
+
+_pending = threading.local()
+_MISSING = object()
+
+
+def backend():
+    return caches[ALIAS]
+
+
+def versions(user_id, domains):
+    """Current version of each domain for the user, in one cache round trip when they are all set."""
+    keys = [VERSION_KEY.format(user_id=user_id, domain=domain) for domain in domains]
+    found = backend().get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Seed from the clock so an evicted counter never repeats an old value
+            backend().add(key, time.time_ns(), None)
+            found[key] = backend().get(key, found.get(key))
+    return [found[key] for key in keys]
+
+
+def flush():
+    """Apply this thread's pending bumps now; bump() runs this on commit."""
+    pending, _pending.keys = getattr(_pending, 'keys', set()), set()
+    for key in pending:
+        try:
+            backend().incr(key)
+        except ValueError:
+            backend().set(key, time.time_ns(), None)
+
+
+def bump(user_id, *domains):
+    """Invalidate the user's results derived from `domains`, once the current transaction commits."""
+    if not hasattr(_pending, 'keys'):
+        _pending.keys = set()
+    _pending.keys.update(VERSION_KEY.format(user_id=user_id, domain=domain) for domain in domains)
+    # Many rows written in one transaction still bump each counter once; the
+    # first callback to run flushes everything, the rest find nothing to do
+    transaction.on_commit(flush)
+
+
+def _count(name, kind):
+    key = STAT_KEY.format(name=name, kind=kind)
+    try:
+        backend().incr(key)
+    except ValueError:
+        if not backend().add(key, 1, None):
+            backend().incr(key)
+
+
+class Entry:
+    """One kind of cached result: a name, the domains it is derived from and how long it keeps."""
+
+    def __init__(self, name, domains, timeout=None):
+        unknown = set(domains) - set(DOMAINS)
+        if unknown:
+            raise ValueError(f"Unknown cache domains: {', '.join(sorted(unknown))}")
+        self.name = name
+        self.domains = tuple(domains)
+        self.timeout = timeout
+        REGISTRY[name] = self
+
+    def key(self, user_id, params):
+        version = '.'.join(str(v) for v in versions(user_id, self.domains))
+        digest = hashlib.sha1(repr(tuple(params)).encode()).hexdigest()
+        return f'{self.name}:{user_id}:{version}:{digest}'
+
+    def get_or_compute(self, user_id, params, compute):
+        """The cached result for these params, or compute() stored for next time."""
+        key = self.key(user_id, params)
+        value = backend().get(key, _MISSING)
+        if value is not _MISSING:
+            _count(self.name, 'hits')
+            return value
+        _count(self.name, 'misses')
+        value = compute()
+        timeout = self.timeout if self.timeout is not None else settings.ANALYTICS_CACHE_SECONDS
+        backend().set(key, value, timeout)
+        return value
+
+
+def stats():
+    """{entry name: hits, misses and hit rate} since the counters were last reset."""
+    keys = {
+        (name, kind): STAT_KEY.format(name=name, kind=kind)
+        for name in REGISTRY for kind in ('hits', 'misses')
+    }
+    found = backend().get_many(keys.values())
+    result = {}
+    for name in sorted(REGISTRY):
+        hits = found.get(keys[(name, 'hits')], 0)
+        misses = found.get(keys[(name, 'misses')], 0)
+        result[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return result
+
+
+def reset_stats():
+    backend().delete_many([STAT_KEY.format(name=name, kind=kind) for name in REGISTRY for kind in ('hits', 'misses')])
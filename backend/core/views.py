@@ -1,38 +1,42 @@
-import os # This was the missing import
-import requests
-from django.db.models import Sum, Count,Avg, StdDev
+from django.db.models import Sum, Count,Avg, StdDev, DecimalField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from rest_framework import generics
 from rest_framework.exceptions import PermissionDenied
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
 from django.contrib.auth.models import User
-from collections import defaultdict
 import csv
-import io
+import secrets
 from decimal import Decimal, InvalidOperation
 from rest_framework.decorators import api_view, permission_classes
+from django.conf import settings
 
 from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
 from allauth.socialaccount.providers.oauth2.client import OAuth2Client
 from dj_rest_auth.registration.views import SocialLoginView
 
-from datetime import date, timedelta, datetime, timezone
-from dateutil.relativedelta import relativedelta
+from datetime import date, timedelta
 
 from .models import (
     Account, Transaction, Category, Budget,
     InvestmentAccount, Holding, Loan, LoanPayment,
-    LoanDisbursement, NetWorthSnapshot, Subscription, Goal, UserProfile
+    LoanDisbursement, Subscription, Goal, UserProfile, ImportJob
 )
 from .serializers import (
     AccountSerializer, UserSerializer, RegisterSerializer, TransactionSerializer,
-    CategorySerializer, BudgetSerializer, InvestmentAccountSerializer,
-    HoldingSerializer, LoanSerializer, LoanPaymentSerializer,
-    LoanDisbursementSerializer, NetWorthSnapshotSerializer, SubscriptionSerializer, ChangePasswordSerializer,
-    TransactionBulkCreateSerializer, GoalSerializer, UserProfileSerializer
+    CategorySerializer, BudgetSerializer, InvestmentAccountSerializer, InvestmentAccountSummarySerializer,
+    HoldingSerializer, LoanSerializer, LoanSummarySerializer, LoanPaymentSerializer,
+    LoanDisbursementSerializer, SubscriptionSerializer, ChangePasswordSerializer,
+    GoalSerializer, UserProfileSerializer, ImportJobSerializer
 )
+from .engines import alerts, budgets, category_index, dashboard, forecast, loan_ledger, portfolio, roundups, spending
+from .engines import subscriptions as subscription_discovery
+from .engines.imports import TransactionImporter
+from .engines.loans import LoanBook, compare_strategies, to_cents
+from . import marketdata, versioned_cache
+from .pagination import TransactionKeysetPagination
 
 
 class RegisterView(generics.CreateAPIView):
@@ -107,12 +111,45 @@ class ChangePasswordView(generics.UpdateAPIView):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class SummaryMixin:
+    """List views with nested arrays return aggregate counts and sums instead when asked for ?summary=1."""
+    summary_serializer_class = None
+
+    @property
+    def summary(self):
+        return self.request.method == 'GET' and self.request.query_params.get('summary') in ('1', 'true')
+
+    def get_serializer_class(self):
+        return self.summary_serializer_class if self.summary else super().get_serializer_class()
+
+
+def related_count(model, fk):
+    rows = model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk)
+    return Coalesce(Subquery(rows.annotate(n=Count('pk')).values('n')), 0, output_field=IntegerField())
+
+
+def related_sum(model, fk, field):
+    # A subquery per relation; joining two reverse relations in one GROUP BY would multiply the sums
+    rows = model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk)
+    money = DecimalField(max_digits=14, decimal_places=2)
+    return Coalesce(Subquery(rows.annotate(total=Sum(field)).values('total')), Value(Decimal('0')), output_field=money)
+
+
 class TransactionList(generics.ListAPIView):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Transaction.objects.filter(account__user=self.request.user).order_by('-date')
+        return Transaction.objects.filter(user=self.request.user).select_related('account').order_by('-date', '-id')
+
+class TransactionCursorList(generics.ListAPIView):
+    """Like TransactionList, but with keyset pagination for long histories."""
+    serializer_class = TransactionSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = TransactionKeysetPagination
+
+    def get_queryset(self):
+        return Transaction.objects.filter(user=self.request.user).select_related('account')
 
 class TransactionCreate(generics.CreateAPIView):
     serializer_class = TransactionSerializer
@@ -131,7 +168,7 @@ class TransactionDetail(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         # Ensure that users can only access their own transactions
-        return Transaction.objects.filter(account__user=self.request.user)
+        return Transaction.objects.filter(user=self.request.user)
     
 class TransactionBulkUploadView(APIView):
     permission_classes = [IsAuthenticated]
@@ -150,32 +187,43 @@ class TransactionBulkUploadView(APIView):
         except Account.DoesNotExist:
             return Response({'error': 'Account not found or you do not have permission.'}, status=404)
 
-        try:
-            decoded_file = csv_file.read().decode('utf-8')
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
-
-            transactions_to_create = []
-            for row in reader:
-                amount = Decimal(row.get('Amount', 0))
-                transaction_data = {
-                    'description': row.get('Description'),
-                    'amount': abs(amount),
-                    'transaction_type': 'INCOME' if amount > 0 else 'EXPENSE',
-                    'date': row.get('Date'),
-                    'category_name': row.get('Category', '').strip(),
-                    'account': account.id,
-                }
-                transactions_to_create.append(transaction_data)
-
-            serializer = TransactionBulkCreateSerializer(data=transactions_to_create, many=True, context={'request': request})
+        # Large files are queued for the import worker so they don't tie up a web worker
+        run_in_background = str(request.data.get('background', '')).lower() in ('1', 'true')
+        if run_in_background or csv_file.size > settings.IMPORT_INLINE_MAX_BYTES:
+            job = ImportJob.objects.create(user=request.user, account=account, file=csv_file)
+            data = ImportJobSerializer(job).data
+            data['message'] = 'Your file has been queued for import.'
+            return Response(data, status=202)
 
-            if serializer.is_valid(raise_exception=True):
-                serializer.save()
-                return Response({'message': f'{len(serializer.data)} transactions uploaded successfully.'}, status=201)
+        importer = TransactionImporter(account)
+        try:
+            report = importer.run_csv(csv_file)
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Chunks before the unreadable part are already saved, so say what made it in
+            data = importer.report.as_dict()
+            data['error'] = f'Could not read the CSV file: {e}.'
+            if importer.report.rows_created:
+                data['error'] += f' {importer.report.rows_created} transactions before that point were imported.'
+            return Response(data, status=400)
+
+        data = report.as_dict()
+        if report.rows_created == 0 and report.rows_rejected > 0:
+            data['error'] = f'No transactions were imported; {report.rows_rejected} rows were rejected.'
+            return Response(data, status=400)
+
+        data['message'] = f'{report.rows_created} transactions uploaded successfully.'
+        if report.rows_duplicate:
+            data['message'] += f' {report.rows_duplicate} duplicates were skipped.'
+        if report.rows_rejected:
+            data['message'] += f' {report.rows_rejected} rows were rejected.'
+        return Response(data, status=201)
+        
+class ImportJobDetail(generics.RetrieveAPIView):
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
 
-        except Exception as e:
-            return Response({'error': str(e)}, status=400)
+    def get_queryset(self):
+        return ImportJob.objects.filter(user=self.request.user)
         
 class CategoryListCreate(generics.ListCreateAPIView):
     serializer_class = CategorySerializer
@@ -204,6 +252,13 @@ class BudgetListCreate(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+class BudgetProgressView(APIView):
+    """Actual and projected spend against each of the user's budgets."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(budgets.progress(request.user, date.today()))
+
 # This view handles updating and deleting a single budget
 class BudgetDetail(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = BudgetSerializer
@@ -217,31 +272,29 @@ class StockPriceView(APIView):
 
     def get(self, request):
         symbol = request.query_params.get('symbol')
-        # This line will now work because 'os' is imported
-        api_key = os.environ.get('ALPHA_VANTAGE_API_KEY') 
-        
         if not symbol:
             return Response({'error': 'A stock symbol must be provided.'}, status=400)
 
-        url = f'https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={api_key}'
-        
         try:
-            response = requests.get(url)
-            data = response.json()
+            quote = marketdata.get_client().get_quote(symbol)
+        except marketdata.QuoteNotFound:
+            return Response({'error': 'Invalid symbol.'}, status=404)
+        except marketdata.MarketDataError as e:
+            return Response({'error': f'Stock prices are unavailable right now: {e}'}, status=503)
+        return Response({'symbol': quote.symbol, 'price': float(quote.price), 'stale': quote.stale})
             
-            if "Global Quote" in data and "05. price" in data["Global Quote"]:
-                price = data["Global Quote"]["05. price"]
-                return Response({'symbol': symbol, 'price': float(price)})
-            else:
-                return Response({'error': 'Invalid symbol or API limit reached.'}, status=404)
-        except Exception as e:
-            return Response({'error': str(e)}, status=500)
-            
-class InvestmentAccountListCreate(generics.ListCreateAPIView):
+class InvestmentAccountListCreate(SummaryMixin, generics.ListCreateAPIView):
     serializer_class = InvestmentAccountSerializer
+    summary_serializer_class = InvestmentAccountSummarySerializer
     permission_classes = [IsAuthenticated]
     def get_queryset(self):
-        return InvestmentAccount.objects.filter(user=self.request.user)
+        queryset = InvestmentAccount.objects.filter(user=self.request.user).order_by('id')
+        if self.summary:
+            return queryset.annotate(
+                holding_count=related_count(Holding, 'investment_account'),
+                total_cost_basis=related_sum(Holding, 'investment_account', 'cost_basis'),
+            )
+        return queryset.prefetch_related('holdings')
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -269,14 +322,30 @@ class HoldingDetail(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     def get_queryset(self):
         return Holding.objects.filter(investment_account__user=self.request.user)
+
+class PortfolioValuationView(APIView):
+    """Market value, unrealized gain and weights per holding and per investment account."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(portfolio.valuation(request.user))
     
 # --- Loan Views ---
-class LoanListCreate(generics.ListCreateAPIView):
+class LoanListCreate(SummaryMixin, generics.ListCreateAPIView):
     serializer_class = LoanSerializer
+    summary_serializer_class = LoanSummarySerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Loan.objects.filter(user=self.request.user)
+        queryset = Loan.objects.filter(user=self.request.user).order_by('id')
+        if self.summary:
+            return queryset.annotate(
+                payment_count=related_count(LoanPayment, 'loan'),
+                total_paid=related_sum(LoanPayment, 'loan', 'amount'),
+                disbursement_count=related_count(LoanDisbursement, 'loan'),
+                total_disbursed=related_sum(LoanDisbursement, 'loan', 'amount'),
+            )
+        return queryset.prefetch_related('payments', 'disbursements')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -337,46 +406,22 @@ class LoanDisbursementDetail(generics.RetrieveUpdateDestroyAPIView):
 class NetWorthView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request):
-        user = request.user
-        today = date.today()
+        return Response(dashboard.net_worth(dashboard.UserData(request.user)))
+    
+class DashboardView(APIView):
+    """
+    Every dashboard widget in one response, built from one shared load of the
+    user's data. ?widgets=net_worth,upcoming_bills picks a subset.
+    """
+    permission_classes = [IsAuthenticated]
 
-        total_account_balance = Account.objects.filter(user=user).aggregate(Sum('balance'))['balance__sum'] or 0
-        total_investment_balance = Holding.objects.filter(investment_account__user=user).aggregate(Sum('cost_basis'))['cost_basis__sum'] or 0
-        current_total_assets = total_account_balance + total_investment_balance
-
-        current_total_liabilities = 0
-        user_loans = Loan.objects.filter(user=user).prefetch_related('disbursements', 'payments')
-        for loan in user_loans:
-            all_events = []
-            for d in loan.disbursements.all(): all_events.append({'type': 'disbursement', 'date': d.date, 'amount': d.amount})
-            for p in loan.payments.all(): all_events.append({'type': 'payment', 'date': p.date, 'amount': p.amount})
-            all_events.sort(key=lambda x: x['date'])
-            if not all_events: continue
-            balance = 0
-            last_event_date = all_events[0]['date']
-            daily_rate = loan.interest_rate / 100 / 365
-            for event in all_events:
-                days = (event['date'] - last_event_date).days
-                if days > 0 and balance > 0: balance += balance * daily_rate * days
-                balance += event['amount'] if event['type'] == 'disbursement' else -event['amount']
-                last_event_date = event['date']
-            days_to_today = (today - last_event_date).days
-            if days_to_today > 0 and balance > 0: balance += balance * daily_rate * days_to_today
-            current_total_liabilities += balance if balance > 0 else 0
-
-        NetWorthSnapshot.objects.update_or_create(
-            user=user, date=today,
-            defaults={
-                'total_assets': current_total_assets,
-                'total_liabilities': current_total_liabilities,
-                'net_worth': current_total_assets - current_total_liabilities
-            }
-        )
+    def get(self, request):
+        widgets = [name.strip() for name in request.query_params.get('widgets', '').split(',') if name.strip()]
+        unknown = [name for name in widgets if name not in dashboard.WIDGETS]
+        if unknown:
+            return Response({'error': f"Unknown widgets: {', '.join(unknown)}. Choose from {', '.join(dashboard.WIDGETS)}."}, status=400)
+        return Response(dashboard.build(request.user, widgets))
 
-        snapshots = NetWorthSnapshot.objects.filter(user=user).order_by('date')
-        serializer = NetWorthSnapshotSerializer(snapshots, many=True)
-        return Response(serializer.data)
-    
 class SubscriptionListCreate(generics.ListCreateAPIView):
     serializer_class = SubscriptionSerializer
     permission_classes = [IsAuthenticated]
@@ -397,34 +442,16 @@ class SubscriptionDetail(generics.RetrieveUpdateDestroyAPIView):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def discover_subscriptions(request):
-    user = request.user
-    # FIX: Fetch all transactions, ignoring pagination for this specific task
-    transactions = Transaction.objects.filter(account__user=user, transaction_type='EXPENSE').all()
-    
-    potential_subscriptions = defaultdict(list)
-    for t in transactions:
-        # Simple normalization to group similar transactions
-        normalized_desc = ''.join([i for i in t.description if not i.isdigit()]).strip().lower()
-        if normalized_desc:
-            potential_subscriptions[normalized_desc].append(t)
-
-    newly_found_count = 0
-    for desc, trans_list in potential_subscriptions.items():
-        # Consider it a subscription if it appears more than once
-        if len(trans_list) > 1:
-            # Check if a subscription with this name already exists
-            if not Subscription.objects.filter(user=user, name__iexact=desc).exists():
-                latest_transaction = max(trans_list, key=lambda x: x.date)
-                
-                Subscription.objects.create(
-                    user=user,
-                    name=desc.title(), # Capitalize for display
-                    last_payment_date=latest_transaction.date,
-                    estimated_amount=latest_transaction.amount
-                )
-                newly_found_count += 1
-
-    return Response({'message': f'Discovery complete. Found {newly_found_count} new potential subscriptions.'})
+    # Only expenses added since the last run are scanned unless a full rescan is requested
+    full = str(request.data.get('full', '')).lower() in ('1', 'true')
+    found = subscription_discovery.discover(request.user, full=full)
+    return Response({
+        'message': f'Discovery complete. Found {len(found)} new potential subscriptions.',
+        'subscriptions': [
+            {'name': sub.name, 'cadence': cadence, 'confidence': confidence}
+            for sub, cadence, confidence in found
+        ],
+    })
 
 class AIGoalPlannerView(APIView):
     permission_classes = [IsAuthenticated]
@@ -493,260 +520,207 @@ class SuggestCategoryView(APIView):
         if not description:
             return Response({})
 
-        matching_transactions = Transaction.objects.filter(
-            account__user=user,
-            description__icontains=description,
-            category__isnull=False
-        )
-
-        if not matching_transactions.exists():
-            return Response({})
-
-        # Count which category appears most often for this description
-        most_common_category = matching_transactions.values('category') \
-                                                    .annotate(count=Count('category')) \
-                                                    .order_by('-count') \
-                                                    .first()
-        
-        if most_common_category:
-            category_id = most_common_category['category']
-            category = Category.objects.get(id=category_id)
-            serializer = CategorySerializer(category)
-            return Response(serializer.data)
-
-        return Response({})
+        # Served from the in-process description index; no queries on a cache hit
+        suggestion = category_index.suggest(user.id, description)
+        return Response(suggestion or {})
     
 class UpcomingBillsView(APIView):
+    """
+    Next predicted payment of each active subscription at its cadence.
+    ?count= returns up to that many payments per subscription (max 12) and
+    ?days= limits them to the next N days (max 3650).
+    """
     permission_classes = [IsAuthenticated]
+    MAX_COUNT = 12
+    MAX_DAYS = 3650
 
     def get(self, request):
-        user = request.user
-        subscriptions = Subscription.objects.filter(user=user, is_active=True)
-
-        upcoming_bills = []
-        today = date.today()
-
-        for sub in subscriptions:
-            last_payment = sub.last_payment_date
-            # Simple prediction: assume monthly billing
-            predicted_next_payment = last_payment + relativedelta(months=1)
-
-            # If the predicted date is in the past, keep adding months until it's in the future
-            while predicted_next_payment < today:
-                predicted_next_payment += relativedelta(months=1)
-
-            upcoming_bills.append({
-                'id': sub.id,
-                'name': sub.name,
-                'estimated_amount': sub.estimated_amount,
-                'predicted_date': predicted_next_payment,
-            })
-
-        # Sort the bills by the closest due date
-        upcoming_bills.sort(key=lambda x: x['predicted_date'])
-
-        return Response(upcoming_bills)
+        data = dashboard.UserData(request.user)
+        try:
+            count = int(request.query_params.get('count', 1))
+            days = int(request.query_params['days']) if request.query_params.get('days') else None
+        except ValueError:
+            return Response({'error': 'count and days must be whole numbers.'}, status=400)
+        if not 1 <= count <= self.MAX_COUNT or (days is not None and not 0 <= days <= self.MAX_DAYS):
+            return Response({'error': f'count must be between 1 and {self.MAX_COUNT} and days between 0 and {self.MAX_DAYS}.'}, status=400)
+        # No ?days= means just the next `count` payments, however far out
+        horizon = data.today + timedelta(days=days) if days is not None else date.max
+        return Response(dashboard.upcoming_bills(data, count, horizon))
     
 class CashFlowForecastView(APIView):
+    """
+    Daily cash balance forecast for the next ?days= days (default 30, max 365).
+    With ?mode=monte_carlo it returns P10/P50/P90 bands over ?paths= simulated
+    paths instead of one line; pass ?seed= to reproduce a run.
+    """
     permission_classes = [IsAuthenticated]
+    DEFAULT_DAYS = 30
+    MAX_DAYS = 365
+    DEFAULT_PATHS = 10000
+    MAX_PATHS = 20000
+    monte_carlo_cache = versioned_cache.Entry('cash-flow-monte-carlo', ('accounts', 'subscriptions', 'transactions'))
 
     def get(self, request):
-        user = request.user
-        today = date.today()
-        forecast_end_date = today + timedelta(days=30)
-        
-        # 1. Get current cash balance (sum of all 'CHECKING' and 'SAVINGS' accounts)
+        data = dashboard.UserData(request.user)
+        params = request.query_params
         try:
-            cash_accounts = Account.objects.filter(user=user, account_type__in=['CHECKING', 'SAVINGS'])
-            current_balance = cash_accounts.aggregate(Sum('balance'))['balance__sum'] or 0
-        except Account.DoesNotExist:
-            current_balance = 0
-
-        # --- 2. Predict upcoming bills (using our existing logic) ---
-        subscriptions = Subscription.objects.filter(user=user, is_active=True)
-        predicted_expenses = []
-        for sub in subscriptions:
-            next_payment_date = sub.last_payment_date + relativedelta(months=1)
-            while next_payment_date < today:
-                next_payment_date += relativedelta(months=1)
-            if today <= next_payment_date <= forecast_end_date:
-                predicted_expenses.append({'date': next_payment_date, 'amount': -abs(sub.estimated_amount)})
-
-        # --- 3. Predict recurring income ---
-        # Find transactions marked as 'Income' that have occurred at least twice
-        recurring_income_sources = Transaction.objects.filter(
-            account__user=user,
-            transaction_type='INCOME'
-        ).values('description').annotate(count=Count('id')).filter(count__gt=1)
-
-        predicted_income = []
-        for source in recurring_income_sources:
-            desc = source['description']
-            # Find the most recent transaction for this income source
-            latest_income_transaction = Transaction.objects.filter(
-                account__user=user,
-                transaction_type='INCOME',
-                description=desc
-            ).latest('date')
-            
-            # Simple prediction: assume it occurs monthly on the same day
-            next_income_date = latest_income_transaction.date + relativedelta(months=1)
-            if today <= next_income_date <= forecast_end_date:
-                predicted_income.append({'date': next_income_date, 'amount': latest_income_transaction.amount})
-
-        # --- 4. Generate the 30-day forecast ---
-        all_events = predicted_expenses + predicted_income
-        all_events.sort(key=lambda x: x['date'])
-
-        forecast_data = [{'date': today.strftime('%Y-%m-%d'), 'balance': float(current_balance)}]
-        running_balance = float(current_balance)
-        
-        # Create a point for each day in the forecast
-        for i in range(1, 31):
-            current_date = today + timedelta(days=i)
-            daily_change = 0
-            for event in all_events:
-                if event['date'] == current_date:
-                    daily_change += float(event['amount'])
-            
-            running_balance += daily_change
-            forecast_data.append({'date': current_date.strftime('%Y-%m-%d'), 'balance': running_balance})
-
-        return Response(forecast_data)
+            days = int(params.get('days', self.DEFAULT_DAYS))
+            paths = int(params.get('paths', self.DEFAULT_PATHS))
+            seed = int(params['seed']) if params.get('seed') else None
+        except ValueError:
+            return Response({'error': 'days, paths and seed must be whole numbers.'}, status=400)
+        if seed is not None and seed < 0:
+            return Response({'error': 'seed must not be negative.'}, status=400)
+        if not 1 <= days <= self.MAX_DAYS:
+            return Response({'error': f'days must be between 1 and {self.MAX_DAYS}.'}, status=400)
+        if not 1 <= paths <= self.MAX_PATHS:
+            return Response({'error': f'paths must be between 1 and {self.MAX_PATHS}.'}, status=400)
+        if params.get('mode') != 'monte_carlo':
+            return Response(dashboard.cash_flow_forecast(data, days))
+
+        if seed is None:
+            # Hand the seed back so the same bands can be requested again.
+            # A fresh seed is a fresh run, so there's nothing to cache
+            return Response(self.monte_carlo(data, days, paths, secrets.randbits(32)))
+        return Response(self.monte_carlo_cache.get_or_compute(
+            data.user.id, [data.today, days, paths, seed], lambda: self.monte_carlo(data, days, paths, seed)
+        ))
+
+    def monte_carlo(self, data, days, paths, seed):
+        events = dashboard.scheduled_events(data, days)
+        history = forecast.discretionary_history(data.user, data.today, data.subscriptions)
+        jitter = forecast.income_jitter(data.user, {description for description, _, _ in data.recurring_income}, data.today)
+        return forecast.monte_carlo_forecast(data.cash_balance, events, history, jitter, data.today, days, paths, seed)
     
 class DebtOptimizerView(APIView):
+    """
+    With ?extra_payment=N returns the avalanche and snowball results for one
+    extra payment. Sweeps are requested with any of:
+      ?extra_payments=0,50,100       an explicit list
+      ?extra_min=0&extra_max=2000&extra_step=50   a range
+      ?strategies=avalanche,snowball,custom&custom_order=3,1,2
+    and come back as (strategy x extra payment) matrices.
+    """
     permission_classes = [IsAuthenticated]
+    MAX_SCENARIOS = 1000
+    results_cache = versioned_cache.Entry('debt-optimizer', ('loans',))
 
     def get(self, request):
-        user = request.user
+        params = request.query_params
+        batch = any(p in params for p in ('extra_payments', 'extra_min', 'extra_max', 'strategies'))
         try:
-            extra_payment = Decimal(request.query_params.get('extra_payment', '0'))
-        except:
+            extras = self.parse_extra_payments(params) if batch else [Decimal(params.get('extra_payment', '0'))]
+            strategies = params.get('strategies', 'avalanche,snowball').split(',')
+            custom_order = [int(i) for i in params['custom_order'].split(',')] if params.get('custom_order') else None
+        except (InvalidOperation, ValueError):
             return Response({'error': 'Invalid extra payment amount.'}, status=400)
 
-        loans = list(Loan.objects.filter(user=user).prefetch_related('payments', 'disbursements'))
-        
-        # Helper function to calculate current balance
-        def calculate_current_balance(loan):
-            # (This is the same logic from your Loans page, simplified for brevity)
-            balance = sum(d.amount for d in loan.disbursements.all()) - sum(p.amount for p in loan.payments.all())
-            # A more accurate interest calculation would be needed for a real app,
-            # but this is a good starting point for the simulation.
-            return balance if balance > 0 else Decimal('0')
-
-        # Helper function to simulate one strategy
-        def simulate_payoff(strategy_loans):
-            months = 0
-            total_interest_paid = Decimal('0')
-            
-            # Create a mutable list of loans with their current balances
-            sim_loans = [{'loan': l, 'balance': calculate_current_balance(l)} for l in strategy_loans]
-            sim_loans = [l for l in sim_loans if l['balance'] > 0]
-
-            while any(l['balance'] > 0 for l in sim_loans):
-                months += 1
-                monthly_extra_payment = extra_payment
-                
-                # Accrue interest for all loans
-                for l_data in sim_loans:
-                    if l_data['balance'] > 0:
-                        monthly_interest = l_data['balance'] * (l_data['loan'].interest_rate / 100 / 12)
-                        l_data['balance'] += monthly_interest
-                        total_interest_paid += monthly_interest
-
-                # Make minimum payments (simplified as interest + a small principal)
-                # In a real app, this would use the actual EMI
-                for l_data in sim_loans:
-                    if l_data['balance'] > 0:
-                        monthly_interest = l_data['balance'] * (l_data['loan'].interest_rate / 100 / 12)
-                        min_payment = monthly_interest + 50 # Simplified minimum payment
-                        payment = min(l_data['balance'], min_payment)
-                        l_data['balance'] -= payment
-
-                # Apply extra payment to the target loan
-                for l_data in sim_loans:
-                    if l_data['balance'] > 0 and monthly_extra_payment > 0:
-                        payment = min(l_data['balance'], monthly_extra_payment)
-                        l_data['balance'] -= payment
-                        monthly_extra_payment -= payment
-                
-                if months > 1200: # Safety break to prevent infinite loops
-                    return {'error': 'Calculation timed out.'}
-
-            return {
-                'months_to_payoff': months,
-                'total_interest_paid': round(total_interest_paid, 2)
-            }
+        if any(s not in ('avalanche', 'snowball', 'custom') for s in strategies):
+            return Response({'error': 'Strategies must be avalanche, snowball or custom.'}, status=400)
+        if not extras or any(not e.is_finite() or e < 0 for e in extras):
+            return Response({'error': 'Invalid extra payment amount.'}, status=400)
+        if len(extras) * len(strategies) > self.MAX_SCENARIOS:
+            return Response({'error': f'At most {self.MAX_SCENARIOS} scenarios can be simulated at once.'}, status=400)
+
+        try:
+            matrix = self.scenario_matrix(request.user, strategies, extras, custom_order)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
 
-        # --- Run Simulations ---
-        # Avalanche: Sort by interest rate, descending
-        avalanche_loans = sorted(loans, key=lambda l: l.interest_rate, reverse=True)
-        avalanche_result = simulate_payoff(avalanche_loans)
+        if batch:
+            return Response(matrix)
 
-        # Snowball: Sort by balance, ascending
-        snowball_loans_with_balance = sorted(
-            [{'loan': l, 'balance': calculate_current_balance(l)} for l in loans],
-            key=lambda item: item['balance']
+        response = {}
+        for i, strategy in enumerate(strategies):
+            if matrix['months_to_payoff'][i][0] is None:
+                response[strategy] = {'error': 'Calculation timed out.'}
+            else:
+                response[strategy] = {
+                    'months_to_payoff': matrix['months_to_payoff'][i][0],
+                    'total_interest_paid': matrix['total_interest_paid'][i][0],
+                }
+        return Response(response)
+
+    def parse_extra_payments(self, params):
+        if 'extra_payments' in params:
+            return [Decimal(v) for v in params['extra_payments'].split(',') if v.strip()]
+        low = Decimal(params.get('extra_min', '0'))
+        high = Decimal(params.get('extra_max', low))
+        step = Decimal(params.get('extra_step', '50'))
+        if step <= 0 or high < low:
+            raise ValueError('Invalid range.')
+        count = int((high - low) / step) + 1
+        if count > self.MAX_SCENARIOS:
+            raise ValueError('Range is too large.')
+        return [low + step * i for i in range(count)]
+
+    def scenario_matrix(self, user, strategies, extras, custom_order):
+        today = date.today()
+        # Any write to a loan, payment or disbursement bumps the loans version, so a cached matrix is never stale
+        return self.results_cache.get_or_compute(
+            user.id, [today, strategies, [str(e) for e in extras], custom_order],
+            lambda: self.compute_matrix(user, today, strategies, extras, custom_order),
         )
-        snowball_loans = [item['loan'] for item in snowball_loans_with_balance]
-        snowball_result = simulate_payoff(snowball_loans)
 
-        return Response({
-            'avalanche': avalanche_result,
-            'snowball': snowball_result,
-        })
+    def compute_matrix(self, user, today, strategies, extras, custom_order):
+        checkpoints = loan_ledger.checkpoints_for_user(user)
+        book = LoanBook.from_loans((loan, loan_ledger.project(checkpoint, loan, today)) for loan, checkpoint in checkpoints.items())
+        result = compare_strategies(book, strategies, extras, custom_order)
+
+        months, interest = [], []
+        for i in range(len(strategies)):
+            months.append([None if result.timed_out[i, j] else int(result.months[i, j]) for j in range(len(extras))])
+            interest.append([None if result.timed_out[i, j] else to_cents(result.total_interest[i, j]) for j in range(len(extras))])
+        return {
+            'strategies': strategies,
+            'extra_payments': extras,
+            'months_to_payoff': months,
+            'total_interest_paid': interest,
+        }
 
 class SpendingAlertsView(APIView):
+    """
+    Active alerts, as written by the alert engine whenever transactions
+    change: unusual spending this week and budgets that are nearly used up.
+
+    Passing ?sigma= or ?lookback= evaluates the weekly spending check live
+    with those settings (defaults 2 standard deviations over 13 closed weeks).
+    """
     permission_classes = [IsAuthenticated]
+    live_cache = versioned_cache.Entry('spending-alerts-live', ('transactions', 'alerts'))
 
     def get(self, request):
-        user = request.user
-        today = date.today()
-        # We'll analyze spending over the last 90 days to establish a baseline
-        ninety_days_ago = today - timedelta(days=90)
-
-        # Get all relevant transactions
-        transactions = Transaction.objects.filter(
-            account__user=user,
-            transaction_type='EXPENSE',
-            date__gte=ninety_days_ago
-        ).select_related('category')
-
-        # Calculate average weekly spending per category
-        weekly_spending = defaultdict(lambda: defaultdict(float))
-        for t in transactions:
-            if t.category:
-                # Group transactions by week number and year
-                week_key = f"{t.date.isocalendar().year}-{t.date.isocalendar().week}"
-                weekly_spending[t.category.name][week_key] += float(t.amount)
-
-        alerts = []
-        
-        # Analyze each category for anomalies
-        for category_name, weeks in weekly_spending.items():
-            if len(weeks) < 4: # Need at least 4 weeks of data for a meaningful average
-                continue
+        data = dashboard.UserData(request.user)
+        if 'sigma' not in request.query_params and 'lookback' not in request.query_params:
+            return Response(dashboard.spending_alerts(data))
 
-            spending_values = list(weeks.values())
-            
-            # Calculate average and standard deviation
-            avg_weekly_spend = sum(spending_values) / len(spending_values)
-            std_dev = (sum([(s - avg_weekly_spend) ** 2 for s in spending_values]) / len(spending_values)) ** 0.5
-            
-            # Define the anomaly threshold (e.g., 2 standard deviations above average)
-            threshold = avg_weekly_spend + (2 * std_dev)
+        try:
+            sigma = float(request.query_params.get('sigma', spending.DEFAULT_SIGMA))
+            lookback = int(request.query_params.get('lookback', spending.DEFAULT_LOOKBACK_WEEKS))
+        except ValueError:
+            return Response({'error': 'sigma and lookback must be numbers.'}, status=400)
+        if not 0 < sigma <= 10 or not spending.MIN_WEEKS <= lookback <= spending.MAX_LOOKBACK_WEEKS:
+            return Response({'error': f'sigma must be between 0 and 10 and lookback between {spending.MIN_WEEKS} and {spending.MAX_LOOKBACK_WEEKS} weeks.'}, status=400)
+
+        return Response(self.live_cache.get_or_compute(
+            request.user.id, [data.today, sigma, lookback], lambda: self.evaluate(request.user, data.today, sigma, lookback)
+        ))
 
-            # Check this week's spending
-            current_week_key = f"{today.isocalendar().year}-{today.isocalendar().week}"
-            current_week_spending = weeks.get(current_week_key, 0)
+    def evaluate(self, user, today, sigma, lookback):
+        messages = spending.evaluate_alerts(user, today, sigma=sigma, lookback_weeks=lookback)
+        return messages + [alert.message for alert in alerts.active_alerts(user, today).filter(kind='BUDGET')]
 
-            if current_week_spending > avg_weekly_spend and current_week_spending > threshold:
-                over_amount = current_week_spending - avg_weekly_spend
-                alerts.append(
-                    f"Heads up! Your spending on '{category_name}' this week is ${over_amount:,.2f} higher than your weekly average."
-                )
 
-        return Response(alerts)
+class CacheStatsView(APIView):
+    """Hit and miss counts of the analytics cache (core.versioned_cache), per cached result. DELETE resets them."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(versioned_cache.stats())
+
+    def delete(self, request):
+        versioned_cache.reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
     
 
 
@@ -754,36 +728,11 @@ class RunRoundUpsView(APIView):
     permission_classes = [IsAuthenticated]
     def post(self, request):
         profile = UserProfile.objects.get(user=request.user)
-        if not all([profile.round_ups_enabled, profile.round_up_source_account, profile.round_up_target_account]):
+        result = roundups.run(profile)
+        if result is None:
             return Response({'error': 'Round-ups are not configured correctly.'}, status=400)
-        transactions_to_round = Transaction.objects.filter(
-            account=profile.round_up_source_account,
-            transaction_type='EXPENSE',
-            date__gt=profile.last_round_up_run or '1970-01-01'
-        )
-        total_round_up = Decimal('0.00')
-        for t in transactions_to_round:
-            cents = t.amount.quantize(Decimal('1.00')) - t.amount
-            if cents > 0:
-                total_round_up += cents
-        if total_round_up > 0:
-            Transaction.objects.create(
-                account=profile.round_up_source_account,
-                description=f"Round-up Transfer ({len(transactions_to_round)} items)",
-                amount=total_round_up,
-                transaction_type='EXPENSE',
-                date=date.today()
-            )
-            Transaction.objects.create(
-                account=profile.round_up_target_account,
-                description=f"Round-up Savings ({len(transactions_to_round)} items)",
-                amount=total_round_up,
-                transaction_type='INCOME',
-                date=date.today()
-            )
-        profile.last_round_up_run = datetime.now(timezone.utc)
-        profile.save()
-        return Response({'message': f'Successfully rounded up {total_round_up.quantize(Decimal("0.01"))}.'})
+        total_round_up, items = result
+        return Response({'message': f'Successfully rounded up {total_round_up}.', 'total': total_round_up, 'items': items})
     
 class AILanguageQueryView(APIView):
     permission_classes = [IsAuthenticated]
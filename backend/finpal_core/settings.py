@@ -83,6 +83,8 @@ TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
 STATIC_URL = 'static/'
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # --- Custom Settings ---
@@ -110,6 +112,61 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 15,
+    # orjson when it's installed, byte-for-byte the same output as DRF's JSONRenderer
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# CSV uploads larger than this are queued for the import worker
+# (python manage.py process_imports) instead of being imported inline.
+IMPORT_INLINE_MAX_BYTES = int(os.environ.get('IMPORT_INLINE_MAX_BYTES', 2 * 1024 * 1024))
+# A running import whose worker hasn't reported progress for this long is
+# assumed dead and requeued, up to IMPORT_JOB_MAX_ATTEMPTS runs in total
+IMPORT_JOB_STALE_SECONDS = 5 * 60
+IMPORT_JOB_MAX_ATTEMPTS = 3
+
+# Number of users whose category suggestion index is kept in memory per process
+CATEGORY_INDEX_MAX_USERS = 256
+
+# Stock quotes (core.marketdata): 'alphavantage', 'file' (reads MARKETDATA_FIXTURE_PATH,
+# for offline development) or a dotted path to a QuoteProvider subclass
+MARKETDATA_PROVIDER = os.environ.get('MARKETDATA_PROVIDER', 'alphavantage')
+ALPHA_VANTAGE_API_KEY = os.environ.get('ALPHA_VANTAGE_API_KEY')
+MARKETDATA_FIXTURE_PATH = os.environ.get('MARKETDATA_FIXTURE_PATH', BASE_DIR / 'core' / 'marketdata' / 'sample_quotes.json')
+MARKETDATA_TIMEOUT = (3.05, 5)  # connect and read timeouts in seconds
+MARKETDATA_QUOTE_TTL = 60  # seconds a quote is served as fresh
+MARKETDATA_STALE_TTL = 15 * 60  # and then as stale while it is refreshed
+MARKETDATA_ERROR_TTL = 10  # seconds a provider failure is replayed instead of retried
+# Longest net worth and the dashboard wait for uncached quotes before valuing holdings at cost basis
+MARKETDATA_VALUATION_TIMEOUT = 1.0
+# Cache alias for quotes and unknown symbols. Only a shared store (ANALYTICS_CACHE_URL)
+# lets worker processes reuse each other's quotes instead of each calling the provider
+MARKETDATA_CACHE = 'analytics'
+
+# Cached analytics (core.versioned_cache). ANALYTICS_CACHE_URL picks the store:
+# redis://host:6379/1 (shared by all workers, needs the redis package),
+# file:///path/to/dir, or unset for per-process local memory. Version counters
+# live here too, so production needs a shared store: with more than one
+# worker process, local memory serves stale results (check --deploy warns).
+ANALYTICS_CACHE_URL = os.environ.get('ANALYTICS_CACHE_URL', '')
+if ANALYTICS_CACHE_URL.startswith(('redis://', 'rediss://')):
+    ANALYTICS_CACHE = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': ANALYTICS_CACHE_URL}
+elif ANALYTICS_CACHE_URL.startswith('file://'):
+    ANALYTICS_CACHE = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': ANALYTICS_CACHE_URL[len('file://'):]}
+else:
+    ANALYTICS_CACHE = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'analytics'}
+ANALYTICS_CACHE_SECONDS = 60 * 60  # results are invalidated by version, this only bounds memory
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'analytics': {**ANALYTICS_CACHE, 'KEY_PREFIX': 'analytics'},
 }
 
 # Configure dj-rest-auth to use JWT
@@ -10,9 +10,9 @@ import { DollarSign, CreditCard, Plus } from 'lucide-react';
 import { Bar, BarChart, ResponsiveContainer, XAxis, YAxis, Tooltip, Pie, PieChart, Cell, Legend } from 'recharts';
 import { getMonth, parseISO } from 'date-fns';
 import { CHART_COLORS } from '@/lib/chart-colors';
-import NetWorthChart from '@/components/net-worth-chart';
-import UpcomingBills from '@/components/upcoming-bills';
-import CashFlowForecastChart from '@/components/cash-flow-forecast-chart';
+import NetWorthChart, { NetWorthSnapshot } from '@/components/net-worth-chart';
+import UpcomingBills, { UpcomingBill } from '@/components/upcoming-bills';
+import CashFlowForecastChart, { ForecastDataPoint } from '@/components/cash-flow-forecast-chart';
 import SpendingAlerts from '@/components/spending-alerts';
 
 // --- Type Definitions ---
@@ -20,12 +20,22 @@ type Account = { id: number; name: string; balance: string; };
 type Transaction = { amount: string; transaction_type: 'INCOME' | 'EXPENSE'; date: string; category: number | null; };
 type Category = { id: number; name: string; };
 
-// Generic type for a paginated API response
-type PaginatedResponse<T> = {
-    count: number;
-    next: string | null;
-    previous: string | null;
-    results: T[];
+// Every widget on this page comes from one /dashboard/ call
+const WIDGETS = ['accounts', 'recent_transactions', 'categories', 'net_worth', 'cash_flow_forecast', 'upcoming_bills', 'spending_alerts'];
+
+type DashboardResponse = {
+    accounts: Account[];
+    recent_transactions: Transaction[];
+    categories: Category[];
+    net_worth: NetWorthSnapshot[];
+    cash_flow_forecast: ForecastDataPoint[];
+    upcoming_bills: UpcomingBill[];
+    spending_alerts: string[];
+};
+
+const EMPTY_DASHBOARD: DashboardResponse = {
+    accounts: [], recent_transactions: [], categories: [],
+    net_worth: [], cash_flow_forecast: [], upcoming_bills: [], spending_alerts: [],
 };
 
 function DashboardSkeleton() {
@@ -50,9 +60,7 @@ function DashboardSkeleton() {
 
 export default function DashboardPage() {
   const { status } = useAuthStore();
-  const [accounts, setAccounts] = useState<Account[]>([]);
-  const [transactions, setTransactions] = useState<Transaction[]>([]);
-  const [categories, setCategories] = useState<Category[]>([]);
+  const [dashboard, setDashboard] = useState<DashboardResponse>(EMPTY_DASHBOARD);
   const [loading, setLoading] = useState(true);
 
 
@@ -61,33 +69,20 @@ export default function DashboardPage() {
     
     setLoading(true);
     
-    
-    Promise.all([
-      apiClient.get('/accounts/'),
-      apiClient.get('/transactions/'),
-      apiClient.get('/categories/'),
-    ]).then(([accountsRes, transactionsRes, categoriesRes]) => {
-      // FIX: Extract the 'results' array from the paginated responses
-      const paginatedAccounts: PaginatedResponse<Account> = accountsRes.data;
-      const paginatedTransactions: PaginatedResponse<Transaction> = transactionsRes.data;
-      const paginatedCategories: PaginatedResponse<Category> = categoriesRes.data;
-
-      setAccounts(paginatedAccounts.results);
-      setTransactions(paginatedTransactions.results);
-      setCategories(paginatedCategories.results);
-
-    }).catch(error => {
-      console.error('Failed to fetch dashboard data:', error);
-              console.error('Failed to load data:', error);
-    }).finally(() => setLoading(false));
+    apiClient.get<DashboardResponse>('/dashboard/', { params: { widgets: WIDGETS.join(',') } })
+      .then(response => setDashboard(response.data))
+      .catch(error => {
+        console.error('Failed to fetch dashboard data:', error);
+      }).finally(() => setLoading(false));
   }, [status]);
 
   useEffect(() => {
     fetchData();
   }, [fetchData]);
 
+  const { accounts, recent_transactions: transactions, categories } = dashboard;
+
   // --- Data Calculations ---
-  // This will now work correctly because `accounts` is an array
   const totalBalance = accounts.reduce((sum, account) => sum + parseFloat(account.balance), 0);
   
   const now = new Date();
@@ -212,12 +207,12 @@ export default function DashboardPage() {
       </div>
 
       <div className="mt-8 grid grid-cols-1 gap-8 xl:grid-cols-2">
-        <UpcomingBills />
-        <SpendingAlerts />
+        <UpcomingBills bills={dashboard.upcoming_bills} />
+        <SpendingAlerts alerts={dashboard.spending_alerts} />
       </div>
       <div className="mt-8 grid grid-cols-1 gap-8 xl:grid-cols-2">
-        <NetWorthChart />
-        <CashFlowForecastChart />
+        <NetWorthChart data={dashboard.net_worth} />
+        <CashFlowForecastChart data={dashboard.cash_flow_forecast} />
       </div>
 
     </div>
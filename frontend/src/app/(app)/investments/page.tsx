@@ -32,6 +32,18 @@ type InvestmentAccount = {
   holdings: Holding[];
 };
 
+type ValuedHolding = {
+  id: number;
+  price: number | null;
+  priced: boolean;
+  market_value: number;
+  unrealized_gain: number;
+};
+
+type PortfolioValuation = {
+  holdings: ValuedHolding[];
+};
+
 // Generic type for a paginated API response
 type PaginatedResponse<T> = {
     count: number;
@@ -47,20 +59,26 @@ export default function InvestmentsPage() {
   const fetchInvestmentData = useCallback(async () => {
     setLoading(true);
     try {
-      const accountsRes = await apiClient.get('/investments/');
+      // One valuation call prices every holding instead of a request per symbol
+      const [accountsRes, valuationRes] = await Promise.all([
+        apiClient.get('/investments/'),
+        apiClient.get('/portfolio/valuation/'),
+      ]);
       // FIX: Extract the 'results' array from the paginated response
       const paginatedData: PaginatedResponse<InvestmentAccount> = accountsRes.data;
       const investmentAccounts = paginatedData.results;
+      const valuation: PortfolioValuation = valuationRes.data;
+      const valuedHoldings = new Map(valuation.holdings.map(h => [h.id, h]));
 
       for (const acc of investmentAccounts) {
         for (const holding of acc.holdings) {
-          try {
-            const priceRes = await apiClient.get(`/stock-price/?symbol=${holding.symbol}`);
-            holding.current_price = priceRes.data.price;
-            holding.market_value = parseFloat(holding.shares) * (holding.current_price ?? 0);
-            holding.gain_loss = holding.market_value - parseFloat(holding.cost_basis);
-          } catch (priceError) {
-            console.error(`Failed to fetch price for ${holding.symbol}`, priceError);
+          const valued = valuedHoldings.get(holding.id);
+          if (valued && valued.priced) {
+            holding.current_price = valued.price ?? 0;
+            holding.market_value = valued.market_value;
+            holding.gain_loss = valued.unrealized_gain;
+          } else {
+            console.error(`Failed to fetch price for ${holding.symbol}`);
             holding.current_price = 0;
             holding.market_value = 0;
             holding.gain_loss = -parseFloat(holding.cost_basis);
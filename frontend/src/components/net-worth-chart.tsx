@@ -1,54 +1,18 @@
 'use client';
 
-import { useEffect, useState, useCallback } from 'react';
-import apiClient from '@/lib/api';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, Legend } from 'recharts';
 import { format, parseISO } from 'date-fns';
-import { Skeleton } from '@/components/ui/skeleton';
 
 // Type definition for a single snapshot from our API
-type NetWorthSnapshot = {
+export type NetWorthSnapshot = {
   date: string;
   total_assets: string;
   total_liabilities: string;
   net_worth: string;
 };
 
-export default function NetWorthChart() {
-  const [data, setData] = useState<NetWorthSnapshot[]>([]);
-  const [loading, setLoading] = useState<boolean>(true);
-
-  const fetchNetWorthData = useCallback(async () => {
-    setLoading(true);
-    try {
-      const response = await apiClient.get('/net-worth/');
-      setData(response.data);
-    } catch (error) {
-      console.error('Failed to fetch net worth data:', error);
-    } finally {
-      setLoading(false);
-    }
-  }, []);
-
-  useEffect(() => {
-    fetchNetWorthData();
-  }, [fetchNetWorthData]);
-
-  if (loading) {
-    return (
-        <Card>
-            <CardHeader>
-                <Skeleton className="h-7 w-48" />
-                <Skeleton className="h-4 w-64 mt-2" />
-            </CardHeader>
-            <CardContent>
-                <Skeleton className="h-[350px] w-full" />
-            </CardContent>
-        </Card>
-    );
-  }
-
+export default function NetWorthChart({ data }: { data: NetWorthSnapshot[] }) {
   return (
     <Card>
       <CardHeader>
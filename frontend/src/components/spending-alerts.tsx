@@ -1,48 +1,9 @@
 'use client';
 
-import { useEffect, useState, useCallback } from 'react';
-import apiClient from '@/lib/api';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
-import { Skeleton } from '@/components/ui/skeleton';
 import { AlertTriangle } from 'lucide-react';
-import { toast } from "sonner";
-
-export default function SpendingAlerts() {
-  const [alerts, setAlerts] = useState<string[]>([]);
-  const [loading, setLoading] = useState<boolean>(true);
-
-  const fetchAlerts = useCallback(async () => {
-    setLoading(true);
-    try {
-      const response = await apiClient.get('/spending-alerts/');
-      setAlerts(response.data);
-    } catch (error) {
-      console.error('Failed to fetch spending alerts:', error);
-      toast.error("Could not load spending alerts.");
-    } finally {
-      setLoading(false);
-    }
-  }, []);
-
-  useEffect(() => {
-    fetchAlerts();
-  }, [fetchAlerts]);
-
-  if (loading) {
-    return (
-        <Card>
-            <CardHeader>
-                <Skeleton className="h-6 w-3/4" />
-                <Skeleton className="h-4 w-1/2 mt-2" />
-            </CardHeader>
-            <CardContent className="space-y-4">
-                <Skeleton className="h-8 w-full" />
-                <Skeleton className="h-8 w-full" />
-            </CardContent>
-        </Card>
-    );
-  }
 
+export default function SpendingAlerts({ alerts }: { alerts: string[] }) {
   return (
     <Card>
       <CardHeader>
@@ -29,6 +29,55 @@ interface TransactionCSVUploadDialogProps {
   onSuccess: () => void;
 }
 
+type ImportJob = {
+  id: number;
+  status: 'PENDING' | 'RUNNING' | 'DONE' | 'FAILED';
+  rows_processed: number;
+  rows_created: number;
+  rows_duplicate: number;
+  rows_rejected: number;
+  throughput: number | null;
+  error_message: string;
+};
+
+const POLL_INTERVAL_MS = 2000;
+// Stop waiting when the job makes no progress for this long (e.g. no import worker is running)
+const STALL_TIMEOUT_MS = 2 * 60 * 1000;
+// or hasn't finished after this long in total
+const MAX_WAIT_MS = 30 * 60 * 1000;
+
+// The finished job, or null if we gave up waiting for it
+async function waitForImportJob(jobId: number): Promise<ImportJob | null> {
+  const toastId = toast.loading("Importing transactions...");
+  const startedAt = Date.now();
+  let lastProgressAt = startedAt;
+  let lastProgress = '';
+  try {
+    while (Date.now() - startedAt < MAX_WAIT_MS) {
+      const { data: job } = await apiClient.get<ImportJob>(`/imports/${jobId}/`);
+      if (job.status === 'DONE' || job.status === 'FAILED') {
+        return job;
+      }
+      const progress = `${job.status}:${job.rows_processed}`;
+      if (progress !== lastProgress) {
+        lastProgress = progress;
+        lastProgressAt = Date.now();
+      } else if (Date.now() - lastProgressAt > STALL_TIMEOUT_MS) {
+        return null;
+      }
+      const rate = job.throughput ? ` (${Math.round(job.throughput)} rows/s)` : '';
+      toast.loading("Importing transactions...", {
+        id: toastId,
+        description: `${job.rows_processed.toLocaleString()} rows processed${rate}`,
+      });
+      await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+    }
+    return null;
+  } finally {
+    toast.dismiss(toastId);
+  }
+}
+
 export function TransactionCSVUploadDialog({ accounts, onSuccess }: TransactionCSVUploadDialogProps) {
   const [isDialogOpen, setIsDialogOpen] = useState<boolean>(false);
   const [selectedFile, setSelectedFile] = useState<File | null>(null);
@@ -63,6 +112,21 @@ export function TransactionCSVUploadDialog({ accounts, onSuccess }: TransactionC
       setIsDialogOpen(false);
       setSelectedFile(null);
       setSelectedAccountId('');
+
+      // Large files are imported in the background; poll the job until it finishes
+      if (response.status === 202) {
+        const job = await waitForImportJob(response.data.id);
+        onSuccess();
+        if (job === null) {
+          toast.error("Import Not Finished", { description: "Your file is still queued or the import has stalled. Check your transactions again later." });
+        } else if (job.status === 'DONE') {
+          toast.success("Upload Complete", { description: `${job.rows_created} transactions imported, ${job.rows_duplicate} duplicates skipped, ${job.rows_rejected} rows rejected.` });
+        } else {
+          toast.error("Upload Failed", { description: job.error_message || "There was a problem with your file." });
+        }
+        return;
+      }
+
       onSuccess();
       toast.success("Upload Complete", { description: response.data.message });
     } catch (error: any) {